@@ -1,9 +1,15 @@
 import ast
-from typing import Dict, List, Optional
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
 
+from analyzer.file_visitor import Collector, FileVisitor
+from analyzer.imports_analyzer import ImportsCollector
+from analyzer.source_text import SourceText
+from analyzer.symbol_indexer import SymbolIndexer
+from analyzer.type_inference import Scope, TypeInference
 from models.calls import Call, CallCoordinates, Calls
 from models.file import File
-from models.registry import RegistryClass, RegistryHeap
+from models.hash import Symbol, SymbolIndex
+from models.registry import RegistryHeap
 
 
 class CallAnalyzer:
@@ -18,140 +24,333 @@ class CallAnalyzer:
         file_meta: File,
         registry_heap: RegistryHeap,
         imports_map: Optional[Dict[str, str]] = None,
+        symbol_index: Optional[SymbolIndex] = None,
+        arguments: str = "text",
+        source: Optional[str] = None,
     ) -> Calls:
-        calls_list: List[Call] = []
-        instance_map: Dict[str, str] = {}  # var_name -> class_name
-        imports_map = imports_map or {}
-
-        # --- Resolve function/class in registry ---
-        def find_class_and_method(
-            name: str,
-        ) -> tuple[
-            Optional[str], Optional[File], Optional[List[str]], Optional[List[str]]
-        ]:
-            """
-            Return (parent_class_name, File, parameters, param_types)
-            """
-            for reg_file in registry_heap.files:
-                # Top-level functions
-                for func in reg_file.functions:
-                    if func.function_name == name:
-                        return (
-                            None,
-                            reg_file.file,
-                            getattr(func, "parameters", None),
-                            getattr(func, "param_types", None),
-                        )
-
-                # Recursively check classes
-                def walk_class(cls: RegistryClass):
-                    if cls.class_name == name:
-                        return cls.class_name, reg_file.file, None, None
-                    for f in getattr(cls, "class_functions", []):
-                        if f.function_name == name:
-                            return (
-                                cls.class_name,
-                                reg_file.file,
-                                getattr(f, "parameters", None),
-                                getattr(f, "param_types", None),
-                            )
-                    for sub_cls in getattr(cls, "classes", []):
-                        res = walk_class(sub_cls)
-                        if res != (None, None, None, None):
-                            return res
-                    return None, None, None, None
-
-                for cls in getattr(reg_file, "classes", []):
-                    res = walk_class(cls)
-                    if res != (None, None, None, None):
-                        return res
-
-            # Fallback to imports
-            if name in imports_map:
-                f = File(
-                    file_name=imports_map[name],
-                    file_format=".py",
-                    file_path=imports_map[name],
-                )
-                return None, f, None, None
-            return None, None, None, None
-
-        # --- Recursive AST traversal ---
-        def visit(
-            node: ast.AST, current_class: Optional[str], current_func: Optional[str]
-        ):
-            global called_file
-            new_class = current_class
-            new_func = current_func
-
-            if isinstance(node, ast.ClassDef):
-                new_class = node.name
-            elif isinstance(node, ast.FunctionDef):
-                new_func = node.name
-
-            # Track instance assignments: obj = ClassName()
-            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call):
-                if isinstance(node.value.func, ast.Name):
-                    class_name = node.value.func.id
-                    for target in node.targets:
-                        if isinstance(target, ast.Name):
-                            instance_map[target.id] = class_name
-
-            # Process calls
-            if isinstance(node, ast.Call):
-                callee_name = None
-                parent_class = None
-                parameters, param_types = None, None
-
-                # Direct call: func()
-                if isinstance(node.func, ast.Name):
-                    callee_name = node.func.id
-                    parent_class, called_file, parameters, param_types = (
-                        find_class_and_method(callee_name)
-                    )
-
-                # Method call: obj.method()
-                elif isinstance(node.func, ast.Attribute):
-                    callee_name = node.func.attr
-                    if isinstance(node.func.value, ast.Name):
-                        obj_name = node.func.value.id
-                        parent_class = instance_map.get(obj_name)
-                        if parent_class is None:
-                            parent_class, called_file, parameters, param_types = (
-                                find_class_and_method(callee_name)
-                            )
-                    else:
-                        _, called_file, parameters, param_types = find_class_and_method(
-                            callee_name
-                        )
-
-                # Extract argument values as strings
-                arguments = [
-                    ast.unparse(arg) if hasattr(ast, "unparse") else None
-                    for arg in node.args
-                ]
-
-                if callee_name:
-                    calls_list.append(
-                        Call(
-                            called_file=called_file,
-                            caller_class=new_class,
-                            caller_func=new_func,
-                            parent_class=parent_class,
-                            called_func=callee_name,
-                            coordinates=CallCoordinates(
-                                line=getattr(node, "lineno", -1),
-                                char=getattr(node, "col_offset", -1),
-                            ),
-                            parameters=parameters,
-                            param_types=param_types,
-                            arguments=arguments,
-                        )
-                    )
-
-            # Recurse
-            for child in ast.iter_child_nodes(node):
-                visit(child, new_class, new_func)
-
-        visit(file_ast, current_class=None, current_func=None)
-        return Calls(caller_file=file_meta, calls=calls_list)
+        if symbol_index is None:
+            symbol_index = SymbolIndexer.build(registry_heap)
+
+        collector = CallCollector(
+            file_meta, symbol_index, imports_map or {}, arguments, source
+        )
+        FileVisitor([collector]).visit(file_ast)
+        return collector.result()
+
+
+Position = Tuple[int, int]  # (line, col_offset)
+
+
+class _Frame(NamedTuple):
+    """A module, class, function or lambda the visit is inside of."""
+
+    start: Position  # the def / class / lambda keyword; decorators come before
+    body: Position  # first statement or lambda body; earlier code runs outside
+    caller_class: Optional[str]
+    caller_func: Optional[str]
+    scope: Scope
+    is_lambda: bool = False
+
+
+class CallCollector(Collector):
+    """
+    Calls of one file for a FileVisitor, as CallAnalyzer finds them.
+
+    Callee lookups fall back to the file's imports, which may come after
+    the call, so they are resolved in call order once the visit is over;
+    imports is then either a ready name -> file map or the ImportsCollector
+    of the same visit. The same goes for the class of the object a method
+    is called on, which TypeInference works out from the whole file.
+
+    Decorators, default values and base classes run in the scope around a
+    definition, so calls in them are attributed by position to the frame
+    whose body they are in; decorator applications (@cache) are calls too.
+    Calls in a lambda belong to the function it is written in, marked with
+    context "lambda", and calls right under an await are marked awaited.
+
+    arguments sets what Call.arguments holds for the positional arguments:
+    "off" nothing (None), "span" their [line, char, end_line, end_char]
+    in the source (see SourceText), "text" their source text, cut from
+    source once the visit is over (ast.unparse when there is no source).
+    """
+
+    ARGUMENTS = ("off", "span", "text")
+
+    # how a call's callee is looked up in result()
+    FIND = 0  # parent class, file, parameters and types of the name
+    FIND_FILE = 1  # only file, parameters and types (obj.attr.method())
+
+    def __init__(
+        self,
+        file_meta: File,
+        symbol_index: Optional[SymbolIndex] = None,
+        imports: Union[Dict[str, str], ImportsCollector, None] = None,
+        arguments: str = "text",
+        source: Optional[str] = None,
+    ):
+        if arguments not in self.ARGUMENTS:
+            raise ValueError(f"arguments must be one of {self.ARGUMENTS}: {arguments}")
+        self.file_meta = file_meta
+        self.symbol_index = symbol_index or SymbolIndex()
+        self.imports = imports
+        self.arguments = arguments
+        self.source = source
+        self.calls: List[Call] = []
+        # (call, name, mode, object a method is called on, scope of the call)
+        self._lookups: List[Tuple[Call, str, int, Optional[ast.expr], Scope]] = []
+        self.types = TypeInference(known_class=self._known_class)
+        self._imports_map: Dict[str, str] = {}  # set by result()
+        self._frames: List[_Frame] = [
+            _Frame((0, 0), (0, 0), None, None, self.types.module)
+        ]
+        self._awaited: Set[int] = set()  # ids of calls right under an await
+
+    # -------------------- SCOPES --------------------
+
+    def enter_ClassDef(self, node: ast.ClassDef):
+        frame = self._frames[-1]
+        self._decorators(node, frame)
+        self._frames.append(
+            _Frame(
+                (node.lineno, node.col_offset),
+                self._position(node.body[0]),
+                node.name,
+                frame.caller_func,
+                self.types.add_class(node, frame.scope),
+            )
+        )
+
+    def enter_FunctionDef(self, node: ast.FunctionDef):
+        frame = self._frames[-1]
+        self._decorators(node, frame)
+        self._frames.append(
+            _Frame(
+                (node.lineno, node.col_offset),
+                self._position(node.body[0]),
+                frame.caller_class,
+                node.name,
+                self.types.add_function(node, frame.scope),
+            )
+        )
+
+    enter_AsyncFunctionDef = enter_FunctionDef
+
+    def enter_Lambda(self, node: ast.Lambda):
+        # a lambda in a default value is made outside the function
+        frame = self._frame_of(self._position(node))[0]
+        self._frames.append(
+            _Frame(
+                (node.lineno, node.col_offset),
+                self._position(node.body),
+                frame.caller_class,
+                frame.caller_func,
+                self.types.add_lambda(node, frame.scope),
+                is_lambda=True,
+            )
+        )
+
+    def leave_ClassDef(self, node: ast.ClassDef):
+        self._frames.pop()
+
+    leave_FunctionDef = leave_AsyncFunctionDef = leave_Lambda = leave_ClassDef
+
+    @staticmethod
+    def _position(node: ast.AST) -> Position:
+        return node.lineno, node.col_offset
+
+    def _frame_of(self, position: Position) -> Tuple[_Frame, Optional[str]]:
+        """Frame code at position runs in, and "decorator" if it is one."""
+        frames = self._frames
+        index = len(frames) - 1
+        while position < frames[index].body:
+            index -= 1
+        frame = frames[index]
+        if frame.is_lambda:
+            return frame, "lambda"
+        if index + 1 < len(frames) and position < frames[index + 1].start:
+            return frame, "decorator"
+        return frame, None
+
+    # Track what names and self. attributes hold: obj = ClassName(), x: Foo
+
+    def enter_Assign(self, node: ast.Assign):
+        scope = self._frame_of(self._position(node))[0].scope
+        for target in node.targets:
+            self.types.add_assign(target, node.value, scope)
+
+    def enter_AnnAssign(self, node: ast.AnnAssign):
+        scope = self._frame_of(self._position(node))[0].scope
+        self.types.add_annotation(node.target, node.annotation, scope)
+        self.types.add_assign(node.target, node.value, scope)
+
+    # -------------------- CALLS --------------------
+
+    def enter_Await(self, node: ast.Await):
+        if isinstance(node.value, ast.Call):
+            self._awaited.add(id(node.value))
+
+    def _decorators(self, node: ast.AST, frame: _Frame):
+        """@name and @obj.name decorators call name with the definition."""
+        for decorator in node.decorator_list:
+            if isinstance(decorator, (ast.Name, ast.Attribute)):
+                self._add_call(decorator, decorator, frame, "decorator")
+
+    def enter_Call(self, node: ast.Call):
+        frame, context = self._frame_of(self._position(node))
+        awaited = id(node) in self._awaited
+        if awaited:
+            self._awaited.discard(id(node))
+        self._add_call(node, node.func, frame, context, awaited)
+
+    def _add_call(
+        self,
+        node: ast.expr,
+        func: ast.expr,
+        frame: _Frame,
+        context: Optional[str],
+        awaited: bool = False,
+    ):
+        callee_name = None
+        receiver = None
+        mode = self.FIND
+
+        # Direct call: func()
+        if isinstance(func, ast.Name):
+            callee_name = func.id
+
+        # Method call: obj.method()
+        elif isinstance(func, ast.Attribute):
+            callee_name = func.attr
+            receiver = func.value
+            if not isinstance(receiver, ast.Name):
+                mode = self.FIND_FILE
+
+        if not callee_name:
+            return
+
+        call = Call(
+            called_file=None,
+            caller_class=frame.caller_class,
+            caller_func=frame.caller_func,
+            called_func=callee_name,
+            coordinates=CallCoordinates(
+                line=getattr(node, "lineno", -1),
+                char=getattr(node, "col_offset", -1),
+            ),
+            arguments=self._arguments(node) if isinstance(node, ast.Call) else None,
+            awaited=awaited,
+            context=context,
+        )
+        self.calls.append(call)
+        self._lookups.append((call, callee_name, mode, receiver, frame.scope))
+
+    def _arguments(self, node: ast.Call) -> Optional[list]:
+        if self.arguments == "off":
+            return None
+        if self.arguments == "text" and self.source is None:
+            return [self._unparse(arg) for arg in node.args]
+        # spans; "text" cuts them from the source in result()
+        return [
+            [arg.lineno, arg.col_offset, arg.end_lineno, arg.end_col_offset]
+            for arg in node.args
+        ]
+
+    @staticmethod
+    def _unparse(arg: ast.AST) -> Optional[str]:
+        """Source text of an argument, None if it is nested too deep to unparse."""
+        try:
+            return ast.unparse(arg)
+        except RecursionError:
+            return None
+
+    # -------------------- RESULT --------------------
+
+    def result(self) -> Calls:
+        imports_map = self.imports
+        if isinstance(imports_map, ImportsCollector):
+            imports_map = imports_map.imports_map()
+        imports_map = self._imports_map = imports_map or {}
+
+        for call, name, mode, receiver, scope in self._lookups:
+            owner = self._receiver_class(receiver, scope) if receiver else None
+            if owner:
+                call.parent_class = owner
+                method = self._find_method(name, owner)
+                if method is not None:
+                    call.called_file = method.file
+                    call.parameters = method.parameters
+                    call.param_types = method.param_types
+                else:
+                    # inherited or defined elsewhere: the class's file when it
+                    # is indexed, otherwise CallResolver looks it up by class
+                    symbol = self._find_class(owner)
+                    call.called_file = symbol.file if symbol else None
+                continue
+            parent_class, called_file, parameters, param_types = self._find(
+                name, imports_map
+            )
+            call.called_file = called_file
+            call.parameters = parameters
+            call.param_types = param_types
+            if mode == self.FIND:
+                call.parent_class = parent_class
+        self._lookups = []
+
+        if self.arguments == "text" and self.source is not None:
+            source = SourceText(self.source)
+            for call in self.calls:
+                call.arguments = source.arguments(call)
+            self.source = None
+        return Calls(caller_file=self.file_meta, calls=self.calls)
+
+    def _receiver_class(self, receiver: ast.expr, scope: Scope) -> Optional[str]:
+        """Class of the object a method is called on: obj.m(), self.x.m(), Foo.m()."""
+        owner = self.types.type_of(receiver, scope)
+        if owner is None and isinstance(receiver, ast.Name):
+            if receiver.id in self.types.classes:
+                owner = receiver.id
+        return owner
+
+    def _known_class(self, name: str) -> bool:
+        """A class of the symbol index, or an imported name it does not know."""
+        if name in self.symbol_index.by_name:
+            return self._find_class(name) is not None
+        return name in self._imports_map
+
+    def _find_class(self, name: str) -> Optional[Symbol]:
+        for symbol in self.symbol_index.by_name.get(name, ()):
+            if symbol.kind == "class":
+                return symbol
+        return None
+
+    def _find_method(self, name: str, owner: str) -> Optional[Symbol]:
+        for symbol in self.symbol_index.by_name.get(name, ()):
+            if symbol.kind == "method" and symbol.parent_class == owner:
+                return symbol
+        return None
+
+    def _find(
+        self, name: str, imports_map: Dict[str, str]
+    ) -> Tuple[Optional[str], Optional[File], Optional[List[str]], Optional[List[str]]]:
+        """Return (parent_class_name, File, parameters, param_types)."""
+        candidates = self.symbol_index.by_name.get(name)
+        if candidates:
+            symbol = candidates[0]
+            if symbol.kind == "class":
+                return symbol.name, symbol.file, None, None
+            return (
+                symbol.parent_class,
+                symbol.file,
+                symbol.parameters,
+                symbol.param_types,
+            )
+
+        # Fallback to imports
+        if name in imports_map:
+            f = File(
+                file_name=imports_map[name],
+                file_format=".py",
+                file_path=imports_map[name],
+            )
+            return None, f, None, None
+        return None, None, None, None
@@ -0,0 +1,152 @@
+import builtins
+from typing import Dict, List, Optional, Set, Tuple
+
+from analyzer.symbol_indexer import SymbolIndexer
+from models.calls import Call, CallsHeap
+from models.hash import Symbol
+from models.imports import ImportsHeap
+from models.registry import RegistryHeap
+
+
+class CallResolver:
+    """
+    Fills in called_file for calls that could not be resolved inside their
+    own file, using the global SymbolIndex.
+
+    Candidates for the called name are narrowed step by step: the class the
+    call was made on, the caller's own class, the caller's own file, then
+    the files the caller imports. A class its file took a function for
+    (x = helper(); x.m()) is dropped first. A call is resolved only when the first
+    non-empty step points at a single file; otherwise (up to max_candidates)
+    candidates are recorded and the call is marked "ambiguous" instead of
+    guessed.
+
+    Calls whose callee turns out to be an async def, in this or another
+    file, are flagged as coroutine calls.
+    """
+
+    # Ambiguous calls keep at most this many candidate names
+    max_candidates = 16
+
+    def __init__(self, registry_heap: RegistryHeap, imports_heap: ImportsHeap):
+        self.symbol_index = SymbolIndexer.build(registry_heap)
+        self.imported_files: Dict[str, Set[str]] = {}
+        for imports in imports_heap.imports or []:
+            self.imported_files[imports.file.file_path] = self._imported_files(imports)
+
+        # Secondary indexes so narrowing never scans all candidates of a name
+        self.by_class: Dict[Tuple[str, str], List[Symbol]] = {}
+        self.by_file: Dict[Tuple[str, str], List[Symbol]] = {}
+        self.files_by_name: Dict[str, Set[str]] = {}
+        for name, symbols in self.symbol_index.by_name.items():
+            for symbol in symbols:
+                owner = symbol.name if symbol.kind == "class" else symbol.parent_class
+                if owner:
+                    self.by_class.setdefault((name, owner), []).append(symbol)
+                file_path = symbol.file.file_path
+                self.by_file.setdefault((name, file_path), []).append(symbol)
+                self.files_by_name.setdefault(name, set()).add(file_path)
+
+    @staticmethod
+    def _imported_files(imports) -> Set[str]:
+        """All file paths an import statement may point to."""
+        paths = set()
+        for imp in imports.imports or []:
+            module = imp.imported_from[: -len(".py")]
+            paths.add(imp.imported_from)
+            paths.add(f"{module}/__init__.py")
+            # from pkg import mod
+            paths.add(f"{module}/{imp.imported_name}.py")
+        return paths
+
+    def resolve(self, calls_heap: CallsHeap) -> None:
+        """Resolve all unresolved calls of the heap in place."""
+        for calls in calls_heap.calls or []:
+            caller_path = calls.caller_file.file_path
+            imported = self.imported_files.get(caller_path, set())
+            for call in calls.calls or []:
+                if call.called_func and not call.called_file:
+                    self.resolve_call(call, caller_path, imported)
+                call.coroutine = self.is_coroutine(call)
+
+    def is_coroutine(self, call: Call) -> bool:
+        """Whether every definition the call may run is an async def."""
+        if not call.called_func or not call.called_file:
+            return False
+        symbols = self.by_file.get((call.called_func, call.called_file.file_path))
+        if not symbols:
+            return False
+        if call.parent_class:
+            symbols = [s for s in symbols if s.parent_class == call.parent_class]
+        else:
+            # a method only when its class is known: obj.join() may be any join
+            symbols = [s for s in symbols if s.kind != "method"]
+        return bool(symbols) and all(symbol.is_async for symbol in symbols)
+
+    def resolve_call(self, call: Call, caller_path: str, imported: Set[str]) -> None:
+        if call.parent_class and not self._may_be_class(call.parent_class):
+            # x = helper(); x.m(): its file could not tell helper was no class
+            call.parent_class = None
+        name = call.called_func
+        candidates = self.symbol_index.by_name.get(name)
+        if not candidates:
+            return
+
+        narrowed = self._narrow(call, caller_path, imported)
+        if narrowed is None:
+            narrowed = candidates
+            files = self.files_by_name[name]
+        else:
+            files = {symbol.file.file_path for symbol in narrowed}
+
+        if len(files) == 1:
+            call.called_file = narrowed[0].file
+            call.resolution = "global"
+        else:
+            call.candidates = sorted(symbol.qualified_name for symbol in narrowed)[
+                : self.max_candidates
+            ]
+            call.resolution = "ambiguous"
+
+    def _may_be_class(self, name: str) -> bool:
+        """False for names the registry only knows as functions or methods."""
+        if isinstance(getattr(builtins, name, None), type):
+            return True
+        symbols = self.symbol_index.by_name.get(name)
+        return not symbols or any(symbol.kind == "class" for symbol in symbols)
+
+    def _narrow(
+        self, call: Call, caller_path: str, imported: Set[str]
+    ) -> Optional[List[Symbol]]:
+        """
+        Return the first non-empty group of candidates, most specific first,
+        or None when nothing narrows them down.
+        """
+        name = call.called_func
+
+        if call.parent_class:
+            narrowed = self.by_class.get((name, call.parent_class))
+            if narrowed:
+                return narrowed
+
+        local = self.by_file.get((name, caller_path), [])
+        if call.caller_class:
+            narrowed = [
+                s
+                for s in local
+                if (s.name if s.kind == "class" else s.parent_class)
+                == call.caller_class
+            ]
+            if narrowed:
+                return narrowed
+
+        narrowed = [s for s in local if s.kind != "method"]
+        if narrowed:
+            return narrowed
+
+        narrowed = []
+        for file_path in sorted(imported):
+            narrowed.extend(self.by_file.get((name, file_path), []))
+        if narrowed:
+            return narrowed
+        return None
@@ -0,0 +1,132 @@
+import ast
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+Handler = Callable[[ast.AST], None]
+
+LEAVE = -1  # stack marker: the node's children are done
+
+# fields that never hold child nodes: names, flags and expression contexts
+SCALAR_FIELDS = frozenset(
+    ("ctx", "id", "attr", "arg", "name", "asname", "module", "level")
+    + ("kind", "conversion", "is_async", "simple", "type_comment")
+)
+
+
+class Collector:
+    """
+    Base of the collectors a FileVisitor feeds in one pass over an AST.
+
+    A collector handles node types through methods named after them, as
+    ast.NodeVisitor does: enter_Call(node) runs before the children of
+    every ast.Call, leave_ClassDef(node) after those of every ast.ClassDef.
+    Node types without a handler cost the collector nothing.
+    """
+
+    visitor: Optional["FileVisitor"] = None
+
+    def result(self):
+        """What the collector built, once the visit is over."""
+        raise NotImplementedError
+
+
+class FileVisitor:
+    """
+    Walks a file's AST once, in ast.iter_child_nodes preorder, and calls
+    the enter_/leave_ handlers of all its collectors on the way.
+
+    The walk keeps its own stack, so deeply nested expressions (long call
+    chains, generated literal tables) cannot hit the recursion limit. With
+    max_nodes or max_seconds it stops once the budget is spent and sets
+    stopped; the collectors then hold what they found up to that node.
+    """
+
+    TIME_CHECK_NODES = 1024  # nodes between two clock reads
+
+    def __init__(
+        self,
+        collectors: Iterable[Collector],
+        max_nodes: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+    ):
+        self.collectors: List[Collector] = list(collectors)
+        self.max_nodes = max_nodes
+        self.max_seconds = max_seconds
+        self.depth = 0  # of the node being handled; the tree's root is 0
+        self.nodes = 0  # nodes entered so far
+        self.stopped: Optional[str] = None  # "max_nodes" / "max_seconds"
+        self._enter: Dict[type, Tuple[Handler, ...]] = {}
+        self._leave: Dict[type, Tuple[Handler, ...]] = {}
+        self._fields: Dict[type, Tuple[str, ...]] = {}  # child fields, reversed
+        for collector in self.collectors:
+            collector.visitor = self
+            self._add_handlers(collector)
+
+    def _add_handlers(self, collector: Collector):
+        for name in dir(type(collector)):
+            prefix, _, node_name = name.partition("_")
+            table = {"enter": self._enter, "leave": self._leave}.get(prefix)
+            node_type = getattr(ast, node_name, None) if table is not None else None
+            if isinstance(node_type, type) and issubclass(node_type, ast.AST):
+                table[node_type] = table.get(node_type, ()) + (
+                    getattr(collector, name),
+                )
+
+    def visit(self, tree: ast.AST) -> "FileVisitor":
+        enter_handlers, leave_handlers = self._enter, self._leave
+        node_class = ast.AST
+        max_nodes = self.max_nodes
+        deadline = None
+        if self.max_seconds is not None:
+            deadline = perf_counter() + self.max_seconds
+        check_mask = self.TIME_CHECK_NODES - 1
+
+        # (node, depth) to enter, or (node, LEAVE) once its children are done
+        stack: List[Tuple[ast.AST, int]] = [(tree, 0)]
+        push, pop = stack.append, stack.pop
+        nodes = self.nodes
+        while stack:
+            node, depth = pop()
+            node_type = type(node)
+            if depth == LEAVE:
+                for handler in leave_handlers[node_type]:
+                    handler(node)
+                continue
+
+            nodes += 1
+            if max_nodes is not None and nodes > max_nodes:
+                nodes -= 1
+                self.stopped = "max_nodes"
+                break
+            if deadline is not None and not nodes & check_mask:
+                if perf_counter() > deadline:
+                    self.stopped = "max_seconds"
+                    break
+
+            handlers = enter_handlers.get(node_type)
+            if handlers:
+                self.depth = depth
+                for handler in handlers:
+                    handler(node)
+            if node_type in leave_handlers:
+                push((node, LEAVE))
+
+            fields = self._fields.get(node_type)
+            if fields is None:
+                fields = self._fields[node_type] = tuple(
+                    name
+                    for name in reversed(node_type._fields)
+                    if name not in SCALAR_FIELDS
+                )
+            # children are pushed last to first, so they are entered in order
+            depth += 1
+            for name in fields:
+                value = getattr(node, name, None)
+                if value.__class__ is list:
+                    for item in reversed(value):
+                        if isinstance(item, node_class):
+                            push((item, depth))
+                elif isinstance(value, node_class):
+                    push((value, depth))
+        self.nodes = nodes
+        return self
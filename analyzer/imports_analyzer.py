@@ -1,5 +1,7 @@
 import ast
+from typing import Dict, List, Tuple, Union
 
+from analyzer.file_visitor import Collector
 from models.file import File
 from models.imports import Import, Imports
 
@@ -12,20 +14,54 @@ class ImportsAnalyzer:
         """Return Imports for a single file."""
         imports: Imports.imports = []
         for node in ast.walk(file_ast):
-            if isinstance(node, ast.Import):
-                for alias in node.names:
-                    imports.append(
-                        Import(
-                            imported_name=alias.asname or alias.name,
-                            imported_from=alias.name.replace(".", "/") + ".py",
-                        )
-                    )
-            elif isinstance(node, ast.ImportFrom) and node.module:
-                for alias in node.names:
-                    imports.append(
-                        Import(
-                            imported_name=alias.asname or alias.name,
-                            imported_from=node.module.replace(".", "/") + ".py",
-                        )
-                    )
+            imports.extend(ImportsAnalyzer.imports_of(node))
         return Imports(file=file_meta, imports=imports)
+
+    @staticmethod
+    def imports_of(node: ast.AST) -> List[Import]:
+        """Imports made by one import statement, none for other nodes."""
+        if isinstance(node, ast.Import):
+            return [
+                Import(
+                    imported_name=alias.asname or alias.name,
+                    imported_from=alias.name.replace(".", "/") + ".py",
+                )
+                for alias in node.names
+            ]
+        if isinstance(node, ast.ImportFrom) and node.module:
+            return [
+                Import(
+                    imported_name=alias.asname or alias.name,
+                    imported_from=node.module.replace(".", "/") + ".py",
+                )
+                for alias in node.names
+            ]
+        return []
+
+
+class ImportsCollector(Collector):
+    """
+    Imports of one file for a FileVisitor, in the same order as
+    ImportsAnalyzer (ast.walk is breadth first, the visitor depth first).
+    """
+
+    def __init__(self, file_meta: File):
+        self.file_meta = file_meta
+        self._found: List[Tuple[int, List[Import]]] = []  # (depth, imports)
+
+    def enter_Import(self, node: Union[ast.Import, ast.ImportFrom]):
+        self._found.append((self.visitor.depth, ImportsAnalyzer.imports_of(node)))
+
+    enter_ImportFrom = enter_Import
+
+    def result(self) -> Imports:
+        # a stable sort by depth turns preorder into breadth-first order
+        self._found.sort(key=lambda found: found[0])
+        return Imports(
+            file=self.file_meta,
+            imports=[imp for _, imports in self._found for imp in imports],
+        )
+
+    def imports_map(self) -> Dict[str, str]:
+        """imported name -> imported file, the later import of a name wins."""
+        return {imp.imported_name: imp.imported_from for imp in self.result().imports}
@@ -0,0 +1,247 @@
+import json
+import os
+import sys
+from array import array
+from pathlib import Path
+from types import CodeType
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models.calls import Call, Calls
+
+
+class Heatmap:
+    """
+    Executed-line counts per file: one array('Q') per file starting at its
+    first counted line. Keyed like File.file_path, so a Call's
+    (caller_file.file_path, coordinates.line) looks up the count of its
+    call site directly.
+    """
+
+    def __init__(self):
+        self.files: Dict[str, Tuple[int, array]] = {}  # path -> (first line, counts)
+
+    def add(self, file_path: str, first_line: int, counts: Iterable[int]):
+        """Add counts of consecutive lines starting at first_line."""
+        counts = array("Q", counts)
+        if not counts:
+            return
+        current = self.files.get(file_path)
+        if current is None:
+            self.files[file_path] = (first_line, counts)
+            return
+        first, existing = current
+        start = min(first, first_line)
+        end = max(first + len(existing), first_line + len(counts))
+        if (start, end) != (first, first + len(existing)):
+            grown = array("Q", [0]) * (end - start)
+            grown[first - start : first - start + len(existing)] = existing
+            existing = grown
+        offset = first_line - start
+        for i, count in enumerate(counts):
+            existing[offset + i] += count
+        self.files[file_path] = (start, existing)
+
+    def merge(self, other: "Heatmap") -> "Heatmap":
+        for file_path, (first_line, counts) in other.files.items():
+            self.add(file_path, first_line, counts)
+        return self
+
+    def count(self, file_path: str, line: int) -> int:
+        entry = self.files.get(file_path)
+        if entry is None:
+            return 0
+        first, counts = entry
+        index = line - first
+        return counts[index] if 0 <= index < len(counts) else 0
+
+    def lines(self, file_path: str) -> Iterator[Tuple[int, int]]:
+        """(line, count) of the executed lines of a file."""
+        first, counts = self.files.get(file_path, (0, ()))
+        for index, count in enumerate(counts):
+            if count:
+                yield first + index, count
+
+    def call_counts(
+        self, calls_files: Iterable[Calls]
+    ) -> List[Tuple[Calls, Call, int]]:
+        """Join calls with the execution count of their call site line."""
+        result = []
+        for calls_file in calls_files:
+            file_path = calls_file.caller_file.file_path
+            for call in calls_file.calls or []:
+                if call.coordinates is not None:
+                    hits = self.count(file_path, call.coordinates.line)
+                    result.append((calls_file, call, hits))
+        return result
+
+    # -------------------- SAVE / LOAD --------------------
+
+    def to_dict(self) -> dict:
+        return {
+            "files": {
+                file_path: {"first_line": first, "counts": counts.tolist()}
+                for file_path, (first, counts) in sorted(self.files.items())
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Heatmap":
+        heatmap = cls()
+        for file_path, entry in data.get("files", {}).items():
+            heatmap.add(file_path, entry["first_line"], entry["counts"])
+        return heatmap
+
+    def save(self, path: Path) -> Path:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> "Heatmap":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def merge_files(cls, paths: Iterable[Path]) -> "Heatmap":
+        """Sum the heatmaps saved by several processes."""
+        heatmap = cls()
+        for path in paths:
+            heatmap.merge(cls.load(path))
+        return heatmap
+
+
+class LineHeatmap:
+    """
+    Counts executed lines of the code under base_path.
+
+    Counters live in one preallocated array('Q') per code object, indexed
+    by the line's offset from the code's first line, so counting a line is
+    a dict lookup and an array increment. Uses sys.monitoring LINE events
+    (Python 3.12+) on the coverage tool id, disabled for code outside
+    base_path at its first line; falls back to sys.settrace, which only
+    installs the line callback in frames of base_path code.
+
+    Each process collects its own counts: start one collector per worker
+    process, save each with save_shard() and combine them with
+    Heatmap.merge_files().
+    """
+
+    TOOL_NAME = "code-execution-visualizer-lines"
+
+    def __init__(self, base_path: Path):
+        self.base_path = Path(base_path).resolve()
+        # code -> (first line, counts), None for code that is not counted
+        self._counters: Dict[CodeType, Optional[Tuple[int, array]]] = {}
+        self._files: Dict[str, Optional[str]] = {}  # co_filename -> file_path
+        self._tool_id: Optional[int] = None
+        self._disable = None  # sys.monitoring.DISABLE
+
+    # -------------------- START / STOP --------------------
+
+    def start(self):
+        monitoring = getattr(sys, "monitoring", None)
+        if monitoring is not None:
+            try:
+                monitoring.use_tool_id(monitoring.COVERAGE_ID, self.TOOL_NAME)
+            except ValueError:
+                monitoring = None  # coverage.py or similar holds the id
+        if monitoring is None:
+            sys.settrace(self._on_call)
+            return
+        self._tool_id = monitoring.COVERAGE_ID
+        self._disable = monitoring.DISABLE
+        monitoring.register_callback(
+            self._tool_id, monitoring.events.LINE, self._on_line
+        )
+        monitoring.set_events(self._tool_id, monitoring.events.LINE)
+
+    def stop(self):
+        if self._tool_id is None:
+            sys.settrace(None)
+            return
+        monitoring = sys.monitoring
+        monitoring.set_events(self._tool_id, 0)
+        monitoring.register_callback(self._tool_id, monitoring.events.LINE, None)
+        monitoring.free_tool_id(self._tool_id)
+        self._tool_id = None
+
+    def __enter__(self) -> "LineHeatmap":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    # -------------------- COUNTING --------------------
+
+    def _file_path(self, filename: str) -> Optional[str]:
+        """Path relative to base_path, None for files outside it."""
+        if filename not in self._files:
+            file_path = None
+            if not filename.startswith("<"):
+                try:
+                    path = Path(filename).resolve()
+                    if path != Path(__file__).resolve():
+                        file_path = str(path.relative_to(self.base_path))
+                except (OSError, ValueError):
+                    pass
+            self._files[filename] = file_path
+        return self._files[filename]
+
+    def _counter(self, code: CodeType) -> Optional[Tuple[int, array]]:
+        if code in self._counters:
+            return self._counters[code]
+        counter = None
+        if self._file_path(code.co_filename) is not None:
+            lines = [line for _, _, line in code.co_lines() if line is not None]
+            first = min(lines, default=code.co_firstlineno)
+            last = max(lines, default=first)
+            counter = (first, array("Q", [0]) * (last - first + 1))
+        self._counters[code] = counter
+        return counter
+
+    # sys.monitoring callback
+
+    def _on_line(self, code: CodeType, line: int):
+        counter = self._counters.get(code)
+        if counter is None:
+            counter = self._counter(code)
+            if counter is None:
+                return self._disable
+        first, counts = counter
+        counts[line - first] += 1
+
+    # sys.settrace callbacks
+
+    def _on_call(self, frame, event: str, arg):
+        counter = self._counters.get(frame.f_code)
+        if counter is None:
+            counter = self._counter(frame.f_code)
+            if counter is None:
+                return None  # no line events for this frame
+        first, counts = counter
+
+        def on_line(frame, event, arg):
+            if event == "line":
+                counts[frame.f_lineno - first] += 1
+            return on_line
+
+        return on_line
+
+    # -------------------- RESULTS --------------------
+
+    def heatmap(self) -> Heatmap:
+        heatmap = Heatmap()
+        for code, counter in self._counters.items():
+            if counter is not None and any(counter[1]):
+                first, counts = counter
+                if first == 0:  # the RESUME of a module body without code
+                    first, counts = 1, counts[1:]
+                heatmap.add(self._file_path(code.co_filename), first, counts)
+        return heatmap
+
+    def save_shard(self, folder: Path) -> Path:
+        """Save this process' counts as heatmap-<pid>.json in folder."""
+        folder.mkdir(parents=True, exist_ok=True)
+        return self.heatmap().save(folder / f"heatmap-{os.getpid()}.json")
@@ -1,6 +1,7 @@
 import ast
-from typing import List, Optional, cast
+from typing import Dict, List, Optional, Union, cast
 
+from analyzer.file_visitor import Collector
 from models.file import File
 from models.registry import RegistryClass, RegistryFile, RegistryFunction
 
@@ -9,39 +10,33 @@ class Register:
     """Builds a Registry from a file's AST, including function parameters and type hints."""
 
     @staticmethod
-    def process_node(
+    def make_node(
         node: ast.AST,
         file_node: RegistryFile,
         parent_class: Optional[RegistryClass] = None,
         parent_function: Optional[RegistryFunction] = None,
-    ):
-        """Recursively process AST nodes to populate RegistryFile with classes and functions."""
+    ) -> Optional[Union[RegistryClass, RegistryFunction]]:
+        """Registry node of a class or function definition, added to its parent."""
 
         # --- Handle class definitions ---
         if isinstance(node, ast.ClassDef):
-            cls_node = RegistryClass(
+            reg_node = RegistryClass(
                 class_name=node.name,
                 parent_file=file_node,
                 parent_class=parent_class,
                 parent_function=parent_function,
             )
 
-            # Recurse into class body
-            for n in node.body:
-                Register.process_node(
-                    n, file_node, parent_class=cls_node, parent_function=None
-                )
-
             # Append to parent
             if parent_class:
-                parent_class.classes.append(cls_node)
+                parent_class.classes.append(reg_node)
             elif parent_function:
-                parent_function.functions.append(cls_node)
+                parent_function.functions.append(reg_node)
             else:
-                file_node.classes.append(cls_node)
+                file_node.classes.append(reg_node)
 
-        # --- Handle function definitions ---
-        elif isinstance(node, ast.FunctionDef):
+        # --- Handle function definitions, async def included ---
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
             params: List[str] = []
             param_types: List[Optional[str]] = []
 
@@ -54,28 +49,63 @@ class Register:
                 else:
                     param_types.append(None)
 
-            func_node = RegistryFunction(
+            reg_node = RegistryFunction(
                 function_name=node.name,
                 parameters=params,
                 param_types=param_types,
+                is_async=isinstance(node, ast.AsyncFunctionDef),
+                decorators=[Register.decorator_name(d) for d in node.decorator_list],
                 parent_file=file_node,
                 parent_class=parent_class,
                 parent_function=parent_function,
             )
 
-            # Recurse into function body
-            for n in node.body:
-                Register.process_node(
-                    n, file_node, parent_class=None, parent_function=func_node
-                )
-
             # Append to parent
             if parent_class:
-                parent_class.class_functions.append(func_node)
+                parent_class.class_functions.append(reg_node)
             elif parent_function:
-                parent_function.functions.append(func_node)
+                parent_function.functions.append(reg_node)
             else:
-                file_node.functions.append(func_node)
+                file_node.functions.append(reg_node)
+
+        else:
+            return None
+
+        return reg_node
+
+    @staticmethod
+    def decorator_name(node: ast.expr) -> str:
+        """Name a decorator is applied by: app.route for @app.route("/")."""
+        if isinstance(node, ast.Call):
+            node = node.func
+        try:
+            return ast.unparse(node)
+        except RecursionError:
+            return "<decorator>"
+
+    @staticmethod
+    def process_node(
+        node: ast.AST,
+        file_node: RegistryFile,
+        parent_class: Optional[RegistryClass] = None,
+        parent_function: Optional[RegistryFunction] = None,
+    ):
+        """
+        Populate RegistryFile with the classes and functions of a node and
+        of the bodies nested in it, with an explicit stack instead of recursion.
+        """
+        stack = [(node, parent_class, parent_function)]
+        while stack:
+            node, parent_class, parent_function = stack.pop()
+            reg_node = Register.make_node(
+                node, file_node, parent_class, parent_function
+            )
+
+            # Walk into class / function body, first statement on top
+            if isinstance(reg_node, RegistryClass):
+                stack.extend((n, reg_node, None) for n in reversed(node.body))
+            elif isinstance(reg_node, RegistryFunction):
+                stack.extend((n, None, reg_node) for n in reversed(node.body))
 
     @staticmethod
     def build_registry(data: ast.Module, file_meta: File) -> RegistryFile:
@@ -84,3 +114,47 @@ class Register:
         for node in data.body:
             Register.process_node(node, file_node)
         return file_node
+
+
+class RegistryCollector(Collector):
+    """
+    Registry of one file for a FileVisitor, with the same classes and
+    functions as Register.build_registry: definitions directly in the body
+    of the module or of a registered class or function.
+    """
+
+    def __init__(self, file_meta: File):
+        self.file_node = RegistryFile(file=file_meta)
+        # id(definition node) -> its registry node, until the visitor enters it
+        self._nodes: Dict[int, Union[RegistryClass, RegistryFunction]] = {}
+
+    def enter_Module(self, node: ast.Module):
+        self._register_body(node.body, None, None)
+
+    def enter_ClassDef(self, node: ast.ClassDef):
+        reg_node = self._nodes.pop(id(node), None)
+        if reg_node is not None:
+            self._register_body(node.body, reg_node, None)
+
+    def enter_FunctionDef(self, node: ast.FunctionDef):
+        reg_node = self._nodes.pop(id(node), None)
+        if reg_node is not None:
+            self._register_body(node.body, None, reg_node)
+
+    enter_AsyncFunctionDef = enter_FunctionDef
+
+    def _register_body(
+        self,
+        body: List[ast.stmt],
+        parent_class: Optional[RegistryClass],
+        parent_function: Optional[RegistryFunction],
+    ):
+        for n in body:
+            reg_node = Register.make_node(
+                n, self.file_node, parent_class, parent_function
+            )
+            if reg_node is not None:
+                self._nodes[id(n)] = reg_node
+
+    def result(self) -> RegistryFile:
+        return self.file_node
@@ -1,72 +1,293 @@
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-from models.versions import FileChange, FunctionChange
+from models.versions import ClassChange, FileChange, FunctionChange, FunctionSignature
 
 
 class RoadmapDiff:
     """Responsible for extracting and comparing functions/classes per file."""
 
-    def __init__(self, roadmap: dict):
+    def __init__(self, roadmap: Optional[dict] = None):
         self.roadmap = roadmap
-        self.funcs_by_file = self._functions_by_file(roadmap)
+        # file -> signature -> function dict, in definition order
+        self.funcs_by_file: Dict[str, Dict[FunctionSignature, dict]] = {}
+        # file -> qualified class name -> class name and where it is defined;
+        # its methods and nested classes are found through _owner_class
+        self.classes_by_file: Dict[str, Dict[str, dict]] = {}
+        if roadmap is not None:
+            self._collect(roadmap)
 
-    def _functions_by_file(self, roadmap: dict) -> Dict[str, List[dict]]:
-        """Collect all functions per file recursively."""
-        funcs_by_file = {}
+    def _collect(self, roadmap: dict):
+        """Collect all functions and classes per file recursively."""
+        for entry in roadmap.get("map", []):
+            self.add_entry(entry)
+
+    def add_entry(self, entry: dict):
+        """Collect functions and classes of a single serialized Dependency."""
+        file_path = entry["registry"]["file"]["file_path"]
+        funcs: Dict[FunctionSignature, dict] = {}
+        classes: Dict[str, dict] = {}
+        self._collect_scope(
+            entry["registry"].get("classes", []),
+            entry["registry"].get("functions", []),
+            funcs,
+            classes,
+            scope=[],
+        )
+        self.funcs_by_file[file_path] = funcs
+        self.classes_by_file[file_path] = classes
+
+    # -------------------- INDEX --------------------
+
+    def to_index(self) -> Dict[str, dict]:
+        """
+        Return a compact JSON-serializable form of the collected signatures:
+        functions with their signature, classes only as
+        [qualified name, parent_class, parent_function, owner class].
+        """
+        return {
+            file: {
+                "functions": [
+                    [sig.qualified_name, f]
+                    for sig, f in self.funcs_by_file[file].items()
+                ],
+                "classes": [
+                    [
+                        name,
+                        entry["parent_class"],
+                        entry["parent_function"],
+                        entry["_owner_class"],
+                    ]
+                    for name, entry in self.classes_by_file.get(file, {}).items()
+                ],
+            }
+            for file in self.funcs_by_file
+        }
+
+    @classmethod
+    def from_index(cls, index: Dict[str, dict]) -> "RoadmapDiff":
+        """Rebuild a RoadmapDiff from to_index() output without the roadmap."""
+        diff = cls()
+        for file, data in index.items():
+            diff.funcs_by_file[file] = {
+                FunctionSignature(
+                    qualified_name=name,
+                    parameters=tuple(f.get("parameters") or []),
+                    param_types=tuple(f.get("param_types") or []),
+                ): f
+                for name, f in data.get("functions", [])
+            }
+            diff.classes_by_file[file] = dict(
+                cls._index_class(*item) for item in data.get("classes", [])
+            )
+        return diff
+
+    @staticmethod
+    def _index_class(name: str, *where) -> Tuple[str, dict]:
+        if len(where) == 1:
+            # older indexes: [name, {"class": ..., "parent_class": ..., ...}]
+            entry = where[0]
+            where = (
+                entry["parent_class"],
+                entry["parent_function"],
+                entry["_owner_class"],
+            )
+        parent_class, parent_function, owner_class = where
+        return name, {
+            "class_name": name.rsplit(".", 1)[-1],
+            "parent_class": parent_class,
+            "parent_function": parent_function,
+            "_owner_class": owner_class,
+        }
 
-        def collect_funcs(func_list, parent_class=None, parent_function=None):
-            res = []
-            for f in func_list:
-                func_dict = {
+    def _collect_scope(
+        self,
+        class_list,
+        func_list,
+        funcs: Dict[FunctionSignature, dict],
+        classes: Dict[str, dict],
+        scope: List[str],
+        parent_class: Optional[str] = None,
+        parent_function: Optional[str] = None,
+        owner_class: Optional[str] = None,
+    ):
+        for c in class_list or []:
+            self._collect_class(
+                c, funcs, classes, scope, parent_class, parent_function, owner_class
+            )
+
+        for f in func_list or []:
+            if "class_name" in f:
+                # functions may hold nested classes
+                self._collect_class(
+                    f, funcs, classes, scope, parent_class, parent_function, owner_class
+                )
+                continue
+
+            qualified_name = ".".join(scope + [f["function_name"]])
+            signature = FunctionSignature(
+                qualified_name=qualified_name,
+                parameters=tuple(f.get("parameters") or []),
+                param_types=tuple(f.get("param_types") or []),
+            )
+            funcs.setdefault(
+                signature,
+                {
                     "function_name": f["function_name"],
                     "parameters": f.get("parameters", []),
                     "param_types": f.get("param_types", []),
                     "parent_class": parent_class,
                     "parent_function": parent_function,
-                }
-                res.append(func_dict)
-                if f.get("functions"):
-                    res.extend(
-                        collect_funcs(
-                            f["functions"],
-                            parent_class=parent_class,
-                            parent_function=f["function_name"],
-                        )
-                    )
-            return res
-
-        for entry in roadmap.get("map", []):
-            file_path = entry["registry"]["file"]["file_path"]
-            funcs_by_file[file_path] = collect_funcs(
-                entry["registry"].get("functions", [])
+                    "_owner_class": owner_class,
+                },
             )
+            if f.get("functions"):
+                self._collect_scope(
+                    [],
+                    f["functions"],
+                    funcs,
+                    classes,
+                    scope + [f["function_name"]],
+                    parent_class=parent_class,
+                    parent_function=f["function_name"],
+                    owner_class=owner_class,
+                )
+
+    def _collect_class(
+        self, c, funcs, classes, scope, parent_class, parent_function, owner_class
+    ):
+        class_scope = scope + [c["class_name"]]
+        qualified_name = ".".join(class_scope)
+        classes.setdefault(
+            qualified_name,
+            {
+                "class_name": c["class_name"],
+                "parent_class": parent_class,
+                "parent_function": parent_function,
+                "_owner_class": owner_class,
+            },
+        )
+        self._collect_scope(
+            c.get("classes", []),
+            c.get("class_functions", []),
+            funcs,
+            classes,
+            class_scope,
+            parent_class=c["class_name"],
+            parent_function=None,
+            owner_class=qualified_name,
+        )
 
-        return funcs_by_file
+    # -------------------- DIFF --------------------
 
     def diff(self, other: "RoadmapDiff") -> List[FileChange]:
         """Compare self to another roadmap and return structured file changes."""
-        files_changes = []
         all_files = set(self.funcs_by_file.keys()) | set(other.funcs_by_file.keys())
+        return self.diff_files(other, all_files)
 
-        for file in all_files:
-            added_funcs = [
-                FunctionChange(**f)
-                for f in other.funcs_by_file.get(file, [])
-                if f not in self.funcs_by_file.get(file, [])
-            ]
-            removed_funcs = [
-                FunctionChange(**f)
-                for f in self.funcs_by_file.get(file, [])
-                if f not in other.funcs_by_file.get(file, [])
-            ]
-            if added_funcs or removed_funcs:
-                files_changes.append(
-                    FileChange(
-                        file_path=file,
-                        added_functions=added_funcs,
-                        removed_functions=removed_funcs,
-                        added_classes=[],
-                        removed_classes=[],
-                    )
-                )
+    def diff_files(
+        self, other: "RoadmapDiff", files: Iterable[str]
+    ) -> List[FileChange]:
+        """Compare only the given files."""
+        files_changes = []
+        for file in files:
+            change = self.diff_file(other, file)
+            if change:
+                files_changes.append(change)
         return files_changes
+
+    def diff_file(self, other: "RoadmapDiff", file: str) -> Optional[FileChange]:
+        """Return what changed in a single file, or None if nothing did."""
+        old_funcs = self.funcs_by_file.get(file, {})
+        new_funcs = other.funcs_by_file.get(file, {})
+        old_classes = self.classes_by_file.get(file, {})
+        new_classes = other.classes_by_file.get(file, {})
+
+        added_class_names = new_classes.keys() - old_classes.keys()
+        removed_class_names = old_classes.keys() - new_classes.keys()
+
+        added_funcs = self._function_changes(new_funcs, old_funcs, added_class_names)
+        removed_funcs = self._function_changes(
+            old_funcs, new_funcs, removed_class_names
+        )
+        added_classes = self._class_changes(
+            new_classes, new_funcs, added_class_names, file
+        )
+        removed_classes = self._class_changes(
+            old_classes, old_funcs, removed_class_names, file
+        )
+
+        if added_funcs or removed_funcs or added_classes or removed_classes:
+            return FileChange(
+                file_path=file,
+                added_functions=added_funcs,
+                removed_functions=removed_funcs,
+                added_classes=added_classes,
+                removed_classes=removed_classes,
+            )
+        return None
+
+    @staticmethod
+    def _function_changes(
+        funcs: Dict[FunctionSignature, dict],
+        others: Dict[FunctionSignature, dict],
+        changed_classes: Set[str],
+    ) -> List[FunctionChange]:
+        """Functions missing from others, except those reported with their class."""
+        return [
+            RoadmapDiff._function_change(f)
+            for sig, f in funcs.items()
+            if sig not in others and f["_owner_class"] not in changed_classes
+        ]
+
+    @staticmethod
+    def _class_changes(
+        classes: Dict[str, dict],
+        funcs: Dict[FunctionSignature, dict],
+        changed: Set[str],
+        file: str,
+    ) -> List[ClassChange]:
+        """Outermost changed classes; nested ones are part of their parent."""
+        if not changed:
+            return []
+        # class -> classes and methods directly in its body
+        members: Dict[str, tuple] = {}
+        for name, entry in classes.items():
+            if entry["_owner_class"] and entry["parent_function"] is None:
+                members.setdefault(entry["_owner_class"], ([], []))[0].append(name)
+        for f in funcs.values():
+            if f["_owner_class"] and f["parent_function"] is None:
+                members.setdefault(f["_owner_class"], ([], []))[1].append(f)
+        return [
+            RoadmapDiff._class_change(name, classes, members, file)
+            for name, entry in classes.items()
+            if name in changed and entry["_owner_class"] not in changed
+        ]
+
+    @staticmethod
+    def _function_change(f: dict) -> FunctionChange:
+        return FunctionChange(**{k: v for k, v in f.items() if not k.startswith("_")})
+
+    @staticmethod
+    def _class_change(
+        name: str, classes: Dict[str, dict], members: Dict[str, tuple], file: str
+    ) -> ClassChange:
+        entry = classes[name]
+        nested, methods = members.get(name, ((), ()))
+        return ClassChange(
+            class_name=entry["class_name"],
+            nested_classes=[
+                RoadmapDiff._class_change(sub, classes, members, file) for sub in nested
+            ],
+            class_functions=[
+                FunctionChange(
+                    function_name=f["function_name"],
+                    parameters=f["parameters"],
+                    param_types=f["param_types"],
+                    parent_class=entry["class_name"],
+                )
+                for f in methods
+            ],
+            parent_class=entry["parent_class"],
+            parent_file=file,
+            parent_function=entry["parent_function"],
+        )
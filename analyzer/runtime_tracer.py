@@ -0,0 +1,352 @@
+import dis
+import inspect
+import sys
+from array import array
+from pathlib import Path
+from threading import get_ident
+from time import perf_counter_ns
+from types import CodeType
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from models.calls import Call, Calls, CallStats
+from models.file import File
+
+# -------------------- EVENTS --------------------
+START, RESUME, RETURN, YIELD, UNWIND = range(5)
+EVENT_NAMES = ("start", "resume", "return", "yield", "unwind")
+
+ROOT = 0  # caller slot of calls entered from untraced code
+
+GENERATOR_FLAGS = (
+    inspect.CO_GENERATOR | inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR
+)
+# sys.setprofile reports generator resumes as calls; RESUME's argument (3.11+)
+# tells the first entry (0) from a resume
+RESUME_OPCODE = dis.opmap.get("RESUME")
+YIELD_OPCODE = dis.opmap["YIELD_VALUE"]
+
+
+class EventRing:
+    """
+    Fixed-size ring buffer of the latest (event, code id, time) records,
+    kept in preallocated arrays so recording allocates nothing.
+    """
+
+    def __init__(self, capacity: int = 1 << 16):
+        self.capacity = capacity
+        self.events = bytearray(capacity)
+        self.codes = array("i", [0]) * capacity
+        self.times = array("q", [0]) * capacity
+        self.count = 0  # records ever written, including overwritten ones
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def __iter__(self) -> Iterator[Tuple[int, int, int]]:
+        """Retained records, oldest first."""
+        first = self.count - len(self)
+        for n in range(first, self.count):
+            i = n % self.capacity
+            yield self.events[i], self.codes[i], self.times[i]
+
+
+class RuntimeTracer:
+    """
+    Records the calls between functions of one code base while a program
+    runs, for the thread that started it.
+
+    Uses sys.monitoring (Python 3.12+): events of code outside base_path
+    are disabled at their first occurrence, so foreign code runs at full
+    speed. Older interpreters, or a taken profiler tool id, fall back to
+    sys.setprofile, where every call of any code costs a callback.
+
+    Calls are aggregated per caller -> callee code object pair (count,
+    inclusive and self time); the latest events are also kept in an
+    EventRing to show the actual call sequence. Comprehensions and
+    lambdas are folded into the function that contains them.
+    """
+
+    TOOL_NAME = "code-execution-visualizer"
+
+    def __init__(self, base_path: Path, ring_size: int = 1 << 16):
+        self.base_path = Path(base_path).resolve()
+        self.ring = EventRing(ring_size)
+        self.codes: List[Optional[CodeType]] = [None]  # code id -> code; 0 is ROOT
+        self._code_ids: Dict[CodeType, int] = {}  # -1 for untraced code
+        self._in_base: Dict[str, bool] = {}  # co_filename -> inside base_path
+        self._bytecode: Dict[int, bytes] = {}  # code id -> co_code of generators
+        # (caller id << 32 | callee id) -> [count, total ns, self ns, first event]
+        self.stats: Dict[int, List[int]] = {}
+        # frames in progress:
+        # [code id, caller id, started ns, ns in callees, is call, event number]
+        self._stack: List[list] = []
+        self._thread: Optional[int] = None
+        self._tool_id: Optional[int] = None
+        self._disable = None  # sys.monitoring.DISABLE
+
+    # -------------------- START / STOP --------------------
+
+    def start(self):
+        self._thread = get_ident()
+        monitoring = getattr(sys, "monitoring", None)
+        if monitoring is not None:
+            try:
+                monitoring.use_tool_id(monitoring.PROFILER_ID, self.TOOL_NAME)
+            except ValueError:
+                monitoring = None  # another profiler holds the id
+        if monitoring is None:
+            sys.setprofile(self._on_profile)
+            return
+
+        self._tool_id = tool = monitoring.PROFILER_ID
+        self._disable = monitoring.DISABLE
+        events = monitoring.events
+        callbacks = {
+            events.PY_START: self._on_start,
+            events.PY_RESUME: self._on_resume,
+            events.PY_RETURN: self._on_return,
+            events.PY_YIELD: self._on_yield,
+            events.PY_UNWIND: self._on_unwind,
+        }
+        for event, callback in callbacks.items():
+            monitoring.register_callback(tool, event, callback)
+        mask = 0
+        for event in callbacks:
+            mask |= event
+        monitoring.set_events(tool, mask)
+
+    def stop(self):
+        if self._tool_id is None:
+            sys.setprofile(None)
+        else:
+            monitoring = sys.monitoring
+            monitoring.set_events(self._tool_id, 0)
+            for event in (
+                monitoring.events.PY_START,
+                monitoring.events.PY_RESUME,
+                monitoring.events.PY_RETURN,
+                monitoring.events.PY_YIELD,
+                monitoring.events.PY_UNWIND,
+            ):
+                monitoring.register_callback(self._tool_id, event, None)
+            monitoring.free_tool_id(self._tool_id)
+            self._tool_id = None
+        # frames still open (tracing stopped inside them) end now
+        while self._stack:
+            self._leave(self._stack[-1][0], RETURN)
+
+    def __enter__(self) -> "RuntimeTracer":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    # -------------------- RECORDING --------------------
+
+    def _code_id(self, code: CodeType) -> int:
+        """Id of a traced code object, -1 for code that is not traced."""
+        code_id = self._code_ids.get(code)
+        if code_id is not None:
+            return code_id
+        filename = code.co_filename
+        in_base = self._in_base.get(filename)
+        if in_base is None and filename.startswith("<"):
+            in_base = False  # <frozen ...>, <string>, <stdin>
+        if in_base is None:
+            try:
+                path = Path(filename).resolve()
+                path.relative_to(self.base_path)
+                # the tracer itself may live inside the traced code base
+                in_base = path != Path(__file__).resolve()
+            except (OSError, ValueError):
+                in_base = False
+            self._in_base[filename] = in_base
+        name = code.co_name
+        # class bodies and comprehensions run as part of their enclosing code
+        is_function = code.co_flags & inspect.CO_NEWLOCALS and not name.startswith("<")
+        if in_base and (is_function or name == "<module>"):
+            code_id = len(self.codes)
+            self.codes.append(code)
+        else:
+            code_id = -1
+        self._code_ids[code] = code_id
+        return code_id
+
+    def _enter(self, code_id: int, event: int):
+        now = perf_counter_ns()
+        stack = self._stack
+        caller = stack[-1][0] if stack else ROOT
+        ring = self.ring
+        stack.append([code_id, caller, now, 0, event == START, ring.count])
+        i = ring.count % ring.capacity
+        ring.events[i] = event
+        ring.codes[i] = code_id
+        ring.times[i] = now
+        ring.count += 1
+
+    def _leave(self, code_id: int, event: int):
+        stack = self._stack
+        # frames entered before tracing started return without an entry
+        if not stack or stack[-1][0] != code_id:
+            return
+        now = perf_counter_ns()
+        _, caller, started, callee_ns, is_call, event_number = stack.pop()
+        elapsed = now - started
+        if stack:
+            stack[-1][3] += elapsed
+        key = caller << 32 | code_id
+        stats = self.stats.get(key)
+        if stats is None:
+            self.stats[key] = [int(is_call), elapsed, elapsed - callee_ns, event_number]
+        else:
+            stats[0] += is_call
+            stats[1] += elapsed
+            stats[2] += elapsed - callee_ns
+        ring = self.ring
+        i = ring.count % ring.capacity
+        ring.events[i] = event
+        ring.codes[i] = code_id
+        ring.times[i] = now
+        ring.count += 1
+
+    # sys.monitoring callbacks
+
+    def _on_start(self, code: CodeType, offset: int):
+        code_id = self._code_ids.get(code)
+        if code_id is None:
+            code_id = self._code_id(code)
+        if code_id < 0:
+            return self._disable
+        if get_ident() == self._thread:
+            self._enter(code_id, START)
+
+    def _on_resume(self, code: CodeType, offset: int):
+        code_id = self._code_ids.get(code)
+        if code_id is None:
+            code_id = self._code_id(code)
+        if code_id < 0:
+            return self._disable
+        if get_ident() == self._thread:
+            self._enter(code_id, RESUME)
+
+    def _on_return(self, code: CodeType, offset: int, retval):
+        code_id = self._code_ids.get(code)
+        if code_id is None:
+            code_id = self._code_id(code)
+        if code_id < 0:
+            return self._disable
+        if get_ident() == self._thread:
+            self._leave(code_id, RETURN)
+
+    def _on_yield(self, code: CodeType, offset: int, retval):
+        code_id = self._code_ids.get(code)
+        if code_id is None:
+            code_id = self._code_id(code)
+        if code_id < 0:
+            return self._disable
+        if get_ident() == self._thread:
+            self._leave(code_id, YIELD)
+
+    def _on_unwind(self, code: CodeType, offset: int, exception):
+        # PY_UNWIND cannot be disabled per location
+        code_id = self._code_id(code)
+        if code_id >= 0 and get_ident() == self._thread:
+            self._leave(code_id, UNWIND)
+
+    # sys.setprofile callback
+
+    def _on_profile(self, frame, event: str, arg):
+        if event == "call":
+            code = frame.f_code
+            code_id = self._code_id(code)
+            if code_id >= 0:
+                event = START
+                if code.co_flags & GENERATOR_FLAGS and RESUME_OPCODE is not None:
+                    bytecode = self._generator_bytecode(code_id, code)
+                    lasti = frame.f_lasti
+                    if bytecode[lasti] == RESUME_OPCODE and bytecode[lasti + 1]:
+                        event = RESUME
+                self._enter(code_id, event)
+        elif event == "return":
+            code = frame.f_code
+            code_id = self._code_id(code)
+            if code_id >= 0:
+                event = RETURN
+                if code.co_flags & GENERATOR_FLAGS:
+                    bytecode = self._generator_bytecode(code_id, code)
+                    if bytecode[frame.f_lasti] == YIELD_OPCODE:
+                        event = YIELD
+                self._leave(code_id, event)
+
+    def _generator_bytecode(self, code_id: int, code: CodeType) -> bytes:
+        # co_code is rebuilt on every access since 3.11
+        bytecode = self._bytecode.get(code_id)
+        if bytecode is None:
+            bytecode = self._bytecode[code_id] = code.co_code
+        return bytecode
+
+    # -------------------- RESULTS --------------------
+
+    def describe(self, code_id: int) -> Tuple[File, Optional[str], Optional[str]]:
+        """(file, class name, function name) of a traced code object."""
+        code = self.codes[code_id]
+        path = Path(code.co_filename).resolve().relative_to(self.base_path)
+        file = File(file_name=path.name, file_format=path.suffix, file_path=str(path))
+        parts = getattr(code, "co_qualname", code.co_name).split(".")
+        func = parts[-1] if parts[-1] != "<module>" else None
+        cls = parts[-2] if len(parts) > 1 and parts[-2] != "<locals>" else None
+        return file, cls, func
+
+    def sequence(self) -> Iterator[Tuple[str, str, Optional[str], Optional[str], int]]:
+        """Latest (event, file path, class, function, ns) records, oldest first."""
+        for event, code_id, ns in self.ring:
+            file, cls, func = self.describe(code_id)
+            yield EVENT_NAMES[event], file.file_path, cls, func, ns
+
+    def calls(self) -> List[Calls]:
+        """
+        Traced calls as Calls per caller file, in order of first call.
+        Calls entered from untraced code have no caller and module bodies
+        run by imports are no calls, so both are left out.
+        """
+        described: Dict[int, Tuple[File, Optional[str], Optional[str]]] = {}
+
+        def describe(code_id: int):
+            if code_id not in described:
+                described[code_id] = self.describe(code_id)
+            return described[code_id]
+
+        by_file: Dict[str, Calls] = {}
+        ordered = sorted(self.stats.items(), key=lambda item: item[1][3])
+        for key, (count, total_ns, self_ns, first_seen) in ordered:
+            caller_id, callee_id = key >> 32, key & 0xFFFFFFFF
+            if caller_id == ROOT or not count:
+                continue
+            called_file, parent_class, called_func = describe(callee_id)
+            if called_func is None:
+                continue
+            caller_file, caller_class, caller_func = describe(caller_id)
+            calls = by_file.get(caller_file.file_path)
+            if calls is None:
+                calls = by_file[caller_file.file_path] = Calls(
+                    caller_file=caller_file, calls=[]
+                )
+            calls.calls.append(
+                Call(
+                    called_file=called_file,
+                    caller_class=caller_class,
+                    caller_func=caller_func,
+                    parent_class=parent_class,
+                    called_func=called_func,
+                    resolution="runtime",
+                    runtime=CallStats(
+                        count=count,
+                        total_time=total_ns / 1e9,
+                        self_time=self_ns / 1e9,
+                        first_seen=first_seen,
+                    ),
+                )
+            )
+        return list(by_file.values())
@@ -0,0 +1,68 @@
+import io
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from models.calls import Call
+from utils.hasher import FileHasher
+
+
+class SourceText:
+    """
+    Source of one file, cut into the text of AST spans on demand.
+
+    Spans are [line, char, end_line, end_char] as ast gives them: lines
+    from 1, chars as UTF-8 byte offsets into the line. Lines are split and
+    encoded the first time a span needs them, so spans that are never
+    read cost nothing.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self._lines: Optional[List[str]] = None
+        self._encoded: Dict[int, bytes] = {}  # line index -> non-ASCII line
+
+    @classmethod
+    def read(cls, path: Path, source_hash: Optional[str] = None) -> "SourceText":
+        """Read a file, checking it is still the source that was analyzed."""
+        source = Path(path).read_text(encoding="utf-8")
+        if source_hash is not None:
+            if FileHasher.compute_source_hash(source) != source_hash:
+                raise ValueError(f"{path} changed since it was analyzed")
+        return cls(source)
+
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            # split like the tokenizer: on \n, \r\n and \r only
+            self._lines = io.StringIO(self.source, newline="").readlines()
+        return self._lines
+
+    def _cut(self, index: int, start: int, end: Optional[int]) -> str:
+        line = self.lines()[index]
+        if line.isascii():
+            return line[start:end]
+        encoded = self._encoded.get(index)
+        if encoded is None:
+            encoded = self._encoded[index] = line.encode("utf-8")
+        return encoded[start:end].decode("utf-8", errors="replace")
+
+    def segment(self, span: Optional[Sequence[int]]) -> Optional[str]:
+        """Text of a [line, char, end_line, end_char] span."""
+        if not span:
+            return None
+        line, char, end_line, end_char = span
+        if line == end_line:
+            return self._cut(line - 1, char, end_char)
+        return (
+            self._cut(line - 1, char, None)
+            + "".join(self.lines()[line : end_line - 1])
+            + self._cut(end_line - 1, 0, end_char)
+        )
+
+    def arguments(self, call: Call) -> Optional[List[Optional[str]]]:
+        """A call's argument texts, whether it holds texts or spans."""
+        if call.arguments is None:
+            return None
+        return [
+            arg if arg is None or isinstance(arg, str) else self.segment(arg)
+            for arg in call.arguments
+        ]
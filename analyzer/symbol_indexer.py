@@ -0,0 +1,97 @@
+from typing import List, Optional
+
+from models.file import File
+from models.hash import Symbol, SymbolIndex
+from models.registry import RegistryClass, RegistryFile, RegistryHeap
+
+
+class SymbolIndexer:
+    """Builds a SymbolIndex from registries for O(1) symbol lookups."""
+
+    @staticmethod
+    def module_path(file_path: str) -> str:
+        """Turn 'pkg/sub/mod.py' into 'pkg.sub.mod' ('pkg/__init__.py' -> 'pkg')."""
+        module = file_path.replace("\\", "/")
+        if module.endswith(".py"):
+            module = module[: -len(".py")]
+        parts = [p for p in module.split("/") if p]
+        if parts and parts[-1] == "__init__":
+            parts.pop()
+        return ".".join(parts)
+
+    @staticmethod
+    def build(registry_heap: RegistryHeap) -> SymbolIndex:
+        """
+        Index every top-level function, class and method.
+        Candidates for a bare name keep registry order, so the first
+        candidate is the definition a linear registry scan would find.
+        """
+        symbol_index = SymbolIndex()
+        for reg_file in registry_heap.files:
+            SymbolIndexer.add_file(symbol_index, reg_file)
+        return symbol_index
+
+    @staticmethod
+    def add_file(symbol_index: SymbolIndex, reg_file: RegistryFile) -> None:
+        """Add all symbols of a single registry file to the index."""
+        module = SymbolIndexer.module_path(reg_file.file.file_path)
+
+        for func in reg_file.functions:
+            SymbolIndexer._add(
+                symbol_index,
+                Symbol(
+                    name=func.function_name,
+                    qualified_name=f"{module}.{func.function_name}",
+                    kind="function",
+                    file=reg_file.file,
+                    parameters=func.parameters,
+                    param_types=func.param_types,
+                    is_async=func.is_async,
+                ),
+            )
+
+        for cls in reg_file.classes:
+            SymbolIndexer._add_class(symbol_index, cls, reg_file.file, [module])
+
+    @staticmethod
+    def _add_class(
+        symbol_index: SymbolIndex,
+        cls: RegistryClass,
+        file: File,
+        scope: List[str],
+        parent_class: Optional[str] = None,
+    ) -> None:
+        cls_scope = scope + [cls.class_name]
+        SymbolIndexer._add(
+            symbol_index,
+            Symbol(
+                name=cls.class_name,
+                qualified_name=".".join(cls_scope),
+                kind="class",
+                file=file,
+                parent_class=parent_class,
+            ),
+        )
+        for func in cls.class_functions:
+            SymbolIndexer._add(
+                symbol_index,
+                Symbol(
+                    name=func.function_name,
+                    qualified_name=".".join(cls_scope + [func.function_name]),
+                    kind="method",
+                    file=file,
+                    parent_class=cls.class_name,
+                    parameters=func.parameters,
+                    param_types=func.param_types,
+                    is_async=func.is_async,
+                ),
+            )
+        for sub_cls in cls.classes:
+            SymbolIndexer._add_class(
+                symbol_index, sub_cls, file, cls_scope, parent_class=cls.class_name
+            )
+
+    @staticmethod
+    def _add(symbol_index: SymbolIndex, symbol: Symbol) -> None:
+        symbol_index.index.setdefault(symbol.qualified_name, symbol)
+        symbol_index.by_name.setdefault(symbol.name, []).append(symbol)
@@ -0,0 +1,308 @@
+import ast
+import builtins
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+FunctionNode = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+
+# wrappers whose first argument is the actual type
+TYPE_WRAPPERS = frozenset(("Optional", "Final", "ClassVar", "Annotated", "Required"))
+
+UNKNOWN = ""  # inferred from conflicting sources; never a class name
+_PENDING = object()  # inference of a name in progress (cycle guard)
+MAX_DEPTH = 100  # names typed by the values of other names, nested
+
+
+def annotation_type(node: Optional[ast.AST]) -> Optional[str]:
+    """
+    Class name an annotation stands for: Foo, mod.Foo, "Foo", Optional[Foo],
+    Foo | None, Union[Foo, None]. None for anything else (unions of
+    several types, missing annotations).
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        try:
+            return annotation_type(ast.parse(node.value, mode="eval").body)
+        except SyntaxError:
+            return None
+    if isinstance(node, ast.Subscript):
+        wrapper = annotation_type(node.value)
+        if wrapper in TYPE_WRAPPERS:
+            inner = node.slice
+            if isinstance(inner, ast.Tuple) and inner.elts:
+                inner = inner.elts[0]  # Annotated[Foo, ...]
+            return annotation_type(inner)
+        if wrapper == "Union":
+            members = node.slice.elts if isinstance(node.slice, ast.Tuple) else []
+            typed = [m for m in members if not _is_none(m)]
+            return annotation_type(typed[0]) if len(typed) == 1 else None
+        return wrapper
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+        # Foo | None
+        if _is_none(node.right):
+            return annotation_type(node.left)
+        if _is_none(node.left):
+            return annotation_type(node.right)
+    return None
+
+
+def _is_none(node: ast.AST) -> bool:
+    return isinstance(node, ast.Constant) and node.value is None
+
+
+class Scope:
+    """
+    Names of one module, class body or function with what they were
+    declared or assigned as. Functions see their enclosing functions and
+    the module, not the class bodies around them, as in Python.
+    """
+
+    def __init__(
+        self,
+        parent: Optional["Scope"] = None,
+        owner: Optional[str] = None,
+        is_class: bool = False,
+        self_name: Optional[str] = None,
+    ):
+        self.parent = parent
+        self.owner = owner  # class of a class body or of a method
+        self.is_class = is_class
+        self.self_name = self_name  # first parameter of a method
+        self.declared: Dict[str, str] = {}  # annotated names
+        self.assigned: Dict[str, List[ast.expr]] = {}
+
+    def function_parent(self) -> "Scope":
+        """The scope a function defined here looks names up in."""
+        scope = self
+        while scope.is_class and scope.parent is not None:
+            scope = scope.parent
+        return scope
+
+    def declare(self, name: str, type_name: Optional[str]):
+        if type_name:
+            self.declared[name] = type_name
+
+    def assign(self, name: str, value: ast.expr):
+        self.assigned.setdefault(name, []).append(value)
+
+
+Values = List[Tuple[ast.expr, Scope]]  # assigned values with their scope
+
+
+class TypeInference:
+    """
+    Flow-insensitive types of the names of one file, from assignments of
+    class instantiations, annotations of variables, parameters and self.
+    attributes, and return annotations of the file's functions and methods.
+
+    All facts are collected first (by the CallCollector visit) and types
+    are inferred on demand afterwards, so order of definition does not
+    matter. A name assigned values of different types has no type.
+
+    Calling a name makes an instance only when the name is a class: one of
+    the file, a builtin one, or one known_class accepts (the registry's and
+    imported ones). x = helper() gives x no type.
+    """
+
+    def __init__(self, known_class: Optional[Callable[[str], bool]] = None):
+        self.module = Scope()
+        self.known_class = known_class
+        self.classes: Set[str] = set()
+        self.functions: Set[str] = set()  # module-level functions
+        # (class or None, function) -> return annotation
+        self.returns: Dict[Tuple[Optional[str], str], str] = {}
+        # the async ones: calling them gives a coroutine, awaiting it the return
+        self.coroutines: Set[Tuple[Optional[str], str]] = set()
+        # class -> attribute -> declared type / assigned values
+        self.declared_attributes: Dict[str, Dict[str, str]] = {}
+        self.assigned_attributes: Dict[str, Dict[str, Values]] = {}
+        self._memo: Dict[Tuple[int, str], Union[str, object]] = {}
+        self._depth = 0
+
+    # -------------------- FACTS --------------------
+
+    def add_function(self, node: FunctionNode, scope: Scope) -> Scope:
+        """Record a definition in scope; returns the scope of its body."""
+        owner = scope.owner if scope.is_class else None
+        if scope is self.module:
+            self.functions.add(node.name)
+        returns = annotation_type(node.returns)
+        if returns and (owner or scope is self.module):
+            self.returns[(owner, node.name)] = returns
+            if isinstance(node, ast.AsyncFunctionDef):
+                self.coroutines.add((owner, node.name))
+
+        args = node.args
+        positional = args.posonlyargs + args.args
+        decorators = {annotation_type(d) for d in node.decorator_list}
+        self_name = None
+        if owner and positional and "staticmethod" not in decorators:
+            self_name = positional[0].arg
+
+        body = Scope(scope.function_parent(), owner=owner, self_name=self_name)
+        for arg in positional + args.kwonlyargs:
+            if arg.arg == self_name and arg.annotation is None:
+                body.declare(arg.arg, owner)
+            else:
+                body.declare(arg.arg, annotation_type(arg.annotation))
+        return body
+
+    def add_lambda(self, node: ast.Lambda, scope: Scope) -> Scope:
+        """Scope of a lambda's body: its parameters hide outer names."""
+        body = Scope(scope.function_parent(), owner=scope.owner)
+        args = node.args
+        for arg in args.posonlyargs + args.args + args.kwonlyargs:
+            body.assigned[arg.arg] = []  # no values, so no type
+        return body
+
+    def add_class(self, node: ast.ClassDef, scope: Scope) -> Scope:
+        self.classes.add(node.name)
+        return Scope(scope, owner=node.name, is_class=True)
+
+    def add_assign(self, target: ast.expr, value: Optional[ast.expr], scope: Scope):
+        if value is None:
+            return
+        if isinstance(target, ast.Name):
+            scope.assign(target.id, value)
+            if scope.is_class:
+                self._attributes(self.assigned_attributes, scope.owner).setdefault(
+                    target.id, []
+                ).append((value, scope))
+        elif self._is_self_attribute(target, scope):
+            self._attributes(self.assigned_attributes, scope.owner).setdefault(
+                target.attr, []
+            ).append((value, scope))
+
+    def add_annotation(self, target: ast.expr, annotation: ast.expr, scope: Scope):
+        type_name = annotation_type(annotation)
+        if not type_name:
+            return
+        if isinstance(target, ast.Name):
+            scope.declare(target.id, type_name)
+            if scope.is_class:
+                self._attributes(self.declared_attributes, scope.owner)[
+                    target.id
+                ] = type_name
+        elif self._is_self_attribute(target, scope):
+            self._attributes(self.declared_attributes, scope.owner)[
+                target.attr
+            ] = type_name
+
+    @staticmethod
+    def _is_self_attribute(target: ast.expr, scope: Scope) -> bool:
+        return (
+            isinstance(target, ast.Attribute)
+            and isinstance(target.value, ast.Name)
+            and scope.self_name is not None
+            and target.value.id == scope.self_name
+        )
+
+    @staticmethod
+    def _attributes(table: dict, owner: str) -> dict:
+        return table.setdefault(owner, {})
+
+    # -------------------- INFERENCE --------------------
+
+    def type_of(self, expr: ast.expr, scope: Scope) -> Optional[str]:
+        """
+        Class name of the value of an expression, None when unknown.
+        Chains like a.b().c are unwound with a loop, not recursion, so long
+        ones cannot exhaust the stack.
+        """
+        # (attribute, None) or (method, awaited, class name if called on a
+        # bare name), outermost first
+        steps: List[tuple] = []
+        while True:
+            awaited = isinstance(expr, ast.Await) and isinstance(expr.value, ast.Call)
+            if awaited:
+                expr = expr.value
+            if isinstance(expr, ast.Attribute):
+                steps.append((expr.attr, None, None))
+                expr = expr.value
+            elif isinstance(expr, ast.Call) and isinstance(expr.func, ast.Attribute):
+                value = expr.func.value
+                bare = value.id if isinstance(value, ast.Name) else None
+                steps.append((expr.func.attr, awaited, bare))  # Foo.create()
+                expr = value
+            else:
+                break
+
+        if isinstance(expr, ast.Name):
+            owner = self.type_of_name(expr.id, scope)
+        elif isinstance(expr, ast.Call) and isinstance(expr.func, ast.Name):
+            owner = self._name_call_type(expr.func.id, awaited)
+        else:
+            owner = None
+
+        for attr, awaited, bare in reversed(steps):
+            if awaited is None:
+                owner = self.type_of_attribute(owner, attr) if owner else None
+            else:
+                owner = owner or bare
+                owner = self._returned((owner, attr), awaited) if owner else None
+        return owner
+
+    def _name_call_type(self, name: str, awaited: bool) -> Optional[str]:
+        if name in self.functions:
+            return self._returned((None, name), awaited)
+        return name if self.is_class(name) else None  # Foo(): a Foo
+
+    def is_class(self, name: str) -> bool:
+        if name in self.classes or isinstance(getattr(builtins, name, None), type):
+            return True
+        return self.known_class is not None and self.known_class(name)
+
+    def _returned(self, key: Tuple[Optional[str], str], awaited: bool) -> Optional[str]:
+        if key in self.coroutines and not awaited:
+            return None  # a coroutine object, not the annotated value
+        return self.returns.get(key)
+
+    def type_of_name(self, name: str, scope: Scope) -> Optional[str]:
+        while scope is not None:
+            if name in scope.declared:
+                return scope.declared[name]
+            if name in scope.assigned:
+                key = (id(scope), name)
+                found = self._memo.get(key)
+                if found is _PENDING:
+                    return None
+                if found is None:
+                    self._memo[key] = _PENDING
+                    values = [(value, scope) for value in scope.assigned[name]]
+                    found = self._memo[key] = self._agree(values)
+                return found or None
+            scope = scope.parent
+        return None
+
+    def type_of_attribute(self, owner: str, attr: str) -> Optional[str]:
+        declared = self.declared_attributes.get(owner, {}).get(attr)
+        if declared:
+            return declared
+        values = self.assigned_attributes.get(owner, {}).get(attr)
+        if not values:
+            return None
+        key = (id(values), attr)
+        found = self._memo.get(key)
+        if found is _PENDING:
+            return None
+        if found is None:
+            self._memo[key] = _PENDING
+            found = self._memo[key] = self._agree(values)
+        return found or None
+
+    def _agree(self, values: Values) -> str:
+        """
+        The one type all typed values agree on, UNKNOWN otherwise, and
+        past MAX_DEPTH (a = b; b = c; ... long enough to exhaust the stack).
+        """
+        if self._depth >= MAX_DEPTH:
+            return UNKNOWN
+        self._depth += 1
+        try:
+            types = {self.type_of(value, scope) for value, scope in values}
+        finally:
+            self._depth -= 1
+        types.discard(None)
+        return types.pop() if len(types) == 1 else UNKNOWN
@@ -1,27 +1,84 @@
+import argparse
+import time
 from pathlib import Path
+from typing import List, Optional
 
+from analyzer.call_analyzer import CallCollector
 from processors.execution_chain_build_processor import ExecutionChainBuildProcessor
 from processors.processor import Processor
+from processors.trace_processor import TraceProcessor
 from processors.version_diff_processor import VersionProcessor
+from utils.cluster_view import ClusterView
 from utils.console import Console
+from utils.snapshot import SnapshotWriter
 from utils.visualizer import CallChainVisualizer
-from utils.writer import Writer
 
 
 class App:
     """Main entry point of the application."""
 
-    def __init__(self, base_path: str):
+    def __init__(
+        self,
+        base_path: str,
+        incremental: bool = False,
+        group_by: Optional[str] = None,
+        output: str = "html",
+        compression: Optional[str] = None,
+        graph_backend: str = "networkx",
+        trace: Optional[List[str]] = None,
+        heatmap: bool = False,
+        max_nodes: Optional[int] = 1_000_000,
+        max_seconds: Optional[float] = 30.0,
+        arguments: str = "span",
+    ):
         self.base_path = Path(base_path)
+        self.incremental = incremental
+        self.group_by = group_by
+        self.output = output
+        self.compression = compression
+        self.graph_backend = graph_backend
+        self.trace = trace
+        self.heatmap = heatmap
+        self.max_nodes = max_nodes
+        self.max_seconds = max_seconds
+        self.arguments = arguments
 
     def run(self):
-        processor = Processor(self.base_path)
-        roadmap, hash_map = processor.run()
+        data_dir = Path(__file__).parent / "data"
+        cache_dir = Path(__file__).parent / ".analysis_cache"
 
-        Writer.save_dependency_roadmap_json(roadmap)
-        Writer.save_file_hashes_json(hash_map)
+        processor = Processor(
+            self.base_path,
+            data_dir=data_dir,
+            cache_dir=cache_dir,
+            max_nodes=self.max_nodes,
+            max_seconds=self.max_seconds,
+            arguments=self.arguments,
+        )
+        with SnapshotWriter(data_dir) as snapshot:
+            started = time.perf_counter()
+            roadmap, hash_map = processor.run(incremental=self.incremental)
+            snapshot.add_timing("analysis", time.perf_counter() - started)
+            snapshot.add_analysis_version(processor.analysis_version)
+            snapshot.add_issues(processor.issues)
+            for issue in processor.issues:
+                Console().print(
+                    f"[yellow]{issue.file_path}: partial analysis ({issue.reason})"
+                    "[/yellow]"
+                )
+
+            snapshot.save_dependency_roadmap(roadmap)
+            snapshot.save_file_hashes(hash_map)
+
+            if self.trace:
+                started = time.perf_counter()
+                tracer = TraceProcessor(self.base_path, heatmap=self.heatmap)
+                runtime_calls = tracer.run(self.trace)
+                snapshot.add_timing("trace", time.perf_counter() - started)
+                snapshot.save_runtime_calls(runtime_calls)
+                if tracer.line_heatmap is not None:
+                    snapshot.save_line_heatmap(tracer.line_heatmap)
 
-        data_dir = Path(__file__).parent / "data"
         version_processor = VersionProcessor(data_dir)
         try:
             report = version_processor.compare_latest_versions()
@@ -31,13 +88,129 @@ class App:
                 "[yellow]No previous roadmap found, skipping version comparison[/yellow]"
             )
 
-        chain_processor = ExecutionChainBuildProcessor(roadmap)
-        graph = chain_processor.build_graph()
+        chain_processor = ExecutionChainBuildProcessor(
+            roadmap,
+            backend=self.graph_backend,
+            cache_dir=cache_dir,
+            file_hashes=hash_map,
+        )
+        chain_processor.build_graph()
+
+        visualizer = CallChainVisualizer(chain_processor.to_networkx())
+        visualizer.save_file_charts(
+            prefix="",
+            folder="chains_output",
+            group_by=self.group_by,
+            output=self.output,
+            compression=self.compression,
+        )
 
-        visualizer = CallChainVisualizer(graph)
-        visualizer.save_file_charts(prefix="", folder="chains_output")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Code Execution Visualizer")
+    parser.add_argument("base_path", nargs="?", default="resources/test_data")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only re-analyze files changed since the latest saved version",
+    )
+    parser.add_argument(
+        "--group-by",
+        choices=ClusterView.GROUP_BY,
+        help="render the global chart as expandable clusters "
+        "(automatic by package for large graphs)",
+    )
+    parser.add_argument(
+        "--output",
+        choices=CallChainVisualizer.OUTPUTS,
+        default="html",
+        help="standalone HTML per chart, or JSON payloads with one shared viewer",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="with --output json, gzip the chart payloads",
+    )
+    parser.add_argument(
+        "--graph-backend",
+        choices=ExecutionChainBuildProcessor.BACKENDS,
+        default="networkx",
+        help="build the call graph in compact integer arrays (less memory)",
+    )
+    parser.add_argument(
+        "--max-nodes",
+        type=int,
+        default=1_000_000,
+        help="stop analyzing a file after this many AST nodes (partial result)",
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=30.0,
+        help="stop analyzing a file after this many seconds (partial result)",
+    )
+    parser.add_argument(
+        "--arguments",
+        choices=CallCollector.ARGUMENTS,
+        default="span",
+        help="store call arguments as source spans (default), as text, or not at all",
+    )
+    parser.add_argument(
+        "--heatmap",
+        action="store_true",
+        help="with --trace, also count how often each line was executed",
+    )
+    parser.add_argument(
+        "--trace",
+        nargs=argparse.REMAINDER,
+        metavar="SCRIPT|pytest",
+        help="also run a script (or pytest) with its arguments and record the "
+        "calls it makes between functions of BASE_PATH; must come last",
+    )
+    parser.add_argument(
+        "--versions", action="store_true", help="list saved versions and exit"
+    )
+    parser.add_argument(
+        "--diff",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help="compare two saved versions and exit",
+    )
+    parser.add_argument(
+        "--range",
+        action="store_true",
+        help="with --diff, compare every consecutive pair between OLD and NEW",
+    )
+    args = parser.parse_args(argv)
+
+    data_dir = Path(__file__).parent / "data"
+    version_processor = VersionProcessor(data_dir)
+    if args.versions:
+        for version in version_processor.list_versions():
+            print(version)
+    elif args.diff:
+        old_version, new_version = args.diff
+        if args.range:
+            Console().print(version_processor.compare_range(old_version, new_version))
+        else:
+            Console().print(
+                version_processor.compare_versions(old_version, new_version)
+            )
+    else:
+        App(
+            base_path=args.base_path,
+            incremental=args.incremental,
+            group_by=args.group_by,
+            output=args.output,
+            compression="gzip" if args.gzip else None,
+            graph_backend=args.graph_backend,
+            trace=args.trace,
+            heatmap=args.heatmap,
+            max_nodes=args.max_nodes,
+            max_seconds=args.max_seconds,
+            arguments=args.arguments,
+        ).run()
 
 
 if __name__ == "__main__":
-    app = App(base_path="resources/test_data")
-    app.run()
+    main()
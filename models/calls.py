@@ -10,6 +10,16 @@ class CallCoordinates:
     char: int
 
 
+@dataclass
+class CallStats:
+    """Measured by the runtime tracer for one caller -> callee pair."""
+
+    count: int
+    total_time: float  # seconds inside the callee, its callees included
+    self_time: float  # seconds inside the callee itself
+    first_seen: int  # event number of the first call, orders the sequence
+
+
 @dataclass
 class Call:
     called_file: File
@@ -20,7 +30,16 @@ class Call:
     coordinates: Optional[CallCoordinates] = None
     parameters: Optional[List[str]] = None
     param_types: Optional[List[str]] = None
+    # positional arguments: source texts, [line, char, end_line, end_char]
+    # spans (analyzer.source_text.SourceText) or None when not captured
     arguments: Optional[List[Any]] = None
+    resolution: Optional[str] = None  # how called_file was filled in, if at all
+    candidates: Optional[List[str]] = None  # qualified names when ambiguous
+    runtime: Optional[CallStats] = None  # set when the call was traced
+    awaited: bool = False  # await f(): the caller waits for it on the event loop
+    coroutine: bool = False  # the callee is an async def, so this makes a coroutine
+    # where the call runs when not in the caller's body: "decorator", "lambda"
+    context: Optional[str] = None
 
 
 @dataclass
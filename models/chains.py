@@ -0,0 +1,13 @@
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass
+class EntrypointChain:
+    """Nodes reachable from one entrypoint, in depth-first preorder."""
+
+    entrypoint: str
+    nodes: List[str]
+    # listed but not expanded: an earlier chain already walked their callees
+    shared: List[str] = field(default_factory=list)
+    truncated: bool = False  # stopped by the node budget
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
@@ -6,3 +7,13 @@ class File:
     file_name: str
     file_format: str
     file_path: str
+
+
+@dataclass
+class FileIssue:
+    """A file whose analysis stopped early or failed; its results are partial."""
+
+    file_path: str
+    reason: str  # "max_nodes", "max_seconds", "recursion" or "syntax_error"
+    nodes: int = 0  # AST nodes visited before the analysis stopped
+    detail: Optional[str] = None
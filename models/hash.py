@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Dict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 
 from models.file import File
 
@@ -11,11 +11,26 @@ class ASTCache:
     cache: Dict[str, object]
 
 
+@dataclass
+class Symbol:
+    """A class, method or top-level function known to the SymbolIndex."""
+
+    name: str
+    qualified_name: str  # module.Class.method
+    kind: str  # "function", "method" or "class"
+    file: File
+    parent_class: Optional[str] = None  # enclosing class name
+    parameters: Optional[List[str]] = None
+    param_types: Optional[List[Optional[str]]] = None
+    is_async: bool = False  # an async def function or method
+
+
 @dataclass
 class SymbolIndex:
     """Global index of symbols (functions/classes) for fast lookup."""
 
-    index: Dict[str, File]
+    index: Dict[str, Symbol] = field(default_factory=dict)  # by qualified name
+    by_name: Dict[str, List[Symbol]] = field(default_factory=dict)  # candidates
 
 
 @dataclass
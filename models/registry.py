@@ -12,6 +12,8 @@ class RegistryFunction:
     parameters: List[str] = field(default_factory=list)  # parameter names
     param_types: List[Optional[str]] = field(default_factory=list)  # type hints
     sub_function_of: Optional[str] = None
+    is_async: bool = False  # async def: calling it makes a coroutine
+    decorators: List[str] = field(default_factory=list)  # @name, without arguments
     parent_class: Optional[RegistryClass] = None
     parent_file: Optional[RegistryFile] = None
     parent_function: Optional[RegistryFunction] = None
@@ -22,6 +24,8 @@ class RegistryFunction:
             f"RegistryFunction(function_name='{self.function_name}', "
             f"parameters={self.parameters}, "
             f"param_types={self.param_types}, "
+            f"is_async={self.is_async}, "
+            f"decorators={self.decorators}, "
             f"parent_class='{self.parent_class.class_name if self.parent_class else None}', "
             f"parent_file='{self.parent_file.file.file_name if self.parent_file else None}', "
             f"parent_function='{self.parent_function.function_name if self.parent_function else None}', "
@@ -1,5 +1,14 @@
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class FunctionSignature:
+    """Hashable identity of a function used to diff versions."""
+
+    qualified_name: str  # Class.method or func.nested within its file
+    parameters: Tuple[str, ...]
+    param_types: Tuple[Optional[str], ...]
 
 
 @dataclass
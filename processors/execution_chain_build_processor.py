@@ -1,15 +1,43 @@
-import re
-from typing import Optional
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
 
 import networkx as nx
 
+from models.chains import EntrypointChain
+from utils.cache import GraphShardCache
+from utils.graph_store import CompactGraph, GraphShard, edge_attributes
+from utils.node_registry import NodeRegistry
+
 
 class ExecutionChainBuildProcessor:
     """Processor that builds execution chains from dependency roadmap."""
 
-    def __init__(self, roadmap):
+    # "compact" keeps the graph in integer arrays while building, for repos
+    # whose call graph does not fit in memory as an nx.DiGraph
+    BACKENDS = ("networkx", "compact")
+
+    def __init__(
+        self,
+        roadmap,
+        backend: str = "networkx",
+        max_workers: Optional[int] = 1,
+        cache_dir: Optional[Path] = None,
+        file_hashes: Optional[Dict[str, dict]] = None,
+        chunk_deps: int = 256,
+    ):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"backend must be one of {self.BACKENDS}: {backend}")
         self.roadmap = roadmap
-        self.graph = nx.DiGraph()
+        self.backend = backend
+        self.max_workers = max_workers
+        self.cache_dir = cache_dir
+        self.file_hashes = file_hashes or {}
+        self.chunk_deps = chunk_deps
+        self.graph = CompactGraph() if backend == "compact" else nx.DiGraph()
+        self.node_registry = NodeRegistry()
 
     # -------------------- PUBLIC --------------------
 
@@ -18,20 +46,14 @@ class ExecutionChainBuildProcessor:
         if not self.roadmap or not getattr(self.roadmap, "map", None):
             return self.graph
 
-        for dep in self.roadmap.map:
-            self._add_registry_file(dep.registry)
-
-            if getattr(dep, "calls", None) and getattr(dep.calls, "calls", None):
-                for call in dep.calls.calls:
-                    caller_name = self._format_caller(dep.calls, call)
-                    callee_name = self._format_callee(call)
-
-                    caller = self._add_node_with_label(caller_name)
-                    callee = self._add_node_with_label(callee_name)
-
-                    file_key = self._get_file_key_from_registry(dep.registry)
-                    self.graph.add_edge(caller, callee, file=file_key)
+        for shard in self._build_shards(self.roadmap.map):
+            self._merge_shard(shard)
+        return self.graph
 
+    def to_networkx(self) -> nx.DiGraph:
+        """The built graph as an nx.DiGraph, converting the compact backend."""
+        if isinstance(self.graph, CompactGraph):
+            return self.graph.to_networkx()
         return self.graph
 
     def _get_file_key_from_registry(self, registry) -> str:
@@ -70,9 +92,96 @@ class ExecutionChainBuildProcessor:
         except Exception:
             return "<unknown>"
 
+    # -------------------- SHARDS --------------------
+
+    def _build_shard(self, dep) -> GraphShard:
+        """Labels and edges one roadmap entry contributes, ids unresolved."""
+        shard = GraphShard()
+        self._add_registry_file(dep.registry, shard)
+
+        if getattr(dep, "calls", None) and getattr(dep.calls, "calls", None):
+            file_key = self._get_file_key_from_registry(dep.registry)
+            for call in dep.calls.calls:
+                caller = shard.add_node(self._format_caller(dep.calls, call))
+                callee = shard.add_node(self._format_callee(call))
+                shard.add_edge(caller, callee, file=file_key, kind=self.edge_kind(call))
+
+        return shard
+
+    @staticmethod
+    def edge_kind(call) -> Optional[str]:
+        """Kind of a call edge in EDGE_KINDS, None for plain calls."""
+        if getattr(call, "awaited", False):
+            return "await"
+        if getattr(call, "coroutine", False):
+            return "coroutine"
+        return None
+
+    def _shard_key(self, dep) -> Optional[str]:
+        """
+        Cache key of a shard: the file's path and source, which its registry
+        nodes come from, and the exact caller, callee and kind of each call
+        edge, which also depend on how other files resolved its calls.
+        """
+        file_path = getattr(dep.registry.file, "file_path", None)
+        source_hash = (self.file_hashes.get(file_path) or {}).get("hash")
+        if not file_path or not source_hash:
+            return None
+        digest = hashlib.sha256(f"{file_path}\0{source_hash}".encode("utf-8"))
+        for call in getattr(dep.calls, "calls", None) or []:
+            caller = self._format_caller(dep.calls, call)
+            callee = self._format_callee(call)
+            kind = self.edge_kind(call) or ""
+            digest.update(f"\0{caller}\0{callee}\0{kind}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _build_shards(self, deps) -> List[GraphShard]:
+        """
+        One shard per roadmap entry, in roadmap order. Shards of unchanged
+        files come from the cache; the rest are built in a process pool
+        (max_workers=1 builds them in this process).
+        """
+        cache = GraphShardCache(self.cache_dir) if self.cache_dir else None
+        keys = [self._shard_key(dep) for dep in deps] if cache else [None] * len(deps)
+        shards: List[Optional[GraphShard]] = [
+            cache.get(key) if key else None for key in keys
+        ]
+
+        missing = [i for i, shard in enumerate(shards) if shard is None]
+        chunks = [
+            missing[i : i + self.chunk_deps]
+            for i in range(0, len(missing), self.chunk_deps)
+        ]
+        if self.max_workers == 1 or len(chunks) < 2:
+            for i in missing:
+                shards[i] = self._build_shard(deps[i])
+        else:
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_shard_worker,
+                initargs=(self,),
+            ) as executor:
+                futures = [
+                    executor.submit(_build_shards_in_worker, chunk) for chunk in chunks
+                ]
+                # merged in submission order, so the graph does not depend on timing
+                for chunk, future in zip(chunks, futures):
+                    for i, packed in zip(chunk, future.result()):
+                        shards[i] = GraphShard.unpack(packed)
+
+        if cache:
+            cache.save({key: shard for key, shard in zip(keys, shards) if key})
+        return shards
+
+    def _merge_shard(self, shard: GraphShard):
+        """Resolve a shard's labels to global node ids and add it to the graph."""
+        ids = [self._add_node_with_label(label) for label in shard.labels]
+        for src, dst, file, kind in shard.edges:
+            self.graph.add_edge(ids[src], ids[dst], **edge_attributes(file, kind))
+
     # -------------------- ADD REGISTRY (classes/functions) --------------------
 
-    def _add_registry_file(self, registry_file):
+    def _add_registry_file(self, registry_file, shard: GraphShard):
         """
         Add classes/functions defined in a registry file.
         We compute a 'file_key' once for the registry and pass it down.
@@ -81,38 +190,38 @@ class ExecutionChainBuildProcessor:
 
         # classes
         for cls in getattr(registry_file, "classes", []) or []:
-            self._add_registry_class(cls, file_key)
+            self._add_registry_class(cls, file_key, shard)
 
         # top-level functions
         for func in getattr(registry_file, "functions", []) or []:
-            self._add_registry_function(func, file_key)
+            self._add_registry_function(func, file_key, shard)
 
-    def _add_registry_class(self, cls, parent_file_key):
+    def _add_registry_class(self, cls, parent_file_key, shard: GraphShard):
         """Add class node and its nested classes/functions."""
         cls_label = f"{parent_file_key}__{cls.class_name}"
-        cls_node = self._add_node_with_label(cls_label)
+        cls_node = shard.add_node(cls_label)
 
         # nested classes
         for subcls in getattr(cls, "classes", []) or []:
-            sub_node = self._add_registry_class(subcls, parent_file_key)
-            self.graph.add_edge(cls_node, sub_node)
+            sub_node = self._add_registry_class(subcls, parent_file_key, shard)
+            shard.add_edge(cls_node, sub_node)
 
         # class functions
         for func in getattr(cls, "class_functions", []) or []:
-            func_node = self._add_registry_function(func, parent_file_key)
-            self.graph.add_edge(cls_node, func_node)
+            func_node = self._add_registry_function(func, parent_file_key, shard)
+            shard.add_edge(cls_node, func_node)
 
         return cls_node
 
-    def _add_registry_function(self, func, parent_file_key):
+    def _add_registry_function(self, func, parent_file_key, shard: GraphShard):
         """Add function node and nested functions."""
         node_label = f"{parent_file_key}__{func.function_name}"
-        func_node = self._add_node_with_label(node_label)
+        func_node = shard.add_node(node_label)
 
         # nested functions
         for subfunc in getattr(func, "functions", []) or []:
-            sub_node = self._add_registry_function(subfunc, parent_file_key)
-            self.graph.add_edge(func_node, sub_node)
+            sub_node = self._add_registry_function(subfunc, parent_file_key, shard)
+            shard.add_edge(func_node, sub_node)
 
         return func_node
 
@@ -123,22 +232,11 @@ class ExecutionChainBuildProcessor:
         Ensure safe node id (no special chars) and add node with readable 'label' attribute.
         Returns the node id used in the graph.
         """
-        # make a safe id (replace anything non-alnum/underscore/dot by underscore)
-        safe_id = re.sub(r"[^0-9A-Za-z_.\-]", "_", label)
-
-        if safe_id in self.graph.nodes:
-            existing_label = self.graph.nodes[safe_id].get("label")
-            if existing_label == label:
-                return safe_id
-            i = 1
-            new_id = f"{safe_id}_{i}"
-            while new_id in self.graph.nodes:
-                i += 1
-                new_id = f"{safe_id}_{i}"
-            safe_id = new_id
-
-        self.graph.add_node(safe_id, label=label)
-        return safe_id
+        node_id = self.node_registry.get(label)
+        if node_id is None:
+            node_id = self.node_registry.add(label)
+            self.graph.add_node(node_id, label=label)
+        return node_id
 
     # -------------------- FORMAT CALLER / CALLEE --------------------
 
@@ -170,9 +268,100 @@ class ExecutionChainBuildProcessor:
 
     def extract_entrypoint_chains(self, cutoff: int = 20):
         """Extract one execution tree per root node including all nested elements."""
-        chains = []
-        entrypoints = [n for n in self.graph.nodes if self.graph.in_degree(n) == 0]
-        for entry in entrypoints:
-            tree = nx.dfs_tree(self.graph, source=entry, depth_limit=cutoff)
-            chains.append(list(tree.nodes))
-        return chains
+        return [chain.nodes for chain in self.iter_entrypoint_chains(cutoff)]
+
+    def iter_entrypoint_chains(
+        self,
+        cutoff: int = 20,
+        max_nodes: Optional[int] = None,
+        dedupe: bool = False,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Iterator[EntrypointChain]:
+        """
+        Yield the chain of each root node lazily, in graph order, with the
+        same nodes as nx.dfs_tree(graph, root, depth_limit=cutoff).
+
+        max_nodes caps each chain (marked truncated). With dedupe, a node
+        whose callees an earlier chain of this iteration already walked at
+        least as deep is listed once and recorded as shared instead of
+        walked again. A node reached again with more depth left than it was
+        walked with, in the same chain or a later one, is walked again, so
+        dedupe lists every node the plain walk does (and may list nodes the
+        plain walk skips for reaching them deep first).
+        offset/limit page through the roots; skipped roots are not walked.
+        """
+        entrypoints = (n for n in self.graph if self.graph.in_degree(n) == 0)
+        stop = None if limit is None else offset + limit
+        # node -> how deep below it its callees were walked
+        walked: Optional[Dict[str, int]] = {} if dedupe else None
+        for entry in islice(entrypoints, offset, stop):
+            yield self._walk_chain(entry, cutoff, max_nodes, walked)
+
+    def _walk_chain(
+        self,
+        entry: str,
+        cutoff: int,
+        max_nodes: Optional[int],
+        walked: Optional[Dict[str, int]],
+    ) -> EntrypointChain:
+        """
+        Depth-limited preorder walk with an explicit stack (as nx.dfs_edges).
+        walked maps the nodes walked so far to the depth below them that all
+        their callees were walked to, in this chain or earlier ones.
+        """
+        successors = self.graph.successors
+        chain = EntrypointChain(entrypoint=entry, nodes=[entry])
+        listed = {entry: cutoff}  # node -> most depth left it was reached with
+        stack = [iter(successors(entry))]
+        path = [entry]  # the node of each stack level
+        if walked is not None:
+            walked[entry] = cutoff
+        while stack:
+            for child in stack[-1]:
+                depth_left = cutoff - len(stack)
+                again = child in listed
+                if again:
+                    if walked is None or listed[child] >= depth_left:
+                        continue
+                    # reached with more depth left: walked deeper, listed once
+                else:
+                    if max_nodes is not None and len(chain.nodes) >= max_nodes:
+                        chain.truncated = True
+                        if walked is not None:
+                            for node in path:  # not walked to the end
+                                walked.pop(node, None)
+                        return chain
+                    chain.nodes.append(child)
+                listed[child] = depth_left
+                if depth_left > 0:
+                    if walked is not None:
+                        if walked.get(child, 0) >= depth_left:
+                            if not again:
+                                chain.shared.append(child)
+                            continue
+                        walked[child] = depth_left
+                    stack.append(iter(successors(child)))
+                    path.append(child)
+                    break
+            else:
+                stack.pop()
+                path.pop()
+        return chain
+
+
+# -------------------- WORKERS --------------------
+# The processor and its roadmap are sent once per worker process, not per chunk.
+_worker_processor: Optional[ExecutionChainBuildProcessor] = None
+
+
+def _init_shard_worker(processor: ExecutionChainBuildProcessor):
+    global _worker_processor
+    _worker_processor = processor
+
+
+def _build_shards_in_worker(indexes: List[int]) -> List[tuple]:
+    return [
+        _worker_processor._build_shard(_worker_processor.roadmap.map[i]).pack()
+        for i in indexes
+    ]
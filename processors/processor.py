@@ -1,66 +1,109 @@
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
-from analyzer.call_analyzer import CallAnalyzer
-from analyzer.imports_analyzer import ImportsAnalyzer
-from analyzer.register import Register
+from analyzer.call_analyzer import CallCollector
+from analyzer.call_resolver import CallResolver
+from analyzer.file_visitor import FileVisitor
+from analyzer.imports_analyzer import ImportsCollector
+from analyzer.register import RegistryCollector
 from models.calls import Calls, CallsHeap
 from models.dependencies import Dependency, DependencyRoadMap
-from models.file import File
+from models.file import File, FileIssue
+from models.hash import FileHashCache
 from models.imports import Imports, ImportsHeap
-from models.registry import RegistryClass, RegistryFile, RegistryHeap
+from models.registry import RegistryFile, RegistryHeap
+from utils.cache import ANALYSIS_CACHE_VERSION, AnalysisCache
 from utils.hasher import FileHasher
 from utils.reader import Reader
+from utils.records import AnalysisRecords
+from utils.snapshot import SnapshotWriter
 
 
 class Processor:
-    def __init__(self, base_path: Path):
+    def __init__(
+        self,
+        base_path: Path,
+        data_dir: Optional[Path] = None,
+        cache_dir: Optional[Path] = None,
+        max_workers: Optional[int] = None,
+        chunk_bytes: int = 256 * 1024,
+        chunk_files: int = 64,
+        max_nodes: Optional[int] = 1_000_000,
+        max_seconds: Optional[float] = 30.0,
+        arguments: str = "span",
+    ):
+        if arguments not in CallCollector.ARGUMENTS:
+            raise ValueError(
+                f"arguments must be one of {CallCollector.ARGUMENTS}: {arguments}"
+            )
         self.base_path: Path = base_path
+        self.data_dir: Optional[Path] = data_dir
+        self.cache_dir: Optional[Path] = cache_dir
+        self.max_workers: Optional[int] = max_workers
+        self.chunk_bytes: int = chunk_bytes
+        self.chunk_files: int = chunk_files
+        # per-file budget; files over it keep partial results and an issue
+        self.budget: Tuple[Optional[int], Optional[float]] = (max_nodes, max_seconds)
+        self.issues: List[FileIssue] = []
+        self.arguments: str = arguments  # how call arguments are captured
         self.file_hasher: FileHasher = FileHasher()
 
-    def run(self) -> Tuple[DependencyRoadMap, dict[str, dict]]:
+    def run(
+        self, incremental: bool = False
+    ) -> Tuple[DependencyRoadMap, dict[str, dict]]:
         registry_heap: RegistryHeap = RegistryHeap(files=[])
         imports_heap: ImportsHeap = ImportsHeap(imports=[])
         calls_heap: CallsHeap = CallsHeap(calls=[])
 
         py_files = list(self.base_path.rglob("*.py"))
-        with ProcessPoolExecutor() as executor:
-            futures = {
-                executor.submit(
-                    self._process_single_file, py_file, self.base_path
-                ): py_file
-                for py_file in py_files
-            }
 
-            for future in as_completed(futures):
-                file_meta, reg_file, imp_file, calls_file, source = future.result()
-                self.file_hasher.add_file(file_meta, source)
-                registry_heap.files.append(reg_file)
-                imports_heap.imports.append(imp_file)
-                calls_heap.calls.append(calls_file)
+        # Reuse results of unchanged files from the previous version
+        previous = self._load_previous_version() if incremental else None
+        if previous is not None:
+            py_files = self._reuse_unchanged_files(
+                py_files, previous, registry_heap, imports_heap, calls_heap
+            )
 
-        # Build func/class -> file map
-        func_to_file_map: Dict[str, File] = {}
-        for reg_file in registry_heap.files:
-            for f in reg_file.functions:
-                func_to_file_map[f.function_name] = reg_file.file
+        chunks = self._chunk_files(py_files)
+        if self.max_workers == 1:
+            results = (
+                self._process_chunk(
+                    chunk, self.base_path, self.cache_dir, self.budget, self.arguments
+                )
+                for chunk in chunks
+            )
+            for chunk_results in results:
+                self._collect(chunk_results, registry_heap, imports_heap, calls_heap)
+        elif chunks:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [
+                    executor.submit(
+                        self._process_chunk,
+                        chunk,
+                        self.base_path,
+                        self.cache_dir,
+                        self.budget,
+                        self.arguments,
+                    )
+                    for chunk in chunks
+                ]
+                for future in as_completed(futures):
+                    self._collect(
+                        future.result(), registry_heap, imports_heap, calls_heap
+                    )
 
-            def walk_class(cls: RegistryClass):
-                func_to_file_map[cls.class_name] = reg_file.file
-                for f in cls.class_functions:
-                    func_to_file_map[f.function_name] = reg_file.file
-                for sub_cls in cls.classes:
-                    walk_class(sub_cls)
+        if self.cache_dir:
+            AnalysisCache(self.cache_dir, variant=self.arguments).evict()
 
-            for cls in reg_file.classes:
-                walk_class(cls)
+        # Results arrive in completion order; sort them so runs are repeatable
+        registry_heap.files.sort(key=lambda r: r.file.file_path)
+        imports_heap.imports.sort(key=lambda i: i.file.file_path)
+        calls_heap.calls.sort(key=lambda c: c.caller_file.file_path)
+        self.issues.sort(key=lambda issue: issue.file_path)
 
-        # Fill called_file for calls
-        for calls in calls_heap.calls:
-            for call in calls.calls or []:
-                if call.called_func and not call.called_file:
-                    call.called_file = func_to_file_map.get(call.called_func)
+        # Fill called_file for calls using qualified, scope-aware resolution
+        CallResolver(registry_heap, imports_heap).resolve(calls_heap)
 
         # Build dependency roadmap
         imports_dict = {i.file.file_path: i for i in imports_heap.imports}
@@ -79,12 +122,176 @@ class Processor:
         dependency_map = DependencyRoadMap(map=roadmap)
         return dependency_map, self.file_hasher.to_dict()
 
+    # -------------------- INCREMENTAL --------------------
+
+    @property
+    def analysis_version(self) -> str:
+        """What the per-file results depend on besides the source."""
+        return f"{ANALYSIS_CACHE_VERSION}.{self.arguments}"
+
+    def _load_previous_version(
+        self,
+    ) -> Optional[Tuple[FileHashCache, Dict[str, Dependency], Set[str]]]:
+        """
+        Load file hashes, per-file results and the files with issues of the
+        latest version saved by the same analyzer with the same arguments.
+        Returns None when there is nothing usable to start from.
+        """
+        if not self.data_dir:
+            return None
+
+        for version_dir in reversed(SnapshotWriter.list_snapshots(self.data_dir)):
+            roadmap_path = Reader.find_dependency_roadmap(version_dir)
+            hashes_path = version_dir / "file_hashes.json"
+            manifest_path = version_dir / SnapshotWriter.MANIFEST
+            if not (roadmap_path and hashes_path.exists() and manifest_path.exists()):
+                continue
+            manifest = Reader.read_json(manifest_path)
+            if manifest.get("analysis_version") != self.analysis_version:
+                continue  # results of another analyzer or argument mode
+            hash_cache = Reader.read_file_hashes(hashes_path)
+            deps = {
+                dep.registry.file.file_path: dep
+                for dep in Reader.iter_dependency_roadmap(
+                    roadmap_path, as_dataclasses=True
+                )
+            }
+            # partial results are analyzed again, like they are never cached
+            issue_paths = {issue["file_path"] for issue in manifest.get("issues", [])}
+            return hash_cache, deps, issue_paths
+        return None
+
+    def _reuse_unchanged_files(
+        self,
+        py_files: List[Path],
+        previous: Tuple[FileHashCache, Dict[str, Dependency], Set[str]],
+        registry_heap: RegistryHeap,
+        imports_heap: ImportsHeap,
+        calls_heap: CallsHeap,
+    ) -> List[Path]:
+        """
+        Move results of files whose hash did not change into the heaps.
+        Returns the files that still need to be processed.
+        """
+        hash_cache, previous_deps, issue_paths = previous
+        changed: List[Path] = []
+
+        for py_file in py_files:
+            file_path = str(py_file.relative_to(self.base_path))
+            old_hash = hash_cache.hashes.get(file_path)
+            dep = previous_deps.get(file_path)
+            if (
+                old_hash is None
+                or dep is None
+                or dep.imports is None
+                or file_path in issue_paths
+            ):
+                changed.append(py_file)
+                continue
+
+            source = py_file.read_text(encoding="utf-8")
+            new_hash = FileHasher.compute_source_hash(source)
+            if new_hash != old_hash.hash:
+                changed.append(py_file)
+                continue
+
+            self.file_hasher.add_hash(dep.registry.file, new_hash)
+            registry_heap.files.append(dep.registry)
+            imports_heap.imports.append(dep.imports)
+
+            calls_file = dep.calls or Calls(caller_file=dep.registry.file, calls=[])
+            # Cross-file resolution depends on other files, so redo it
+            for call in calls_file.calls or []:
+                if call.resolution in ("global", "ambiguous"):
+                    call.called_file = None
+                    call.resolution = None
+                    call.candidates = None
+            calls_heap.calls.append(calls_file)
+
+        return changed
+
+    # -------------------- WORKER --------------------
+
+    def _chunk_files(self, py_files: List[Path]) -> List[List[str]]:
+        """
+        Group files into chunks of roughly chunk_bytes of source (at most
+        chunk_files each), so small files don't cost one task apiece.
+        Chunks hold paths relative to base_path.
+        """
+        chunks: List[List[str]] = []
+        current: List[str] = []
+        current_bytes = 0
+        for py_file in sorted(py_files):
+            try:
+                size = py_file.stat().st_size
+            except OSError:
+                size = 0
+            current.append(str(py_file.relative_to(self.base_path)))
+            current_bytes += size
+            if current_bytes >= self.chunk_bytes or len(current) >= self.chunk_files:
+                chunks.append(current)
+                current, current_bytes = [], 0
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _collect(
+        self,
+        chunk_results: List[Tuple[str, str, tuple, Optional[FileIssue]]],
+        registry_heap: RegistryHeap,
+        imports_heap: ImportsHeap,
+        calls_heap: CallsHeap,
+    ) -> None:
+        """Rebuild dataclasses from packed worker results and add them to heaps."""
+        for file_path, source_hash, packed, issue in chunk_results:
+            if issue is not None:
+                self.issues.append(issue)
+            path = Path(file_path)
+            file_meta = File(
+                file_name=path.name, file_format=path.suffix, file_path=file_path
+            )
+            reg_file, imp_file, calls_file = AnalysisRecords.unpack(file_meta, packed)
+            self.file_hasher.add_hash(file_meta, source_hash)
+            registry_heap.files.append(reg_file)
+            imports_heap.imports.append(imp_file)
+            calls_heap.calls.append(calls_file)
+
+    @staticmethod
+    def _process_chunk(
+        file_paths: List[str],
+        base_path: Path,
+        cache_dir: Optional[Path] = None,
+        budget: Tuple[Optional[int], Optional[float]] = (None, None),
+        arguments: str = "span",
+    ) -> List[Tuple[str, str, tuple, Optional[FileIssue]]]:
+        """Process a chunk of files; returns (file_path, hash, packed results, issue)."""
+        results = []
+        for file_path in file_paths:
+            file_meta, reg_file, imp_file, calls_file, source_hash, issue = (
+                Processor._process_single_file(
+                    base_path / file_path, base_path, cache_dir, *budget, arguments
+                )
+            )
+            packed = AnalysisRecords.pack(reg_file, imp_file, calls_file)
+            results.append((file_meta.file_path, source_hash, packed, issue))
+        return results
+
     @staticmethod
     def _process_single_file(
-        py_file: Path, base_path: Path
-    ) -> Tuple[File, RegistryFile, Imports, Calls, str]:
+        py_file: Path,
+        base_path: Path,
+        cache_dir: Optional[Path] = None,
+        max_nodes: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+        arguments: str = "span",
+    ) -> Tuple[File, RegistryFile, Imports, Calls, str, Optional[FileIssue]]:
+        """
+        Analyze one file. A file that does not parse gets empty results, one
+        over the node or time budget what was found until then; both come
+        with a FileIssue and are not cached.
+        """
         source: str = py_file.read_text(encoding="utf-8")
-        file_ast = Reader.parse_source(source)
+        source_hash = FileHasher.compute_source_hash(source)
 
         file_meta = File(
             file_name=py_file.name,
@@ -92,15 +299,58 @@ class Processor:
             file_path=str(py_file.relative_to(base_path)),
         )
 
-        reg_file = Register.build_registry(file_ast, file_meta)
-        imp_file = ImportsAnalyzer.analyze_file_ast(file_ast, file_meta)
+        cache = None
+        if cache_dir:
+            cache = AnalysisCache.shared(cache_dir, variant=arguments)
+        if cache:
+            cached = cache.get(source_hash, file_meta)
+            if cached is not None:
+                return (file_meta, *cached, source_hash, None)
 
-        imports_map = {
-            imp.imported_name: imp.imported_from for imp in imp_file.imports or []
-        }
-
-        calls_file = CallAnalyzer.analyze_file_ast(
-            file_ast, file_meta, RegistryHeap(files=[]), imports_map
+        registry = RegistryCollector(file_meta)
+        imports = ImportsCollector(file_meta)
+        calls = CallCollector(
+            file_meta, imports=imports, arguments=arguments, source=source
+        )
+        visitor = FileVisitor(
+            [registry, imports, calls], max_nodes=max_nodes, max_seconds=max_seconds
         )
+        issue = None
+        try:
+            file_ast = Reader.parse_source(source)
+        except (SyntaxError, ValueError) as e:
+            issue = FileIssue(file_meta.file_path, "syntax_error", detail=str(e))
+        except (RecursionError, MemoryError) as e:
+            # the parser gives up on very deeply nested expressions
+            issue = FileIssue(file_meta.file_path, "recursion", detail=str(e))
+        else:
+            # registry, imports and calls in one pass over the AST
+            try:
+                visitor.visit(file_ast)
+            except RecursionError as e:
+                issue = FileIssue(
+                    file_meta.file_path, "recursion", visitor.nodes, str(e)
+                )
+            if visitor.stopped:
+                issue = FileIssue(file_meta.file_path, visitor.stopped, visitor.nodes)
+
+        # callees and receiver types are worked out here, after the visit
+        results = []
+        try:
+            for collector in (registry, imports, calls):
+                results.append(collector.result())
+        except RecursionError as e:
+            issue = FileIssue(file_meta.file_path, "recursion", visitor.nodes, str(e))
+            # the rest is empty, as for a file that does not parse
+            empty = (
+                RegistryCollector(file_meta),
+                ImportsCollector(file_meta),
+                CallCollector(file_meta),
+            )
+            results.extend(c.result() for c in empty[len(results) :])
+        reg_file, imp_file, calls_file = results
+
+        if cache and issue is None:
+            cache.put(source_hash, reg_file, imp_file, calls_file)
 
-        return file_meta, reg_file, imp_file, calls_file, source
+        return file_meta, reg_file, imp_file, calls_file, source_hash, issue
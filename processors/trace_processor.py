@@ -0,0 +1,79 @@
+import runpy
+import sys
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from analyzer.line_heatmap import Heatmap, LineHeatmap
+from analyzer.runtime_tracer import RuntimeTracer
+from models.calls import CallsHeap
+
+
+class TraceProcessor:
+    """
+    Runs a script or a pytest session under the RuntimeTracer and returns
+    the calls it made between functions of base_path, in the same Calls
+    model as the static analysis plus their runtime counts and timings.
+    With heatmap=True executed lines are counted too (see line_heatmap).
+    """
+
+    def __init__(
+        self, base_path: Path, ring_size: int = 1 << 16, heatmap: bool = False
+    ):
+        self.base_path = Path(base_path)
+        self.ring_size = ring_size
+        self.heatmap = heatmap
+        self.tracer: Optional[RuntimeTracer] = None
+        self.line_heatmap: Optional[Heatmap] = None
+        self.exit_code: Optional[int] = None
+
+    def run(self, command: Sequence[str]) -> CallsHeap:
+        """command is ["pytest", *args] or [script, *args]."""
+        if not command:
+            raise ValueError("Nothing to trace: give a script or pytest")
+        if command[0] == "pytest":
+            return self.run_pytest(command[1:])
+        return self.run_script(Path(command[0]), command[1:])
+
+    def run_script(self, script: Path, args: Sequence[str] = ()) -> CallsHeap:
+        """Run a script as __main__ with the given argv."""
+        saved_argv, saved_path = sys.argv, list(sys.path)
+        sys.argv = [str(script), *args]
+        sys.path.insert(0, str(script.resolve().parent))
+        try:
+            return self._trace(lambda: runpy.run_path(str(script), run_name="__main__"))
+        finally:
+            sys.argv, sys.path[:] = saved_argv, saved_path
+
+    def run_pytest(self, args: Sequence[str] = ()) -> CallsHeap:
+        """Run a pytest session in this process."""
+        try:
+            import pytest
+        except ImportError as e:
+            raise RuntimeError("Tracing a pytest session needs pytest") from e
+        return self._trace(lambda: pytest.main(list(args)))
+
+    def _trace(self, target) -> CallsHeap:
+        self.tracer = RuntimeTracer(self.base_path, ring_size=self.ring_size)
+        lines = LineHeatmap(self.base_path) if self.heatmap else None
+        self.exit_code = 0
+        if lines:
+            lines.start()
+        try:
+            with self.tracer:
+                try:
+                    result = target()
+                except SystemExit as e:
+                    result = e.code
+        finally:
+            if lines:
+                lines.stop()
+                self.line_heatmap = lines.heatmap()
+        if isinstance(result, int):
+            self.exit_code = int(result)
+        elif result is not None and not isinstance(result, dict):
+            self.exit_code = 1  # sys.exit("message")
+        return CallsHeap(calls=self.tracer.calls())
+
+    def sequence(self) -> List[tuple]:
+        """Latest traced events of the last run, oldest first."""
+        return list(self.tracer.sequence()) if self.tracer else []
@@ -1,14 +1,10 @@
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 from analyzer.roadmap_diff_analyzer import RoadmapDiff
-from models.versions import (
-    FileChange,
-    FunctionChange,
-    StructuredRoadmapChanges,
-    VersionReport,
-)
+from models.versions import StructuredRoadmapChanges, VersionReport
 from utils.reader import Reader
+from utils.snapshot import SnapshotWriter
 
 
 class VersionProcessor:
@@ -17,72 +13,96 @@ class VersionProcessor:
     def __init__(self, data_dir: Path):
         self.data_dir = data_dir
 
+    @staticmethod
+    def _load_roadmap(version_dir: Path) -> dict:
+        """Return the roadmap of a version with its records streamed lazily."""
+        roadmap_path = Reader.find_dependency_roadmap(version_dir)
+        if roadmap_path is None:
+            raise FileNotFoundError(f"No dependency roadmap in {version_dir}")
+        return {"map": Reader.iter_dependency_roadmap(roadmap_path)}
+
+    def _load_index(self, version_dir: Path) -> Tuple[Dict[str, str], RoadmapDiff]:
+        """
+        Return (file hashes, signatures) of a version. Uses the compact
+        roadmap_index.json when present and falls back to walking the full
+        roadmap for snapshots saved before indexes existed.
+        """
+        index_path = version_dir / SnapshotWriter.INDEX
+        if index_path.exists():
+            index = Reader.read_json(index_path)
+            return index["hashes"], RoadmapDiff.from_index(index["files"])
+
+        hashes = Reader.read_json(version_dir / "file_hashes.json")
+        return (
+            {path: data["hash"] for path, data in hashes.items()},
+            RoadmapDiff(self._load_roadmap(version_dir)),
+        )
+
+    def list_versions(self) -> List[str]:
+        """Return the ids of all saved versions, oldest first."""
+        return [d.name for d in SnapshotWriter.list_snapshots(self.data_dir)]
+
+    def _version_dir(self, version: str) -> Path:
+        version_dir = self.data_dir / version
+        if version.startswith(".") or not version_dir.is_dir():
+            raise FileNotFoundError(f"Unknown version: {version}")
+        return version_dir
+
+    # -------------------- COMPARE --------------------
+
     def compare_latest_versions(self) -> Optional[VersionReport]:
         """Load latest two versions and return a VersionReport."""
-        dirs = sorted(
-            [d for d in self.data_dir.iterdir() if d.is_dir()], key=lambda d: d.name
-        )
-        if len(dirs) < 2:
+        versions = self.list_versions()
+        if len(versions) < 2:
             return None  # Not enough versions
+        return self.compare_versions(versions[-2], versions[-1])
 
-        old_dir, new_dir = dirs[-2], dirs[-1]
-
-        old_roadmap = Reader.read_json(old_dir / "dependency_roadmap.json")
-        new_roadmap = Reader.read_json(new_dir / "dependency_roadmap.json")
-        old_hashes = Reader.read_json(old_dir / "file_hashes.json")
-        new_hashes = Reader.read_json(new_dir / "file_hashes.json")
+    def compare_versions(self, old_version: str, new_version: str) -> VersionReport:
+        """Compare any two saved versions by id."""
+        old_hashes, old_diff = self._load_index(self._version_dir(old_version))
+        new_hashes, new_diff = self._load_index(self._version_dir(new_version))
 
         # Compute hash changes
         hash_changes = {}
-        for file_path, old_data in old_hashes.items():
-            new_data = new_hashes.get(file_path)
-            if not new_data:
+        for file_path, old_hash in old_hashes.items():
+            new_hash = new_hashes.get(file_path)
+            if not new_hash:
                 hash_changes[file_path] = {"status": "removed"}
-            elif old_data["hash"] != new_data["hash"]:
+            elif old_hash != new_hash:
                 hash_changes[file_path] = {
                     "status": "modified",
-                    "old_hash": old_data["hash"],
-                    "new_hash": new_data["hash"],
+                    "old_hash": old_hash,
+                    "new_hash": new_hash,
                 }
         for file_path in new_hashes.keys() - old_hashes.keys():
             hash_changes[file_path] = {"status": "added"}
 
         # Only compute roadmap diffs for files that changed
-        files_changes = []
-        if hash_changes:
-            old_diff = RoadmapDiff(old_roadmap)
-            new_diff = RoadmapDiff(new_roadmap)
-
-            # Filter diff by files that have hash changes
-            changed_files = set(hash_changes.keys())
-            for file in changed_files:
-                added_funcs = [
-                    FunctionChange(**f)
-                    for f in new_diff.funcs_by_file.get(file, [])
-                    if f not in old_diff.funcs_by_file.get(file, [])
-                ]
-                removed_funcs = [
-                    FunctionChange(**f)
-                    for f in old_diff.funcs_by_file.get(file, [])
-                    if f not in new_diff.funcs_by_file.get(file, [])
-                ]
-
-                if added_funcs or removed_funcs:
-                    files_changes.append(
-                        FileChange(
-                            file_path=file,
-                            added_functions=added_funcs,
-                            removed_functions=removed_funcs,
-                            added_classes=[],  # can extend later
-                            removed_classes=[],
-                        )
-                    )
+        files_changes = old_diff.diff_files(new_diff, sorted(hash_changes))
 
         roadmap_changes = StructuredRoadmapChanges(files=files_changes)
 
         return VersionReport(
-            old_version=old_dir.name,
-            new_version=new_dir.name,
+            old_version=old_version,
+            new_version=new_version,
             hash_changes=hash_changes,
             roadmap_changes=roadmap_changes,
         )
+
+    def compare_range(self, old_version: str, new_version: str) -> List[VersionReport]:
+        """
+        Compare every consecutive pair of versions from old_version to
+        new_version (inclusive), e.g. to see what each nightly changed.
+        """
+        versions = self.list_versions()
+        for version in (old_version, new_version):
+            if version not in versions:
+                raise FileNotFoundError(f"Unknown version: {version}")
+        start, end = versions.index(old_version), versions.index(new_version)
+        if start > end:
+            raise ValueError(f"{old_version} is newer than {new_version}")
+
+        selected = versions[start : end + 1]
+        return [
+            self.compare_versions(old, new) for old, new in zip(selected, selected[1:])
+        ]
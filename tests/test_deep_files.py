@@ -0,0 +1,40 @@
+from pathlib import Path
+
+from analyzer.type_inference import TypeInference
+from processors.processor import Processor
+
+
+def _run(tmp_path: Path, source: str) -> Processor:
+    (tmp_path / "deep.py").write_text(source, encoding="utf-8")
+    processor = Processor(tmp_path, max_workers=1)
+    processor.roadmap, _ = processor.run()
+    return processor
+
+
+def _calls(processor: Processor):
+    return processor.roadmap.map[0].calls.calls
+
+
+def test_long_method_chain(tmp_path):
+    processor = _run(tmp_path, "def f(q):\n    return q" + ".a()" * 900 + "\n")
+    assert processor.issues == []
+    assert len(_calls(processor)) == 900
+
+
+def test_long_assignment_chain(tmp_path):
+    lines = ["class Foo:\n    def m(self):\n        pass\n", "a0 = Foo()"]
+    lines += [f"a{i} = a{i - 1}" for i in range(1, 3000)]
+    lines.append("a2999.m()")
+    processor = _run(tmp_path, "\n".join(lines) + "\n")
+    assert processor.issues == []
+
+
+def test_recursion_after_visit_is_an_issue(tmp_path, monkeypatch):
+    def type_of(self, expr, scope):
+        raise RecursionError("maximum recursion depth exceeded")
+
+    # receiver types are inferred by calls.result(), after the visit
+    monkeypatch.setattr(TypeInference, "type_of", type_of)
+    processor = _run(tmp_path, "def f(x):\n    x.g()\n")
+    assert [issue.reason for issue in processor.issues] == ["recursion"]
+    assert _calls(processor) == []
@@ -0,0 +1,51 @@
+import random
+
+import networkx as nx
+
+from processors.execution_chain_build_processor import ExecutionChainBuildProcessor
+
+
+def _processor(graph: nx.DiGraph) -> ExecutionChainBuildProcessor:
+    processor = ExecutionChainBuildProcessor(None)
+    processor.graph = graph
+    return processor
+
+
+def _union(chains):
+    return set().union(*(chain.nodes for chain in chains))
+
+
+def test_dedupe_walks_shared_nodes_reached_with_more_depth_left():
+    graph = nx.DiGraph()
+    graph.add_edges_from(
+        [
+            ("r1", "a"),
+            ("a", "b"),
+            ("b", "c"),
+            ("r2", "s"),
+            ("s", "b"),
+            ("s", "c"),
+            ("s", "d"),
+            ("c", "d"),
+            ("d", "x"),
+        ]
+    )
+    processor = _processor(graph)
+    plain = list(processor.iter_entrypoint_chains(cutoff=3))
+    deduped = list(processor.iter_entrypoint_chains(cutoff=3, dedupe=True))
+    assert _union(deduped) == _union(plain)
+
+
+def test_dedupe_lists_every_node_of_the_plain_walk():
+    for seed in range(200):
+        rng = random.Random(seed)
+        graph = nx.gnp_random_graph(
+            rng.randint(5, 30), rng.choice((0.08, 0.15, 0.25)), seed=seed, directed=True
+        )
+        processor = _processor(graph)
+        for cutoff in (1, 2, 3, 5):
+            plain = list(processor.iter_entrypoint_chains(cutoff))
+            deduped = list(processor.iter_entrypoint_chains(cutoff, dedupe=True))
+            assert _union(deduped) >= _union(plain), (seed, cutoff)
+            for chain in deduped:
+                assert len(chain.nodes) == len(set(chain.nodes))
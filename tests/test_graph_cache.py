@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from processors.execution_chain_build_processor import ExecutionChainBuildProcessor
+from processors.processor import Processor
+
+
+def _graph_nodes(base: Path, cache_dir=None):
+    roadmap, hashes = Processor(base, max_workers=1).run()
+    chains = ExecutionChainBuildProcessor(
+        roadmap, cache_dir=cache_dir, file_hashes=hashes
+    )
+    chains.build_graph()
+    return {chains.graph.nodes[n].get("label", n) for n in chains.to_networkx()}
+
+
+def test_cached_shard_follows_callee_labels_of_other_files(tmp_path):
+    base = tmp_path / "src"
+    base.mkdir()
+    (base / "a.py").write_text(
+        "from b import helper\n\n\ndef run():\n    x = helper()\n    x.m()\n"
+    )
+    (base / "b.py").write_text("class helper:\n    pass\n")
+    _graph_nodes(base, tmp_path / "cache")
+
+    # a.py is unchanged, but helper is no class any more
+    (base / "b.py").write_text("def helper():\n    pass\n")
+    cached = _graph_nodes(base, tmp_path / "cache")
+    assert cached == _graph_nodes(base)
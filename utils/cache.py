@@ -0,0 +1,225 @@
+import json
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from models.calls import Calls
+from models.file import File
+from models.hash import ASTCache
+from models.imports import Imports
+from models.registry import RegistryFile
+from utils.graph_store import GraphShard
+from utils.reader import Reader
+from utils.writer import Writer
+
+# Bump whenever analyzers change what they produce for the same source,
+# so entries written by older analyzers are never served again.
+ANALYSIS_CACHE_VERSION = "5"
+
+# Bump whenever ExecutionChainBuildProcessor changes the shards it builds.
+GRAPH_CACHE_VERSION = "3"
+
+
+class AnalysisCache:
+    """
+    Content-addressed on-disk cache of per-file analysis results.
+    Entries are keyed by the SHA-256 of the source and hold the
+    RegistryFile / Imports / Calls produced for it, so identical files
+    (vendored copies, unchanged files on other branches) are analyzed once.
+
+    Results that also depend on a setting (the argument capture mode) live
+    in one variant directory per value, under the same version directory,
+    and share its size budget.
+    """
+
+    _shared: Dict[Tuple[str, str, Optional[str]], "AnalysisCache"] = {}
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int = 512 * 1024 * 1024,
+        version: str = ANALYSIS_CACHE_VERSION,
+        variant: Optional[str] = None,
+        memory_entries: int = 256,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.version = version
+        self.variant = variant
+        self.root_dir = cache_dir / f"v{version}"
+        self.version_dir = self.root_dir / variant if variant else self.root_dir
+        # in-process LRU layer of memory_entries entries on top of the disk
+        self.memory: ASTCache = ASTCache(cache=OrderedDict())
+
+    @classmethod
+    def shared(
+        cls,
+        cache_dir: Path,
+        version: str = ANALYSIS_CACHE_VERSION,
+        variant: Optional[str] = None,
+    ) -> "AnalysisCache":
+        """Return one cache instance per directory, version and variant."""
+        key = (str(cache_dir), version, variant)
+        if key not in cls._shared:
+            cls._shared[key] = cls(cache_dir, version=version, variant=variant)
+        return cls._shared[key]
+
+    def _entry_path(self, source_hash: str) -> Path:
+        return self.version_dir / source_hash[:2] / f"{source_hash}.json"
+
+    # -------------------- READ / WRITE --------------------
+
+    def get(
+        self, source_hash: str, file_meta: File
+    ) -> Optional[Tuple[RegistryFile, Imports, Calls]]:
+        """Return cached results re-labelled for file_meta, or None on a miss."""
+        data = self.memory.cache.get(source_hash)
+        if data is not None:
+            self.memory.cache.move_to_end(source_hash)
+        else:
+            path = self._entry_path(source_hash)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                # mark as recently used for LRU eviction
+                os.utime(path)
+            except (OSError, ValueError):
+                return None
+            self._remember(source_hash, data)
+
+        reg_file = Reader.registry_file_from_dict(data["registry"])
+        imp_file = Reader.imports_from_dict(data["imports"])
+        calls_file = Reader.calls_from_dict(data["calls"])
+
+        # The same content may live under another path
+        reg_file.file = file_meta
+        imp_file.file = file_meta
+        calls_file.caller_file = file_meta
+        return reg_file, imp_file, calls_file
+
+    def put(
+        self,
+        source_hash: str,
+        reg_file: RegistryFile,
+        imp_file: Imports,
+        calls_file: Calls,
+    ) -> None:
+        """Store results for a source hash; the write is atomic."""
+        data = {
+            "registry": Writer.dataclass_to_dict(reg_file),
+            "imports": Writer.dataclass_to_dict(imp_file),
+            "calls": Writer.dataclass_to_dict(calls_file),
+        }
+        self._remember(source_hash, data)
+
+        path = self._entry_path(source_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_name, path)
+        except OSError:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+
+    def _remember(self, source_hash: str, data: dict) -> None:
+        memory = self.memory.cache
+        memory[source_hash] = data
+        memory.move_to_end(source_hash)
+        while len(memory) > self.memory_entries:
+            memory.popitem(last=False)
+
+    # -------------------- EVICTION --------------------
+
+    def evict(self) -> int:
+        """
+        Drop entries of other cache versions, then remove least recently
+        used entries of all variants until the cache fits in max_bytes.
+        Returns the number of removed entries.
+        """
+        if not self.cache_dir.is_dir():
+            return 0
+
+        for d in self.cache_dir.iterdir():
+            if d.is_dir() and d != self.root_dir:
+                shutil.rmtree(d, ignore_errors=True)
+
+        entries = []
+        total = 0
+        for path in self.root_dir.rglob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            if path.parent.parent == self.version_dir:
+                self.memory.cache.pop(path.stem, None)
+            total -= size
+            removed += 1
+        return removed
+
+
+class GraphShardCache:
+    """
+    Graph shards of the previous build, keyed by what they are built from
+    (file path, source hash, resolved call targets). All shards live in
+    one file, so loading them is one read instead of one per file, and
+    saving keeps only the shards of the current build.
+    """
+
+    FILE_NAME = "graph_shards.json"
+
+    def __init__(self, cache_dir: Path, version: str = GRAPH_CACHE_VERSION):
+        self.path = cache_dir / self.FILE_NAME
+        # analysis results feed the shards, so a new analyzer invalidates them too
+        self.version = f"{version}.{ANALYSIS_CACHE_VERSION}"
+        self.shards: Dict[str, list] = self._load()
+
+    def _load(self) -> Dict[str, list]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != self.version:
+            return {}
+        return data.get("shards", {})
+
+    def get(self, key: str) -> Optional[GraphShard]:
+        packed = self.shards.get(key)
+        return GraphShard.unpack(packed) if packed is not None else None
+
+    def save(self, shards: Dict[str, GraphShard]) -> None:
+        """Replace the stored shards with the given ones; the write is atomic."""
+        if shards.keys() == self.shards.keys():
+            return  # same inputs, same shards
+        self.shards = {key: list(shard.pack()) for key, shard in shards.items()}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": self.version, "shards": self.shards},
+                    f,
+                    separators=(",", ":"),
+                )
+            os.replace(tmp_name, self.path)
+        except OSError:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
@@ -0,0 +1,246 @@
+import gzip
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# -------------------- VIEWER --------------------
+# Fetches a JSON payload, gunzipping it when stored compressed; servers that
+# already decoded it (Content-Encoding: gzip) hand over plain JSON.
+FETCH_JSON_JS = """
+async function fetchJson(file) {
+  const response = await fetch(file);
+  if (!response.ok) throw new Error(file + ": " + response.status);
+  const bytes = new Uint8Array(await response.arrayBuffer());
+  if (bytes[0] === 0x1f && bytes[1] === 0x8b) {
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+    return JSON.parse(await new Response(stream).text());
+  }
+  return JSON.parse(new TextDecoder().decode(bytes));
+}
+"""
+
+# One static page for every chart of a run: it reads manifest.json, lists the
+# charts and fetches the payload of the selected one. Browsers refuse fetch()
+# on file:// pages, so serve the folder (python -m http.server).
+# vis-network is pinned to 9.1.2, the version pyvis charts are drawn with.
+VIEWER_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Call chains</title>
+<link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/vis-network@9.1.2/styles/vis-network.css">
+<script src="https://cdn.jsdelivr.net/npm/vis-network@9.1.2/dist/vis-network.min.js"></script>
+<style>
+  html, body { margin: 0; height: 100%; font-family: Arial, Helvetica, sans-serif; }
+  #graph { position: absolute; inset: 0; }
+  #picker { position: fixed; left: 12px; top: 12px; z-index: 10; font-size: 13px;
+            background: rgba(255,255,255,0.95); border: 1px solid #cfcfcf;
+            border-radius: 8px; padding: 8px 10px; }
+</style>
+</head>
+<body>
+<div id="picker">
+  <select id="charts"></select>
+  <span id="status"></span>
+</div>
+<div id="graph"></div>
+__LEGEND__
+<script>
+const NODE_DEFAULTS = __NODE_DEFAULTS__;
+const EDGE_DEFAULTS = __EDGE_DEFAULTS__;
+let manifest = null;
+let network = null;
+__FETCH_JSON__
+function expand(payload) {
+  const nodes = payload.nodes.map((node, id) => {
+    const full = Object.assign({ id: id }, NODE_DEFAULTS, node);
+    if (full.title === undefined) full.title = full.label;
+    return full;
+  });
+  const edges = payload.edges.map((edge) => {
+    const [from, to, attrs] = edge;
+    return Object.assign({ from: from, to: to }, EDGE_DEFAULTS, attrs || {});
+  });
+  return { nodes: new vis.DataSet(nodes), edges: new vis.DataSet(edges) };
+}
+
+async function show(index) {
+  const chart = manifest.charts[index];
+  if (chart.viewer) {
+    window.location.href = chart.viewer;
+    return;
+  }
+  document.getElementById("status").textContent = " loading...";
+  const payload = await fetchJson(chart.file);
+  if (network) network.destroy();
+  network = new vis.Network(document.getElementById("graph"), expand(payload), manifest.options);
+  document.getElementById("status").textContent =
+    " " + chart.nodes + " nodes, " + chart.edges + " edges";
+  window.location.hash = encodeURIComponent(chart.name);
+}
+
+fetchJson("__MANIFEST__").then((data) => {
+  manifest = data;
+  const select = document.getElementById("charts");
+  manifest.charts.forEach((chart, index) => {
+    const option = document.createElement("option");
+    option.value = index;
+    option.textContent = chart.name;
+    select.appendChild(option);
+  });
+  select.addEventListener("change", () => show(Number(select.value)));
+  const wanted = decodeURIComponent(window.location.hash.slice(1));
+  const start = Math.max(0, manifest.charts.findIndex((chart) => chart.name === wanted));
+  select.value = start;
+  if (manifest.charts.length) show(start);
+}).catch((error) => {
+  document.getElementById("status").textContent =
+    "Could not load charts (" + error.message + "). Serve this folder over HTTP.";
+});
+</script>
+</body>
+</html>
+"""
+
+
+class ChartData:
+    """
+    Stand-in for pyvis.Network when charts are saved as payloads. Same
+    add_node/add_edge semantics and node/edge dicts, without pyvis'
+    linear duplicate scans per call or its HTML template.
+    """
+
+    def __init__(self):
+        self.nodes: List[dict] = []
+        self.edges: List[dict] = []
+        self.options: dict = {}
+        self._node_ids = set()
+
+    def set_options(self, options: str):
+        self.options = json.loads(options)
+
+    def add_node(self, n_id, label=None, shape="dot", **options):
+        if n_id in self._node_ids:
+            return
+        self._node_ids.add(n_id)
+        options["id"] = n_id
+        options["label"] = label if label else n_id
+        options["shape"] = shape
+        self.nodes.append(options)
+
+    def add_edge(self, source, to, **options):
+        assert source in self._node_ids, f"non existent node '{source}'"
+        assert to in self._node_ids, f"non existent node '{to}'"
+        options["from"] = source
+        options["to"] = to
+        options.setdefault("arrows", "to")
+        self.edges.append(options)
+
+
+class ChartStore:
+    """
+    Writes charts as compact JSON payloads next to one shared viewer page
+    and a manifest.json listing them, instead of one standalone HTML file
+    per chart with the data, legend and scripts inlined every time.
+
+    Payload layout:
+        {"nodes": [{...}], "edges": [[from, to, {...}]]}
+    Node ids are replaced by their index in "nodes", and attributes equal
+    to NODE_DEFAULTS / EDGE_DEFAULTS (or a title equal to the label) are
+    left out; the viewer puts them back.
+    """
+
+    VIEWER = "index.html"
+    MANIFEST = "manifest.json"
+    CHARTS_DIR = "charts"
+    COMPRESSIONS = (None, "gzip")  # what browsers can decompress
+
+    NODE_DEFAULTS = {"shape": "dot", "physics": False, "fixed": False}
+    EDGE_DEFAULTS = {"arrows": "to", "physics": False}
+
+    def __init__(self, folder: Path, compression: Optional[str] = None):
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f"Unsupported payload compression: {compression}")
+        self.folder = folder
+        self.compression = compression
+
+    def payload_path(self, file_name: str) -> Path:
+        suffix = ".json.gz" if self.compression == "gzip" else ".json"
+        return self.folder / self.CHARTS_DIR / f"{file_name}{suffix}"
+
+    # -------------------- PAYLOADS --------------------
+
+    @classmethod
+    def to_payload(cls, net) -> dict:
+        """Compact form of a pyvis network's nodes and edges."""
+        ids: Dict[str, int] = {}
+        nodes = []
+        for node in net.nodes:
+            ids[node["id"]] = len(nodes)
+            nodes.append(
+                {
+                    key: value
+                    for key, value in node.items()
+                    if key != "id"
+                    and value is not None
+                    and cls.NODE_DEFAULTS.get(key, ...) != value
+                    and not (key == "title" and value == node.get("label"))
+                }
+            )
+        edges = []
+        for edge in net.edges:
+            attrs = {
+                key: value
+                for key, value in edge.items()
+                if key not in ("from", "to")
+                and value is not None
+                and cls.EDGE_DEFAULTS.get(key, ...) != value
+            }
+            record = [ids[edge["from"]], ids[edge["to"]]]
+            if attrs:
+                record.append(attrs)
+            edges.append(record)
+        return {"nodes": nodes, "edges": edges}
+
+    @staticmethod
+    def write_payload(payload: dict, path: Path, compression: Optional[str] = None):
+        data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        if compression == "gzip":
+            data = gzip.compress(data, mtime=0)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def save_chart(self, net, name: str, path: Path) -> dict:
+        """Write one chart payload; returns its manifest entry."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.write_payload(self.to_payload(net), path, self.compression)
+        return {
+            "name": name,
+            "file": path.relative_to(self.folder).as_posix(),
+            "nodes": len(net.nodes),
+            "edges": len(net.edges),
+        }
+
+    # -------------------- INDEX --------------------
+
+    def save_index(self, charts: List[dict], options: dict, legend_html: str = ""):
+        """Write manifest.json and the shared viewer page."""
+        manifest = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "compression": self.compression,
+            "options": options,
+            "charts": charts,
+        }
+        with open(self.folder / self.MANIFEST, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+
+        html = (
+            VIEWER_HTML.replace("__FETCH_JSON__", FETCH_JSON_JS)
+            .replace("__MANIFEST__", self.MANIFEST)
+            .replace("__NODE_DEFAULTS__", json.dumps(self.NODE_DEFAULTS))
+            .replace("__EDGE_DEFAULTS__", json.dumps(self.EDGE_DEFAULTS))
+            .replace("__LEGEND__", legend_html)
+        )
+        with open(self.folder / self.VIEWER, "w", encoding="utf-8") as f:
+            f.write(html)
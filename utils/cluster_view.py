@@ -0,0 +1,327 @@
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import networkx as nx
+
+from utils.chart_store import FETCH_JSON_JS, ChartStore
+
+# -------------------- VIEWER --------------------
+# Static page shared by every clustered chart. It loads the level0 payload next
+# to it and fetches the payload of a cluster when it is expanded. Browsers refuse
+# fetch() on file:// pages, so serve the folder (python -m http.server).
+# vis-network is pinned to 9.1.2, the version pyvis charts are drawn with.
+VIEWER_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/vis-network@9.1.2/styles/vis-network.css">
+<script src="https://cdn.jsdelivr.net/npm/vis-network@9.1.2/dist/vis-network.min.js"></script>
+<style>
+  html, body { margin: 0; height: 100%; font-family: Arial, Helvetica, sans-serif; }
+  #graph { position: absolute; inset: 0; }
+  #help { position: fixed; left: 12px; top: 12px; z-index: 10; font-size: 13px;
+          background: rgba(255,255,255,0.95); border: 1px solid #cfcfcf;
+          border-radius: 8px; padding: 8px 10px; max-width: 320px; }
+</style>
+</head>
+<body>
+<div id="help">
+  <b>__TITLE__</b><br>
+  Double-click a cluster to expand it, right-click a node to collapse its
+  cluster. Edge labels count the calls between clusters.
+  <div id="status"></div>
+</div>
+<div id="graph"></div>
+<script>
+const PAYLOADS = "__PAYLOADS__/";
+const visible = new Map();   // id -> item shown as a node
+const expanded = new Map();  // id -> payload of an expanded cluster
+const nodes = new vis.DataSet();
+const edges = new vis.DataSet();
+const network = new vis.Network(
+  document.getElementById("graph"),
+  { nodes: nodes, edges: edges },
+  {
+    physics: { solver: "forceAtlas2Based", stabilization: { iterations: 150 } },
+    nodes: { shape: "dot", scaling: { min: 8, max: 60 } },
+    edges: { arrows: "to", scaling: { min: 1, max: 12 }, font: { size: 10 } },
+    interaction: { hover: true },
+  }
+);
+
+__FETCH_JSON__
+function loadPayload(file) {
+  return fetchJson(PAYLOADS + file);
+}
+
+function show(payload, parentPath) {
+  for (const child of payload.children) {
+    visible.set(child.id, Object.assign({ path: parentPath.concat([child.id]) }, child));
+  }
+}
+
+// the visible node standing in for a cluster path, or null when the path
+// is expanded below its last entry (the deeper side reports that edge)
+function representative(path) {
+  for (let i = 0; i < path.length; i++) {
+    if (visible.has(path[i])) return { id: path[i], depth: i + 1 };
+    if (!expanded.has(path[i])) return null;
+  }
+  return null;
+}
+
+function render() {
+  const counts = new Map();
+  for (const payload of expanded.values()) {
+    for (const child of payload.children) {
+      const item = visible.get(child.id);
+      if (!item) continue;
+      for (const [other, count, direction] of payload.edges[child.id] || []) {
+        const rep = representative(other);
+        if (!rep || rep.id === child.id) continue;
+        // equal depth: both sides carry the edge, keep the outgoing copy
+        if (rep.depth === item.path.length && direction === "in") continue;
+        const key = direction === "out" ? [child.id, rep.id] : [rep.id, child.id];
+        const id = JSON.stringify(key);
+        counts.set(id, (counts.get(id) || 0) + count);
+      }
+    }
+  }
+  nodes.clear();
+  nodes.add([...visible.values()].map((item) => ({
+    id: item.id,
+    label: item.label,
+    title: item.label + (item.payload ? " (" + item.size + " nodes)" : ""),
+    value: item.size,
+    color: item.color,
+    borderWidth: item.payload ? 3 : 1,
+  })));
+  edges.clear();
+  edges.add([...counts.entries()].map(([id, count]) => {
+    const [from, to] = JSON.parse(id);
+    return { id: id, from: from, to: to, value: count, label: count > 1 ? String(count) : undefined };
+  }));
+  document.getElementById("status").textContent =
+    visible.size + " nodes, " + counts.size + " edges shown";
+}
+
+async function expand(id) {
+  const item = visible.get(id);
+  if (!item || !item.payload) return;
+  const payload = await loadPayload(item.payload);
+  visible.delete(id);
+  expanded.set(id, payload);
+  show(payload, item.path);
+  render();
+}
+
+function collapse(id) {
+  const item = visible.get(id);
+  if (!item || item.path.length < 2) return;
+  const parentPath = item.path.slice(0, -1);
+  const parent = parentPath[parentPath.length - 1];
+  const grandparent = expanded.get(parentPath.length > 1 ? parentPath[parentPath.length - 2] : "");
+  for (const [key, other] of [...visible.entries()]) {
+    if (other.path.includes(parent)) visible.delete(key);
+  }
+  for (const [key, payload] of [...expanded.entries()]) {
+    if (payload.path.includes(parent)) expanded.delete(key);
+  }
+  const entry = grandparent.children.find((child) => child.id === parent);
+  visible.set(parent, Object.assign({ path: parentPath }, entry));
+  render();
+}
+
+network.on("doubleClick", (params) => { if (params.nodes.length) expand(params.nodes[0]); });
+network.on("oncontext", (params) => {
+  params.event.preventDefault();
+  const id = network.getNodeAt(params.pointer.DOM);
+  if (id !== undefined) collapse(id);
+});
+
+loadPayload("__LEVEL0__").then((payload) => {
+  expanded.set("", payload);
+  show(payload, []);
+  render();
+}).catch((error) => {
+  document.getElementById("status").textContent =
+    "Could not load payloads (" + error.message + "). Serve this folder over HTTP.";
+});
+</script>
+</body>
+</html>
+"""
+
+
+class ClusterView:
+    """
+    Level-of-detail view of a call graph for charts too large to render
+    node by node. Nodes are collapsed into clusters (package -> file ->
+    class, starting at group_by) with aggregated edge counts.
+
+    Each cluster's children and their edges are one JSON payload: level0.json
+    holds the top level and the others are fetched by the viewer only when
+    their cluster is expanded, so the page stays small for any graph size.
+
+    An edge record of a child is [other_path, count, "out"|"in"], where
+    other_path lists the clusters of the other endpoint from the top down
+    to the child's own depth; the viewer maps it to whatever is visible.
+    """
+
+    GROUP_BY = ("package", "file", "class")
+    LEVEL0 = "level0"
+
+    def __init__(self, graph: nx.DiGraph, group_by: str = "package", color_of=None):
+        if group_by not in self.GROUP_BY:
+            raise ValueError(f"group_by must be one of {self.GROUP_BY}: {group_by}")
+        self.graph = graph
+        self.group_by = group_by
+        self.color_of = color_of or (lambda label: "lightgray")
+
+    # -------------------- CLUSTERS --------------------
+
+    @staticmethod
+    def _file_of(label: str) -> str:
+        if label.startswith("_external_") or label.startswith("<external>"):
+            return "<external>"
+        return label.split("__")[0] if "__" in label else label
+
+    def cluster_path(self, node: Hashable) -> List[Tuple[str, str, str]]:
+        """(id, label, kind) of the clusters containing node, outermost first."""
+        label = self.graph.nodes[node].get("label", str(node))
+        file = self._file_of(label)
+        parts = label.split("__")
+        # a class node and its methods share "<file>__<Class>"
+        in_class = len(parts) >= 2 and parts[1][:1].isupper() and file != "<external>"
+
+        path = []
+        if self.group_by == "package":
+            package = os.path.dirname(file) if file != "<external>" else file
+            path.append((f"p:{package or '.'}", package or ".", "package"))
+        if self.group_by != "class" or not in_class:
+            path.append((f"f:{file}", file, "file"))
+        if in_class:
+            class_label = "__".join(parts[:2])
+            path.append((f"c:{class_label}", class_label, "class"))
+        return path
+
+    # -------------------- PAYLOADS --------------------
+
+    def build(self) -> Dict[str, dict]:
+        """Return payloads keyed by cluster id; "" is the top level."""
+        paths: Dict[Hashable, List[str]] = {}
+        payloads: Dict[str, dict] = {"": self._new_payload([])}
+        sizes: Dict[str, int] = defaultdict(int)
+
+        for node, data in self.graph.nodes(data=True):
+            clusters = self.cluster_path(node)
+            ids = [cluster_id for cluster_id, _, _ in clusters]
+            node_id = f"n:{node}"
+            paths[node] = ids + [node_id]
+
+            parent = ""
+            for depth, (cluster_id, label, kind) in enumerate(clusters):
+                sizes[cluster_id] += 1
+                if cluster_id not in payloads:
+                    payloads[cluster_id] = self._new_payload(ids[: depth + 1])
+                    payloads[parent]["children"].append(
+                        {
+                            "id": cluster_id,
+                            "label": label,
+                            "kind": kind,
+                            "color": self._cluster_color(kind),
+                        }
+                    )
+                parent = cluster_id
+            node_label = data.get("label", str(node))
+            payloads[parent]["children"].append(
+                {
+                    "id": node_id,
+                    "label": node_label,
+                    "kind": "node",
+                    "size": 1,
+                    "color": self.color_of(node_label),
+                }
+            )
+
+        counts: Dict[Tuple[str, str, Tuple[str, ...], str], int] = defaultdict(int)
+        for src, dst in self.graph.edges():
+            src_path, dst_path = paths[src], paths[dst]
+            common = 0
+            while (
+                common < min(len(src_path), len(dst_path))
+                and src_path[common] == dst_path[common]
+            ):
+                common += 1
+            # one record per level below the deepest shared cluster
+            for own, other, direction in (
+                (src_path, dst_path, "out"),
+                (dst_path, src_path, "in"),
+            ):
+                for depth in range(common, len(own)):
+                    parent = own[depth - 1] if depth else ""
+                    other_path = tuple(other[: depth + 1])
+                    counts[(parent, own[depth], other_path, direction)] += 1
+
+        for (parent, child, other_path, direction), count in counts.items():
+            payloads[parent]["edges"].setdefault(child, []).append(
+                [list(other_path), count, direction]
+            )
+
+        for payload in payloads.values():
+            for child in payload["children"]:
+                if child["kind"] != "node":
+                    child["size"] = sizes[child["id"]]
+        return payloads
+
+    @staticmethod
+    def _new_payload(path: List[str]) -> dict:
+        return {"path": path, "children": [], "edges": {}}
+
+    @staticmethod
+    def _cluster_color(kind: str) -> str:
+        return {"package": "#f2c14e", "file": "lightgreen", "class": "red"}[kind]
+
+    # -------------------- SAVE --------------------
+
+    def save(
+        self,
+        filename: Path,
+        title: Optional[str] = None,
+        compression: Optional[str] = None,
+    ) -> Path:
+        """
+        Write the viewer page to filename and its payloads (optionally gzip)
+        to a folder named after it. Returns the payload folder.
+        """
+        if compression not in ChartStore.COMPRESSIONS:
+            raise ValueError(f"Unsupported payload compression: {compression}")
+        suffix = ".json.gz" if compression == "gzip" else ".json"
+        payloads = self.build()
+        payload_dir = filename.with_suffix("")
+        payload_dir.mkdir(parents=True, exist_ok=True)
+
+        files = {"": self.LEVEL0 + suffix}
+        for index, cluster_id in enumerate(c for c in payloads if c):
+            files[cluster_id] = f"{index}{suffix}"
+        for cluster_id, payload in payloads.items():
+            for child in payload["children"]:
+                if child["id"] in files:
+                    child["payload"] = files[child["id"]]
+        for cluster_id, payload in payloads.items():
+            ChartStore.write_payload(
+                payload, payload_dir / files[cluster_id], compression
+            )
+
+        html = (
+            VIEWER_HTML.replace("__FETCH_JSON__", FETCH_JSON_JS)
+            .replace("__PAYLOADS__", payload_dir.name)
+            .replace("__LEVEL0__", files[""])
+            .replace("__TITLE__", title or filename.stem)
+        )
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(html)
+        return payload_dir
@@ -0,0 +1,29 @@
+import bz2
+import gzip
+import lzma
+from pathlib import Path
+from typing import IO, Optional
+
+# compression name -> (file suffix, opener)
+COMPRESSIONS = {
+    "gzip": (".gz", gzip.open),
+    "bz2": (".bz2", bz2.open),
+    "lzma": (".xz", lzma.open),
+}
+
+
+def compressed_name(file_name: str, compression: Optional[str]) -> str:
+    """Append the suffix of the given compression to a file name."""
+    if not compression:
+        return file_name
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression: {compression}")
+    return file_name + COMPRESSIONS[compression][0]
+
+
+def open_text(file_path: Path, mode: str = "rt") -> IO[str]:
+    """Open a text file, transparently (de)compressing it based on its suffix."""
+    for suffix, opener in COMPRESSIONS.values():
+        if file_path.name.endswith(suffix):
+            return opener(file_path, mode, encoding="utf-8")
+    return open(file_path, mode, encoding="utf-8")
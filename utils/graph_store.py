@@ -0,0 +1,294 @@
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import networkx as nx
+
+NO_STRING = -1
+
+# kinds of call edges into coroutines: awaited calls and calls of an async
+# def that are not awaited there (create_task(job()), gather(...))
+EDGE_KINDS = ("await", "coroutine")
+
+# (src, dst, file, kind) of a GraphShard, src and dst indexing its labels
+ShardEdge = Tuple[int, int, Optional[str], Optional[str]]
+
+
+def edge_attributes(file: Optional[str], kind: Optional[str]) -> Dict[str, str]:
+    """nx edge attributes of a call edge; unset ones are left out."""
+    attributes = {}
+    if file is not None:
+        attributes["file"] = file
+    if kind is not None:
+        attributes["kind"] = kind
+    return attributes
+
+
+class CompactGraph:
+    """
+    Memory-lean directed call graph for large code bases.
+
+    Node ids, labels, edge files and edge kinds are interned once in a
+    string table;
+    nodes are integers, and adjacency is a CSR index (offsets + edge
+    indexes) over edges kept in parallel arrays. A node or edge costs a
+    few machine words instead of the dicts networkx keeps per node, per
+    adjacency entry and per edge attribute set.
+
+    Adding behaves like nx.DiGraph: missing nodes are created, a repeated
+    edge is stored once and a later file or kind attribute replaces the
+    earlier one. Successors keep first-insertion order, and to_networkx() rebuilds
+    the same graph the networkx backend would have produced.
+    """
+
+    def __init__(self):
+        # -------- string table --------
+        self.strings: List[str] = []
+        self._string_index: Dict[str, int] = {}
+
+        # -------- nodes --------
+        self._nodes: Dict[str, int] = {}  # node id -> node index
+        self.node_key = array("i")  # node index -> string of its id
+        self.node_label = array("i")  # node index -> string of its label
+
+        # -------- edges, in first-insertion order --------
+        self.edge_src = array("I")
+        self.edge_dst = array("I")
+        self.edge_file = array("i")
+        self.edge_kind = array("i")  # one of EDGE_KINDS, NO_STRING for plain calls
+
+        # -------- CSR index, rebuilt lazily after additions --------
+        self._offsets: Optional[array] = None
+        self._out_edges: Optional[array] = None
+        self._in_degree: Optional[array] = None
+
+    # -------------------- STRINGS --------------------
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        index = self._string_index.get(value)
+        if index is None:
+            index = len(self.strings)
+            self.strings.append(value)
+            self._string_index[value] = index
+        return index
+
+    def string(self, index: int) -> Optional[str]:
+        return None if index == NO_STRING else self.strings[index]
+
+    # -------------------- BUILD --------------------
+
+    def add_node(self, key: str, label: Optional[str] = None) -> int:
+        """Add a node (or update its label) and return its index."""
+        node = self._nodes.get(key)
+        if node is None:
+            node = len(self.node_key)
+            key_index = self.intern(key)
+            self._nodes[self.strings[key_index]] = node
+            self.node_key.append(key_index)
+            self.node_label.append(self.intern(label))
+            self._offsets = None
+        elif label is not None:
+            self.node_label[node] = self.intern(label)
+        return node
+
+    def add_edge(
+        self,
+        src: str,
+        dst: str,
+        file: Optional[str] = None,
+        kind: Optional[str] = None,
+    ):
+        src_node = self._nodes.get(src)
+        if src_node is None:
+            src_node = self.add_node(src)
+        dst_node = self._nodes.get(dst)
+        if dst_node is None:
+            dst_node = self.add_node(dst)
+        self.edge_src.append(src_node)
+        self.edge_dst.append(dst_node)
+        self.edge_file.append(self.intern(file))
+        self.edge_kind.append(self.intern(kind))
+        self._offsets = None
+
+    def _finalize(self):
+        """Drop repeated edges and build the CSR index."""
+        if self._offsets is not None:
+            return
+        node_count = len(self.node_key)
+        edge_count = len(self.edge_src)
+
+        # counting sort of edge indexes by source, stable
+        offsets = array("I", [0]) * (node_count + 1)
+        for src in self.edge_src:
+            offsets[src + 1] += 1
+        for node in range(node_count):
+            offsets[node + 1] += offsets[node]
+        order = array("I", [0]) * edge_count
+        fill = array("I", offsets[:-1])
+        for edge, src in enumerate(self.edge_src):
+            order[fill[src]] = edge
+            fill[src] += 1
+
+        # within one source, keep the first edge to each target and let
+        # later files overwrite it, like repeated nx add_edge calls
+        keep = bytearray(edge_count)
+        for node in range(node_count):
+            first: Dict[int, int] = {}
+            for position in range(offsets[node], offsets[node + 1]):
+                edge = order[position]
+                dst = self.edge_dst[edge]
+                kept = first.get(dst)
+                if kept is None:
+                    first[dst] = edge
+                    keep[edge] = 1
+                else:
+                    if self.edge_file[edge] != NO_STRING:
+                        self.edge_file[kept] = self.edge_file[edge]
+                    if self.edge_kind[edge] != NO_STRING:
+                        self.edge_kind[kept] = self.edge_kind[edge]
+
+        if sum(keep) != edge_count:
+            renumber = array("I", [0]) * edge_count
+            src, dst = array("I"), array("I")
+            file, kind = array("i"), array("i")
+            for edge in range(edge_count):
+                if keep[edge]:
+                    renumber[edge] = len(src)
+                    src.append(self.edge_src[edge])
+                    dst.append(self.edge_dst[edge])
+                    file.append(self.edge_file[edge])
+                    kind.append(self.edge_kind[edge])
+            order = array("I", (renumber[edge] for edge in order if keep[edge]))
+            self.edge_src, self.edge_dst = src, dst
+            self.edge_file, self.edge_kind = file, kind
+            offsets = array("I", [0]) * (node_count + 1)
+            for source in src:
+                offsets[source + 1] += 1
+            for node in range(node_count):
+                offsets[node + 1] += offsets[node]
+
+        in_degree = array("I", [0]) * node_count
+        for target in self.edge_dst:
+            in_degree[target] += 1
+
+        self._offsets, self._out_edges, self._in_degree = offsets, order, in_degree
+
+    # -------------------- QUERIES --------------------
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._nodes
+
+    def __iter__(self) -> Iterator[str]:
+        """Node ids in insertion order."""
+        return (self.strings[index] for index in self.node_key)
+
+    def __len__(self) -> int:
+        return len(self.node_key)
+
+    def index(self, key: str) -> int:
+        return self._nodes[key]
+
+    def key(self, node: int) -> str:
+        return self.strings[self.node_key[node]]
+
+    def label(self, key: str) -> Optional[str]:
+        return self.string(self.node_label[self._nodes[key]])
+
+    def number_of_nodes(self) -> int:
+        return len(self.node_key)
+
+    def number_of_edges(self) -> int:
+        self._finalize()
+        return len(self.edge_src)
+
+    def successors(self, key: str) -> Iterator[str]:
+        self._finalize()
+        node = self._nodes[key]
+        for position in range(self._offsets[node], self._offsets[node + 1]):
+            yield self.key(self.edge_dst[self._out_edges[position]])
+
+    def in_degree(self, key: str) -> int:
+        self._finalize()
+        return self._in_degree[self._nodes[key]]
+
+    def out_degree(self, key: str) -> int:
+        self._finalize()
+        node = self._nodes[key]
+        return self._offsets[node + 1] - self._offsets[node]
+
+    def edges(self) -> Iterator[Tuple[str, str, Optional[str], Optional[str]]]:
+        """(src, dst, file, kind) in first-insertion order."""
+        self._finalize()
+        for edge in range(len(self.edge_src)):
+            yield (
+                self.key(self.edge_src[edge]),
+                self.key(self.edge_dst[edge]),
+                self.string(self.edge_file[edge]),
+                self.string(self.edge_kind[edge]),
+            )
+
+    # -------------------- NETWORKX --------------------
+
+    def to_networkx(self) -> nx.DiGraph:
+        """Rebuild the graph as an nx.DiGraph, e.g. for the visualizer."""
+        self._finalize()
+        graph = nx.DiGraph()
+        for node in range(len(self.node_key)):
+            label = self.string(self.node_label[node])
+            if label is None:
+                graph.add_node(self.key(node))
+            else:
+                graph.add_node(self.key(node), label=label)
+        for src, dst, file, kind in self.edges():
+            graph.add_edge(src, dst, **edge_attributes(file, kind))
+        return graph
+
+
+class GraphShard:
+    """
+    Nodes and edges one roadmap entry adds to the call graph, before node
+    ids are resolved: nodes are labels in first-seen order and edges point
+    at their index. Shards are built independently (in worker processes or
+    from a cache) and merged in roadmap order, which adds nodes and edges
+    in the same order as one serial build.
+    """
+
+    def __init__(
+        self,
+        labels: Optional[List[str]] = None,
+        edges: Optional[List[ShardEdge]] = None,
+    ):
+        self.labels: List[str] = labels if labels is not None else []
+        self.edges: List[ShardEdge] = edges if edges is not None else []
+        self._index: Optional[Dict[str, int]] = None  # built on first add_node
+
+    def add_node(self, label: str) -> int:
+        if self._index is None:
+            self._index = {label: i for i, label in enumerate(self.labels)}
+        index = self._index.get(label)
+        if index is None:
+            index = len(self.labels)
+            self.labels.append(label)
+            self._index[label] = index
+        return index
+
+    def add_edge(
+        self,
+        src: int,
+        dst: int,
+        file: Optional[str] = None,
+        kind: Optional[str] = None,
+    ):
+        self.edges.append((src, dst, file, kind))
+
+    # -------------------- PACKING --------------------
+
+    def pack(self) -> tuple:
+        """Plain (labels, edges) form for pickling and JSON."""
+        return self.labels, self.edges
+
+    @classmethod
+    def unpack(cls, packed) -> "GraphShard":
+        labels, edges = packed
+        return cls(labels, edges)
@@ -26,6 +26,12 @@ class FileHasher:
         self.hashes[file.file_path] = fh
         return fh
 
+    def add_hash(self, file: File, file_hash: str) -> FileHash:
+        """Store an already computed hash for a given file."""
+        fh = FileHash(file=file, hash=file_hash)
+        self.hashes[file.file_path] = fh
+        return fh
+
     def get_hash(self, file_path: str) -> str | None:
         """Retrieve previously stored hash."""
         return self.hashes[file_path].hash if file_path in self.hashes else None
@@ -0,0 +1,66 @@
+import string
+from typing import Dict, Optional, Set
+
+SAFE_CHARS = frozenset(string.ascii_letters + string.digits + "_.-")
+
+
+class _SanitizeTable(dict):
+    """str.translate table mapping every char outside SAFE_CHARS to "_"."""
+
+    def __missing__(self, codepoint: int) -> str:
+        char = chr(codepoint)
+        value = char if char in SAFE_CHARS else "_"
+        self[codepoint] = value
+        return value
+
+
+class NodeRegistry:
+    """
+    Interns readable labels as safe, unique node ids.
+
+    Every label is sanitized once and keeps its id for the whole build, so
+    a callee seen thousands of times costs one dict lookup. Labels whose
+    safe form is taken get "<safe>_1", "<safe>_2", ... from a counter per
+    safe form, so collisions never rescan the ids already handed out.
+    """
+
+    _table = _SanitizeTable()
+
+    def __init__(self):
+        self.ids: Dict[str, str] = {}  # label -> node id
+        self._taken: Set[str] = set()
+        self._next_suffix: Dict[str, int] = {}
+
+    @classmethod
+    def sanitize(cls, label: str) -> str:
+        """Replace anything but letters, digits, "_", "." and "-" by "_"."""
+        return label.translate(cls._table)
+
+    def get(self, label: str) -> Optional[str]:
+        return self.ids.get(label)
+
+    def add(self, label: str) -> str:
+        """Return the id of label, assigning a new one on first sight."""
+        node_id = self.ids.get(label)
+        if node_id is not None:
+            return node_id
+
+        node_id = self.sanitize(label)
+        if node_id in self._taken:
+            safe_id = node_id
+            i = self._next_suffix.get(safe_id, 1)
+            node_id = f"{safe_id}_{i}"
+            while node_id in self._taken:
+                i += 1
+                node_id = f"{safe_id}_{i}"
+            self._next_suffix[safe_id] = i + 1
+
+        self._taken.add(node_id)
+        self.ids[label] = node_id
+        return node_id
+
+    def __contains__(self, label: str) -> bool:
+        return label in self.ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
@@ -0,0 +1,210 @@
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+import networkx as nx
+
+
+class Reachability:
+    """
+    Precomputed reachability and layering of a directed graph, built once
+    and queried by all chart builders.
+
+    The graph is condensed into strongly connected components and every node
+    gets a bit at its position in a topological order of the components.
+    Descendant/ancestor sets are int bitsets memoized per component, so a
+    query costs one lookup after the first one touching that component, and
+    decoded sets come out already in topological order.
+
+    Recursion is tolerated: components are laid out in longest-path layers,
+    members of a component share its layer, and the edges pointing against
+    the node order are reported as back-edges. Everything is linear in the
+    size of the graph.
+    """
+
+    def __init__(self, graph: nx.DiGraph):
+        self.graph = graph
+
+        # strongly connected components and the DAG between them
+        self.component: Dict[Hashable, int] = {}
+        members: List[Set[Hashable]] = []
+        for comp, scc in enumerate(nx.strongly_connected_components(graph)):
+            members.append(scc)
+            for node in scc:
+                self.component[node] = comp
+        self.successors: List[Set[int]] = [set() for _ in members]
+        self.predecessors: List[Set[int]] = [set() for _ in members]
+        for src, dst in graph.edges():
+            src_comp, dst_comp = self.component[src], self.component[dst]
+            if src_comp != dst_comp:
+                self.successors[src_comp].add(dst_comp)
+                self.predecessors[dst_comp].add(src_comp)
+
+        # members are sets; they are ordered by insertion into the graph so
+        # the layout does not depend on string hashing (PYTHONHASHSEED)
+        self._graph_order: Dict[Hashable, int] = {
+            node: index for index, node in enumerate(graph)
+        }
+
+        # bit index == topological position, grouped by layer
+        self.nodes: List[Hashable] = []
+        self.position: Dict[Hashable, int] = {}
+        self._member_bits: List[int] = [0] * len(members)
+        self.component_layer: List[int] = [0] * len(members)
+        self.component_order = self._topological_components()
+        for comp in self.component_order:
+            first = len(self.nodes)
+            for node in self._order_members(members[comp]):
+                self.position[node] = len(self.nodes)
+                self.nodes.append(node)
+            self._member_bits[comp] = ((1 << len(members[comp])) - 1) << first
+
+        self._descendants: Dict[int, int] = {}
+        self._ancestors: Dict[int, int] = {}
+
+    def _topological_components(self) -> List[int]:
+        """
+        Kahn's algorithm over the component DAG. Processed first-in first-out
+        it visits components layer by layer, so the order is sorted by the
+        longest-path layers it computes along the way.
+        """
+        layer = self.component_layer
+        in_degree = [len(p) for p in self.predecessors]
+        order = [c for c, degree in enumerate(in_degree) if degree == 0]
+        for comp in order:  # order grows while iterating
+            for succ in self.successors[comp]:
+                layer[succ] = max(layer[succ], layer[comp] + 1)
+                in_degree[succ] -= 1
+                if in_degree[succ] == 0:
+                    order.append(succ)
+        return order
+
+    def _order_members(self, members: Set[Hashable]) -> List[Hashable]:
+        """
+        Reverse DFS postorder inside a component, entered where calls come in
+        from outside, so only the recursive calls point backwards.
+        """
+        if len(members) == 1:
+            return list(members)
+        ordered = sorted(members, key=self._graph_order.__getitem__)
+        start = next(
+            (
+                node
+                for node in ordered
+                if any(pred not in members for pred in self.graph.predecessors(node))
+            ),
+            ordered[0],
+        )
+        postorder = []
+        seen = {start}
+        stack = [(start, iter(self.graph.successors(start)))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child in members and child not in seen:
+                    seen.add(child)
+                    stack.append((child, iter(self.graph.successors(child))))
+                    break
+            else:
+                stack.pop()
+                postorder.append(node)
+        return postorder[::-1]
+
+    # -------------------- LAYOUT --------------------
+
+    def layer(self, node: Hashable) -> int:
+        """Longest-path layer of the node's component."""
+        return self.component_layer[self.component[node]]
+
+    def is_root(self, node: Hashable) -> bool:
+        """
+        True for the entry node of a component nothing else calls into,
+        so recursive entrypoints count as roots too.
+        """
+        comp = self.component[node]
+        bits = self._member_bits[comp]
+        return not self.predecessors[comp] and bits & -bits == self.bit(node)
+
+    def is_back_edge(self, src: Hashable, dst: Hashable) -> bool:
+        """True for recursive edges that point against the node order."""
+        return self.position[dst] <= self.position[src]
+
+    def back_edges(self) -> List[Tuple[Hashable, Hashable]]:
+        return [
+            (src, dst) for src, dst in self.graph.edges() if self.is_back_edge(src, dst)
+        ]
+
+    # -------------------- BITSETS --------------------
+
+    def bit(self, node: Hashable) -> int:
+        return 1 << self.position[node]
+
+    def bits(self, nodes: Iterable[Hashable]) -> int:
+        result = 0
+        for node in nodes:
+            result |= 1 << self.position[node]
+        return result
+
+    def decode(self, bits: int) -> List[Hashable]:
+        """Return the nodes of a bitset in topological order."""
+        nodes = self.nodes
+        result = []
+        binary = bin(bits)[:1:-1]  # least significant bit first
+        index = binary.find("1")
+        while index != -1:
+            result.append(nodes[index])
+            index = binary.find("1", index + 1)
+        return result
+
+    def _reach_bits(self, comp: int, neighbors, memo: Dict[int, int]) -> int:
+        """Bitset of everything reachable from a component, itself included."""
+        if comp in memo:
+            return memo[comp]
+        stack = [(comp, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if current in memo:
+                continue
+            if expanded:
+                bits = self._member_bits[current]
+                for other in neighbors[current]:
+                    bits |= memo[other]
+                memo[current] = bits
+            else:
+                stack.append((current, True))
+                for other in neighbors[current]:
+                    if other not in memo:
+                        stack.append((other, False))
+        return memo[comp]
+
+    def reach_bits(self, node: Hashable) -> int:
+        """Bitset of the node, its descendants and its ancestors."""
+        comp = self.component[node]
+        return self._reach_bits(
+            comp, self.successors, self._descendants
+        ) | self._reach_bits(comp, self.predecessors, self._ancestors)
+
+    def descendants_bits(self, node: Hashable) -> int:
+        comp = self.component[node]
+        bits = self._reach_bits(comp, self.successors, self._descendants)
+        return bits & ~self.bit(node)
+
+    def ancestors_bits(self, node: Hashable) -> int:
+        comp = self.component[node]
+        bits = self._reach_bits(comp, self.predecessors, self._ancestors)
+        return bits & ~self.bit(node)
+
+    # -------------------- SETS --------------------
+
+    def descendants(self, node: Hashable) -> Set[Hashable]:
+        """Same result as nx.descendants(graph, node)."""
+        return set(self.decode(self.descendants_bits(node)))
+
+    def ancestors(self, node: Hashable) -> Set[Hashable]:
+        """Same result as nx.ancestors(graph, node)."""
+        return set(self.decode(self.ancestors_bits(node)))
+
+    def closure(self, nodes: Iterable[Hashable]) -> Set[Hashable]:
+        """The given nodes together with all their ancestors and descendants."""
+        bits = 0
+        for node in nodes:
+            bits |= self.reach_bits(node)
+        return set(self.decode(bits))
@@ -1,6 +1,17 @@
 import ast
 import json
 from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from models.calls import Call, CallCoordinates, Calls, CallStats
+from models.dependencies import Dependency, DependencyRoadMap
+from models.file import File
+from models.hash import FileHash, FileHashCache
+from models.imports import Import, Imports
+from models.registry import RegistryClass, RegistryFile, RegistryFunction
+from utils.compression import COMPRESSIONS, open_text
+
+ROADMAP_FILE_NAMES = ("dependency_roadmap.ndjson", "dependency_roadmap.json")
 
 
 class Reader:
@@ -21,3 +32,180 @@ class Reader:
         """Load a JSON file into a Python dict."""
         with open(file_path, "r", encoding="utf-8") as f:
             return json.load(f)
+
+    @staticmethod
+    def read_file_hashes(file_path: Path) -> FileHashCache:
+        """Load a saved file_hashes.json back into a FileHashCache."""
+        data = Reader.read_json(file_path)
+        hashes = {}
+        for path, entry in data.items():
+            file_meta = File(
+                file_name=entry["file_name"],
+                file_format=entry["file_format"],
+                file_path=entry["file_path"],
+            )
+            hashes[path] = FileHash(file=file_meta, hash=entry["hash"])
+        return FileHashCache(hashes=hashes)
+
+    @staticmethod
+    def read_dependency_roadmap(file_path: Path) -> DependencyRoadMap:
+        """Load a saved roadmap (JSON or NDJSON) back into dataclasses."""
+        return DependencyRoadMap(
+            map=list(Reader.iter_dependency_roadmap(file_path, as_dataclasses=True))
+        )
+
+    @staticmethod
+    def find_dependency_roadmap(version_dir: Path) -> Optional[Path]:
+        """Return the roadmap file saved in a version directory, if any."""
+        for file_name in ROADMAP_FILE_NAMES:
+            for suffix in [""] + [s for s, _ in COMPRESSIONS.values()]:
+                path = version_dir / (file_name + suffix)
+                if path.exists():
+                    return path
+        return None
+
+    @staticmethod
+    def iter_dependency_roadmap(
+        file_path: Path, as_dataclasses: bool = False
+    ) -> Iterator[Union[dict, Dependency]]:
+        """
+        Lazily yield the Dependency records of a saved roadmap.
+        NDJSON files (optionally compressed) are read one line at a time;
+        legacy single-document JSON files are loaded whole.
+        """
+        convert = Reader.dependency_from_dict if as_dataclasses else None
+
+        if ".ndjson" in file_path.suffixes:
+            with open_text(file_path, "rt") as f:
+                for line in f:
+                    if line.strip():
+                        data = json.loads(line)
+                        yield convert(data) if convert else data
+            return
+
+        with open_text(file_path, "rt") as f:
+            data = json.load(f)
+        for d in data.get("map") or []:
+            yield convert(d) if convert else d
+
+    # -------------------- DICT -> DATACLASS --------------------
+
+    @staticmethod
+    def file_from_dict(data: Optional[dict]) -> Optional[File]:
+        if not data:
+            return None
+        return File(
+            file_name=data["file_name"],
+            file_format=data["file_format"],
+            file_path=data["file_path"],
+        )
+
+    @staticmethod
+    def dependency_from_dict(data: dict) -> Dependency:
+        """Rebuild a Dependency written by Writer.dataclass_to_dict."""
+        return Dependency(
+            registry=Reader.registry_file_from_dict(data["registry"]),
+            imports=Reader.imports_from_dict(data.get("imports")),
+            calls=Reader.calls_from_dict(data.get("calls")),
+        )
+
+    @staticmethod
+    def registry_file_from_dict(data: dict) -> RegistryFile:
+        """
+        Rebuild a RegistryFile, restoring the parent_* back-references
+        that were flattened to names on save.
+        """
+        file_node = RegistryFile(file=Reader.file_from_dict(data["file"]))
+
+        def build_function(d, parent_class=None, parent_function=None):
+            func = RegistryFunction(
+                function_name=d["function_name"],
+                parameters=d.get("parameters") or [],
+                param_types=d.get("param_types") or [],
+                sub_function_of=d.get("sub_function_of"),
+                is_async=d.get("is_async", False),
+                decorators=d.get("decorators") or [],
+                parent_class=parent_class,
+                parent_file=file_node,
+                parent_function=parent_function,
+            )
+            for child in d.get("functions") or []:
+                func.functions.append(build_node(child, None, func))
+            return func
+
+        def build_class(d, parent_class=None, parent_function=None):
+            cls = RegistryClass(
+                class_name=d["class_name"],
+                sub_class_of=d.get("sub_class_of"),
+                parent_file=file_node,
+                parent_class=parent_class,
+                parent_function=parent_function,
+            )
+            for child in d.get("classes") or []:
+                cls.classes.append(build_class(child, cls, None))
+            for child in d.get("class_functions") or []:
+                cls.class_functions.append(build_function(child, cls, None))
+            return cls
+
+        def build_node(d, parent_class, parent_function):
+            # Functions may hold nested classes as well as nested functions
+            if "class_name" in d:
+                return build_class(d, parent_class, parent_function)
+            return build_function(d, parent_class, parent_function)
+
+        for d in data.get("classes") or []:
+            file_node.classes.append(build_class(d))
+        for d in data.get("functions") or []:
+            file_node.functions.append(build_function(d))
+        return file_node
+
+    @staticmethod
+    def imports_from_dict(data: Optional[dict]) -> Optional[Imports]:
+        if data is None:
+            return None
+        return Imports(
+            file=Reader.file_from_dict(data["file"]),
+            imports=[
+                Import(
+                    imported_name=i["imported_name"],
+                    imported_from=i["imported_from"],
+                )
+                for i in data.get("imports") or []
+            ],
+        )
+
+    @staticmethod
+    def calls_from_dict(data: Optional[dict]) -> Optional[Calls]:
+        if data is None:
+            return None
+        calls = []
+        for c in data.get("calls") or []:
+            coordinates = c.get("coordinates")
+            calls.append(
+                Call(
+                    called_file=Reader.file_from_dict(c.get("called_file")),
+                    caller_class=c.get("caller_class"),
+                    caller_func=c.get("caller_func"),
+                    parent_class=c.get("parent_class"),
+                    called_func=c.get("called_func"),
+                    coordinates=(
+                        CallCoordinates(
+                            line=coordinates["line"], char=coordinates["char"]
+                        )
+                        if coordinates
+                        else None
+                    ),
+                    parameters=c.get("parameters"),
+                    param_types=c.get("param_types"),
+                    arguments=c.get("arguments"),
+                    resolution=c.get("resolution"),
+                    candidates=c.get("candidates"),
+                    runtime=CallStats(**c["runtime"]) if c.get("runtime") else None,
+                    awaited=c.get("awaited", False),
+                    coroutine=c.get("coroutine", False),
+                    context=c.get("context"),
+                )
+            )
+        return Calls(
+            caller_file=Reader.file_from_dict(data["caller_file"]), calls=calls
+        )
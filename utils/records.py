@@ -0,0 +1,205 @@
+from typing import List, Optional, Tuple
+
+from models.calls import Call, CallCoordinates, Calls
+from models.file import File
+from models.imports import Import, Imports
+from models.registry import RegistryClass, RegistryFile, RegistryFunction
+
+# (kind, name, parent_index, parameters, param_types, sub_of, is_async, decorators)
+# kind is "c" for classes and "f" for functions, parent_index -1 is the file
+RegistryRecord = Tuple[str, str, int, tuple, tuple, Optional[str], bool, tuple]
+
+
+class AnalysisRecords:
+    """
+    Packs per-file analysis results into flat tuples and back.
+    Used to ship results between processes without pickling the
+    cyclic RegistryFunction/RegistryClass graphs.
+    """
+
+    @staticmethod
+    def pack(reg_file: RegistryFile, imp_file: Imports, calls_file: Calls) -> tuple:
+        return (
+            AnalysisRecords.pack_registry(reg_file),
+            tuple((i.imported_name, i.imported_from) for i in imp_file.imports or []),
+            tuple(AnalysisRecords._pack_call(c) for c in calls_file.calls or []),
+        )
+
+    @staticmethod
+    def unpack(file_meta: File, packed: tuple) -> Tuple[RegistryFile, Imports, Calls]:
+        registry_records, import_records, call_records = packed
+        reg_file = AnalysisRecords.unpack_registry(file_meta, registry_records)
+        imp_file = Imports(
+            file=file_meta,
+            imports=[
+                Import(imported_name=n, imported_from=f) for n, f in import_records
+            ],
+        )
+        calls_file = Calls(
+            caller_file=file_meta,
+            calls=[AnalysisRecords._unpack_call(r) for r in call_records],
+        )
+        return reg_file, imp_file, calls_file
+
+    # -------------------- REGISTRY --------------------
+
+    @staticmethod
+    def pack_registry(reg_file: RegistryFile) -> List[RegistryRecord]:
+        """Flatten the registry tree in pre-order; parents precede children."""
+        records: List[RegistryRecord] = []
+
+        def add_class(cls: RegistryClass, parent_index: int):
+            index = len(records)
+            records.append(
+                ("c", cls.class_name, parent_index, (), (), cls.sub_class_of, False, ())
+            )
+            for sub_cls in cls.classes:
+                add_class(sub_cls, index)
+            for func in cls.class_functions:
+                add_function(func, index)
+
+        def add_function(func: RegistryFunction, parent_index: int):
+            index = len(records)
+            records.append(
+                (
+                    "f",
+                    func.function_name,
+                    parent_index,
+                    tuple(func.parameters),
+                    tuple(func.param_types),
+                    func.sub_function_of,
+                    func.is_async,
+                    tuple(func.decorators),
+                )
+            )
+            for child in func.functions:
+                if isinstance(child, RegistryClass):
+                    add_class(child, index)
+                else:
+                    add_function(child, index)
+
+        for cls in reg_file.classes:
+            add_class(cls, -1)
+        for func in reg_file.functions:
+            add_function(func, -1)
+        return records
+
+    @staticmethod
+    def unpack_registry(file_meta: File, records: List[RegistryRecord]) -> RegistryFile:
+        file_node = RegistryFile(file=file_meta)
+        nodes: list = []
+
+        for (
+            kind,
+            name,
+            parent_index,
+            params,
+            param_types,
+            sub_of,
+            is_async,
+            decorators,
+        ) in records:
+            parent = nodes[parent_index] if parent_index >= 0 else None
+            parent_class = parent if isinstance(parent, RegistryClass) else None
+            parent_function = parent if isinstance(parent, RegistryFunction) else None
+
+            if kind == "c":
+                node = RegistryClass(
+                    class_name=name,
+                    sub_class_of=sub_of,
+                    parent_file=file_node,
+                    parent_class=parent_class,
+                    parent_function=parent_function,
+                )
+                if parent_class:
+                    parent_class.classes.append(node)
+                elif parent_function:
+                    parent_function.functions.append(node)
+                else:
+                    file_node.classes.append(node)
+            else:
+                node = RegistryFunction(
+                    function_name=name,
+                    parameters=list(params),
+                    param_types=list(param_types),
+                    sub_function_of=sub_of,
+                    is_async=is_async,
+                    decorators=list(decorators),
+                    parent_class=parent_class,
+                    parent_file=file_node,
+                    parent_function=parent_function,
+                )
+                if parent_class:
+                    parent_class.class_functions.append(node)
+                elif parent_function:
+                    parent_function.functions.append(node)
+                else:
+                    file_node.functions.append(node)
+            nodes.append(node)
+
+        return file_node
+
+    # -------------------- CALLS --------------------
+
+    @staticmethod
+    def _pack_call(call: Call) -> tuple:
+        called_file = call.called_file
+        return (
+            (
+                (called_file.file_name, called_file.file_format, called_file.file_path)
+                if called_file
+                else None
+            ),
+            call.caller_class,
+            call.caller_func,
+            call.parent_class,
+            call.called_func,
+            (
+                (call.coordinates.line, call.coordinates.char)
+                if call.coordinates
+                else None
+            ),
+            call.parameters,
+            call.param_types,
+            call.arguments,
+            call.resolution,
+            call.candidates,
+            call.awaited,
+            call.coroutine,
+            call.context,
+        )
+
+    @staticmethod
+    def _unpack_call(record: tuple) -> Call:
+        (
+            called_file,
+            caller_class,
+            caller_func,
+            parent_class,
+            called_func,
+            coordinates,
+            parameters,
+            param_types,
+            arguments,
+            resolution,
+            candidates,
+            awaited,
+            coroutine,
+            context,
+        ) = record
+        return Call(
+            called_file=File(*called_file) if called_file else None,
+            caller_class=caller_class,
+            caller_func=caller_func,
+            parent_class=parent_class,
+            called_func=called_func,
+            coordinates=CallCoordinates(*coordinates) if coordinates else None,
+            parameters=parameters,
+            param_types=param_types,
+            arguments=arguments,
+            resolution=resolution,
+            candidates=candidates,
+            awaited=awaited,
+            coroutine=coroutine,
+            context=context,
+        )
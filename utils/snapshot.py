@@ -0,0 +1,215 @@
+import errno
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from analyzer.roadmap_diff_analyzer import RoadmapDiff
+from models.calls import CallsHeap
+from models.dependencies import Dependency, DependencyRoadMap
+from models.file import FileIssue
+from utils.writer import Writer
+
+
+class SnapshotWriter:
+    """
+    Writes every artifact of one run into a single versioned snapshot.
+    Artifacts are staged in a hidden temporary directory inside data_dir and
+    renamed into place in one step on commit, together with a manifest.json
+    holding timings and counts. Readers therefore never see a half-written
+    snapshot, and concurrent runs never share or overwrite a directory.
+
+    A roadmap_index.json with the file hashes and function/class signatures
+    is written alongside, so versions can be diffed without their roadmaps.
+
+    Usage:
+        with SnapshotWriter(data_dir) as snapshot:
+            snapshot.save_dependency_roadmap(roadmap)
+            snapshot.save_file_hashes(hashes)
+    """
+
+    TMP_PREFIX = ".tmp-"
+    MANIFEST = "manifest.json"
+    INDEX = "roadmap_index.json"
+    RUNTIME_CALLS = "runtime_calls.json"
+    LINE_HEATMAP = "line_heatmap.json"
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = data_dir
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir = Path(tempfile.mkdtemp(prefix=self.TMP_PREFIX, dir=data_dir))
+        self.snapshot_dir: Optional[Path] = None
+        self._index: Optional[RoadmapDiff] = None
+        self._hashes: Dict[str, dict] = {}
+
+        self._started = time.perf_counter()
+        self.manifest: Dict = {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "artifacts": [],
+            "counts": {},
+            "timings": {},
+        }
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+    # -------------------- LISTING --------------------
+
+    @staticmethod
+    def _sort_key(name: str):
+        # "20250101_120000_2" is the third snapshot taken in that second
+        parts = name.split("_")
+        if len(parts) == 3 and parts[2].isdigit():
+            return "_".join(parts[:2]), int(parts[2])
+        return name, 0
+
+    @staticmethod
+    def list_snapshots(data_dir: Path) -> List[Path]:
+        """Return committed snapshot directories, oldest first."""
+        if not data_dir.is_dir():
+            return []
+        return sorted(
+            [
+                d
+                for d in data_dir.iterdir()
+                if d.is_dir() and not d.name.startswith(".")
+            ],
+            key=lambda d: SnapshotWriter._sort_key(d.name),
+        )
+
+    # -------------------- ARTIFACTS --------------------
+
+    def save_dependency_roadmap(
+        self,
+        roadmap: Union[DependencyRoadMap, Iterable[Dependency]],
+        compression: Optional[str] = None,
+    ) -> Path:
+        dependencies = (
+            roadmap.map or [] if isinstance(roadmap, DependencyRoadMap) else roadmap
+        )
+        started = time.perf_counter()
+        self._index = RoadmapDiff()
+        path = Writer.save_dependency_roadmap_ndjson(
+            self._count(dependencies),
+            compression=compression,
+            version_dir=self.tmp_dir,
+            on_record=self._index.add_entry,
+        )
+        self.add_timing("save_dependency_roadmap", time.perf_counter() - started)
+        self.manifest["artifacts"].append(path.name)
+        return path
+
+    def save_file_hashes(self, hashes: Dict[str, dict]) -> Path:
+        Writer.save_file_hashes_json(hashes, version_dir=self.tmp_dir)
+        self._hashes = hashes
+        self.manifest["counts"]["files"] = len(hashes)
+        self.manifest["artifacts"].append("file_hashes.json")
+        return self.tmp_dir / "file_hashes.json"
+
+    def save_runtime_calls(self, calls_heap: CallsHeap) -> Path:
+        """Calls recorded by the runtime tracer, as a list of Calls."""
+        calls_files = calls_heap.calls or []
+        path = self.tmp_dir / self.RUNTIME_CALLS
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([Writer.dataclass_to_dict(c) for c in calls_files], f, indent=1)
+        self.manifest["counts"]["runtime_calls"] = sum(
+            len(c.calls or []) for c in calls_files
+        )
+        self.manifest["artifacts"].append(path.name)
+        return path
+
+    def save_line_heatmap(self, heatmap) -> Path:
+        """Executed-line counts per file (analyzer.line_heatmap.Heatmap)."""
+        path = heatmap.save(self.tmp_dir / self.LINE_HEATMAP)
+        self.manifest["counts"]["heatmap_files"] = len(heatmap.files)
+        self.manifest["artifacts"].append(path.name)
+        return path
+
+    def _count(self, dependencies: Iterable[Dependency]) -> Iterator[Dependency]:
+        counts = self.manifest["counts"]
+        counts["dependencies"] = 0
+        counts["calls"] = 0
+        counts["awaited_calls"] = 0
+        counts["coroutine_calls"] = 0
+        for dep in dependencies:
+            counts["dependencies"] += 1
+            if dep.calls and dep.calls.calls:
+                counts["calls"] += len(dep.calls.calls)
+                for call in dep.calls.calls:
+                    counts["awaited_calls"] += call.awaited
+                    counts["coroutine_calls"] += call.coroutine
+            yield dep
+
+    def add_timing(self, name: str, seconds: float) -> None:
+        self.manifest["timings"][name] = round(seconds, 3)
+
+    def add_analysis_version(self, version: str) -> None:
+        """Analyzer and argument mode of the results, for incremental runs."""
+        self.manifest["analysis_version"] = version
+
+    def add_issues(self, issues: Iterable[FileIssue]) -> None:
+        """Files whose analysis stopped early or failed, for the run report."""
+        self.manifest["issues"] = [asdict(issue) for issue in issues]
+        self.manifest["counts"]["issues"] = len(self.manifest["issues"])
+
+    # -------------------- COMMIT --------------------
+
+    def commit(self) -> Path:
+        """Write the manifest and move the snapshot into place atomically."""
+        if self.snapshot_dir is not None:
+            return self.snapshot_dir
+
+        if self._index is not None:
+            self._save_index()
+
+        self.manifest["finished_at"] = datetime.now().isoformat(timespec="seconds")
+        self.manifest["duration_seconds"] = round(
+            time.perf_counter() - self._started, 3
+        )
+
+        name = datetime.now().strftime("%Y%m%d_%H%M%S")
+        attempt = 0
+        while True:
+            candidate = name if attempt == 0 else f"{name}_{attempt}"
+            target = self.data_dir / candidate
+            self.manifest["snapshot"] = candidate
+            with open(self.tmp_dir / self.MANIFEST, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, indent=4)
+            if not target.exists():
+                try:
+                    os.rename(self.tmp_dir, target)
+                    break
+                except OSError as e:
+                    # another run claimed the name first
+                    if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                        raise
+            attempt += 1
+
+        self.snapshot_dir = target
+        print(f"Snapshot saved to {target}")
+        return target
+
+    def _save_index(self) -> None:
+        index = {
+            "hashes": {path: data["hash"] for path, data in self._hashes.items()},
+            "files": self._index.to_index(),
+        }
+        with open(self.tmp_dir / self.INDEX, "w", encoding="utf-8") as f:
+            json.dump(index, f, separators=(",", ":"))
+        self.manifest["artifacts"].append(self.INDEX)
+
+    def abort(self) -> None:
+        """Discard everything written so far."""
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
@@ -1,16 +1,65 @@
 import colorsys
 import json
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 import networkx as nx
 from pyvis.network import Network
 
+from utils.chart_store import ChartData, ChartStore
+from utils.cluster_view import ClusterView
+from utils.reachability import Reachability
+
+# -------------------- LEGEND --------------------
+LEGEND_HTML = """
+        <div id="callchain-legend" style="
+             position: fixed;
+             right: 12px;
+             top: 12px;
+             z-index: 99999;
+             background: rgba(255,255,255,0.95);
+             border: 1px solid #cfcfcf;
+             padding: 10px 12px;
+             border-radius: 8px;
+             box-shadow: 0 2px 8px rgba(0,0,0,0.08);
+             font-family: Arial, Helvetica, sans-serif;
+             font-size: 13px;
+             color: #222;
+             max-width: 240px;">
+          <div style="font-weight:600; margin-bottom:6px;">Legend</div>
+          <div style="line-height:1.5;">
+            <div>🟩 File</div>
+            <div>🟦 Top-level function / method</div>
+            <div>🟥 Class</div>
+            <div>🟪 Parameter</div>
+            <div>💗 External call</div>
+            <div>⚪ Other / unknown</div>
+            <div>▫️ Structural / tree edges (gray)</div>
+            <div>↩️ Recursive call (dashed red)</div>
+            <div>⏩ Awaited / coroutine call (blue)</div>
+            <div>🌈 Workflow (bright colors)</div>
+          </div>
+        </div>
+        """
+
 
 class CallChainVisualizer:
-    def __init__(self, graph: nx.DiGraph):
+    OUTPUTS = ("html", "json")
+
+    def __init__(self, graph: nx.DiGraph, reachability: Optional[Reachability] = None):
         self.graph = graph
+        self._reachability = reachability
+        self._max_label_len: Optional[int] = None
+
+    @property
+    def reachability(self) -> Reachability:
+        """Reachability of the full graph, computed on first use."""
+        if self._reachability is None:
+            self._reachability = Reachability(self.graph)
+        return self._reachability
 
     # -------------------- UTIL --------------------
     @staticmethod
@@ -37,11 +86,7 @@ class CallChainVisualizer:
 
     # -------------------- BUILDERS --------------------
     def _build_subgraph(self, nodes, show_external):
-        subgraph_nodes = set()
-        for node in nodes:
-            subgraph_nodes.add(node)
-            subgraph_nodes.update(nx.descendants(self.graph, node))
-            subgraph_nodes.update(nx.ancestors(self.graph, node))
+        subgraph_nodes = self.reachability.closure(nodes)
         if not show_external:
             subgraph_nodes = {
                 n
@@ -56,8 +101,16 @@ class CallChainVisualizer:
         return self.graph.subgraph(subgraph_nodes).copy()
 
     # -------------------- NETWORK --------------------
-    def _create_network(self, hierarchical=False):
-        net = Network(height="100%", width="100%", directed=True, notebook=True)
+    def _create_network(self, hierarchical=False, html=True):
+        """A pyvis Network, or a plain ChartData when no HTML is rendered."""
+        if html:
+            net = Network(height="100%", width="100%", directed=True, notebook=True)
+        else:
+            net = ChartData()
+        net.set_options(json.dumps(self._network_options(hierarchical)))
+        return net
+
+    def _network_options(self, hierarchical=False) -> dict:
         base_options = {
             "interaction": {"dragNodes": True},
             "physics": {
@@ -67,14 +120,15 @@ class CallChainVisualizer:
             },
         }
         if hierarchical:
-            max_len = max(
-                (
-                    len(data.get("label", str(n)))
-                    for n, data in self.graph.nodes(data=True)
-                ),
-                default=10,
-            )
-            horizontal_spacing = max(20, max_len * 10)
+            if self._max_label_len is None:
+                self._max_label_len = max(
+                    (
+                        len(data.get("label", str(n)))
+                        for n, data in self.graph.nodes(data=True)
+                    ),
+                    default=10,
+                )
+            horizontal_spacing = max(20, self._max_label_len * 10)
             hier_opts = {
                 "layout": {
                     "hierarchical": {
@@ -88,8 +142,7 @@ class CallChainVisualizer:
                 }
             }
             base_options.update(hier_opts)
-        net.set_options(json.dumps(base_options))
-        return net
+        return base_options
 
     # -------------------- ADD NODES --------------------
     def _add_nodes(self, net, subgraph):
@@ -108,11 +161,14 @@ class CallChainVisualizer:
             )
 
     # -------------------- DUPLICATE TREE --------------------
-    def _add_duplicate_tree(self, net, subgraph, is_gray=True):
+    def _add_duplicate_tree(
+        self, net, subgraph, is_gray=True, reachability: Optional[Reachability] = None
+    ):
         """
         Duplicate nodes for either gray tree or workflow-style edges.
         Each root gets its own duplicate sequence to avoid collisions.
         """
+        reachability = reachability or Reachability(subgraph)
         all_nodes = list(subgraph.nodes)
         x_offset = 300
         y_spacing = 160
@@ -124,15 +180,16 @@ class CallChainVisualizer:
                 or label == "<external>"
             )
 
-        # find roots (nodes with no in-edges) for this tree
-        roots = [n for n in all_nodes if subgraph.in_degree(n) == 0]
+        # find roots (nodes with no in-edges, or entering a recursive cycle)
+        roots = [n for n in all_nodes if reachability.is_root(n)]
 
         dup_map_global = {}  # maps (node, root) -> duplicate id
 
         for root_idx, root in enumerate(roots):
-            reachable = nx.descendants(subgraph, root) | {root}
-            topo_nodes = list(nx.topological_sort(subgraph.subgraph(reachable)))
-            for idx, node in enumerate(topo_nodes):
+            topo_nodes = reachability.decode(
+                reachability.descendants_bits(root) | reachability.bit(root)
+            )
+            for node in topo_nodes:
                 dup_type = "gray" if is_gray else "wf"
                 dup_id = f"{node}__{dup_type}{root_idx}"
                 dup_map_global[(node, root)] = dup_id
@@ -146,33 +203,68 @@ class CallChainVisualizer:
                         if not is_helper(subgraph.nodes[node].get("label", node))
                         else None
                     ),
+                    # recursive components share their longest-path layer
                     y=(
-                        idx * y_spacing
+                        reachability.layer(node) * y_spacing
                         if not is_helper(subgraph.nodes[node].get("label", node))
                         else None
                     ),
+                    level=reachability.layer(node),
                     physics=False,
                     fixed=False,
                 )
 
-            # add edges between duplicates
-            for src, dst, data in subgraph.edges(data=True):
-                if src in topo_nodes and dst in topo_nodes:
-                    edge_color = "rgba(128,128,128,0.5)" if is_gray else None
-                    if is_gray:
+            # add edges between duplicates; descendants are closed under
+            # successors, so every out-edge of topo_nodes stays inside them
+            if is_gray:
+                for src in topo_nodes:
+                    for dst in subgraph.successors(src):
+                        if reachability.is_back_edge(src, dst):
+                            # recursion points upwards, keep it apart
+                            net.add_edge(
+                                dup_map_global[(src, root)],
+                                dup_map_global[(dst, root)],
+                                color="rgba(220,80,80,0.7)",
+                                width=1,
+                                dashes=True,
+                                physics=False,
+                                smooth={"type": "curvedCW", "roundness": 0.4},
+                                title="recursive call",
+                            )
+                            continue
+                        kind = subgraph.edges[src, dst].get("kind")
+                        if kind:
+                            # event-loop paths: awaited calls and coroutines
+                            net.add_edge(
+                                dup_map_global[(src, root)],
+                                dup_map_global[(dst, root)],
+                                color="rgba(60,110,200,0.7)",
+                                width=1,
+                                physics=False,
+                                title=f"{kind} call",
+                            )
+                            continue
                         net.add_edge(
                             dup_map_global[(src, root)],
                             dup_map_global[(dst, root)],
-                            color=edge_color,
+                            color="rgba(128,128,128,0.5)",
                             width=1,
                             physics=False,
                         )
         return dup_map_global
 
     # -------------------- WORKFLOW HIGHLIGHT --------------------
-    def _highlight_workflows(self, net, subgraph, nodes, show_sequence=True):
+    def _highlight_workflows(
+        self,
+        net,
+        subgraph,
+        nodes,
+        show_sequence=True,
+        reachability: Optional[Reachability] = None,
+    ):
         if not show_sequence:
             return
+        reachability = reachability or Reachability(subgraph)
 
         def _big_color_palette(n_colors=120):
             colors = []
@@ -191,8 +283,14 @@ class CallChainVisualizer:
         used_colors = set()
 
         def next_color():
+            nonlocal color_iter
             while True:
-                color = next(color_iter)
+                color = next(color_iter, None)
+                if color is None:
+                    # more workflows than colors: start over
+                    color_iter = iter(palette)
+                    used_colors.clear()
+                    continue
                 if color not in used_colors:
                     used_colors.add(color)
                     return color
@@ -207,22 +305,24 @@ class CallChainVisualizer:
         entrypoints = [
             n
             for n in nodes
-            if subgraph.in_degree(n) == 0
+            if reachability.is_root(n)
             and not is_helper(subgraph.nodes[n].get("label", n))
         ]
 
         x_offset = 300
         y_spacing = 160
 
+        entrypoint_bits = reachability.bits(entrypoints)
         for w_idx, start in enumerate(entrypoints):
-            reachable_nodes = nx.descendants(subgraph, start) | {start}
-            reachable_nodes -= set(entrypoints) - {start}
-            topo_nodes = list(nx.topological_sort(subgraph.subgraph(reachable_nodes)))
+            topo_nodes = reachability.decode(
+                reachability.descendants_bits(start) & ~entrypoint_bits
+                | reachability.bit(start)
+            )
             flow_color = next_color()
 
             # workflow duplicates
             dup_ids = {}
-            for idx, node in enumerate(topo_nodes):
+            for node in topo_nodes:
                 dup_id = f"{node}__wf{w_idx}"
                 dup_ids[node] = dup_id
                 net.add_node(
@@ -235,11 +335,13 @@ class CallChainVisualizer:
                         if not is_helper(subgraph.nodes[node].get("label", node))
                         else None
                     ),
+                    # recursive components share their longest-path layer
                     y=(
-                        idx * y_spacing
+                        reachability.layer(node) * y_spacing
                         if not is_helper(subgraph.nodes[node].get("label", node))
                         else None
                     ),
+                    level=reachability.layer(node),
                     physics=False,
                     fixed=False,
                 )
@@ -266,50 +368,157 @@ class CallChainVisualizer:
         Generate HTML with a fixed legend injected,
         then save to the given filename.
         """
-        legend_html = """
-        <div id="callchain-legend" style="
-             position: fixed;
-             right: 12px;
-             top: 12px;
-             z-index: 99999;
-             background: rgba(255,255,255,0.95);
-             border: 1px solid #cfcfcf;
-             padding: 10px 12px;
-             border-radius: 8px;
-             box-shadow: 0 2px 8px rgba(0,0,0,0.08);
-             font-family: Arial, Helvetica, sans-serif;
-             font-size: 13px;
-             color: #222;
-             max-width: 240px;">
-          <div style="font-weight:600; margin-bottom:6px;">Legend</div>
-          <div style="line-height:1.5;">
-            <div>🟩 File</div>
-            <div>🟦 Top-level function / method</div>
-            <div>🟥 Class</div>
-            <div>🟪 Parameter</div>
-            <div>💗 External call</div>
-            <div>⚪ Other / unknown</div>
-            <div>▫️ Structural / tree edges (gray)</div>
-            <div>🌈 Workflow (bright colors)</div>
-          </div>
-        </div>
-        """
 
         html = net.generate_html()
         if "</body>" in html:
-            html = html.replace("</body>", legend_html + "\n</body>")
+            html = html.replace("</body>", LEGEND_HTML + "\n</body>")
         else:
-            html = html + legend_html
+            html = html + LEGEND_HTML
 
         with open(filename, "w", encoding="utf-8") as f:
             f.write(html)
 
+    # -------------------- CHARTS --------------------
+    def _file_network(self, nodes, show_external=True, html=True):
+        """Build the chart of one file's nodes; None if it is empty."""
+        subgraph = self._build_subgraph(nodes, show_external)
+        if subgraph is None:
+            return None
+        net = self._create_network(hierarchical=True, html=html)
+        reachability = Reachability(subgraph)
+
+        # Add gray tree duplicates
+        self._add_duplicate_tree(net, subgraph, is_gray=True, reachability=reachability)
+
+        # Add workflow duplicates / edges
+        self._highlight_workflows(
+            net, subgraph, nodes, show_sequence=True, reachability=reachability
+        )
+        return net
+
+    def _global_graph(self, show_external=True) -> nx.DiGraph:
+        if show_external:
+            return self.graph
+        return self.graph.subgraph(
+            [
+                n
+                for n in self.graph.nodes
+                if not (
+                    self.graph.nodes[n].get("label", n).startswith("_external_")
+                    or self.graph.nodes[n].get("label", n) == "<external>"
+                )
+            ]
+        ).copy()
+
+    def _global_network(self, show_external=True, html=True):
+        """Build the chart of the whole graph."""
+        global_subgraph = self._global_graph(show_external)
+
+        net = self._create_network(hierarchical=True, html=html)
+        reachability = (
+            self.reachability if show_external else Reachability(global_subgraph)
+        )
+        self._add_duplicate_tree(
+            net, global_subgraph, is_gray=True, reachability=reachability
+        )
+        self._highlight_workflows(
+            net,
+            global_subgraph,
+            list(global_subgraph.nodes),
+            show_sequence=True,
+            reachability=reachability,
+        )
+        return net
+
+    def _save_network(
+        self, net, name: str, filename: Path, store: Optional[ChartStore] = None
+    ) -> dict:
+        """Write a chart as standalone HTML, or as a payload of store."""
+        if store is not None:
+            return store.save_chart(net, name, filename)
+        self._add_legend(net, filename)
+        return {
+            "name": name,
+            "file": filename.name,
+            "nodes": len(net.nodes),
+            "edges": len(net.edges),
+        }
+
+    def _save_file_chart(
+        self,
+        nodes,
+        filename: Path,
+        show_external=True,
+        store: Optional[ChartStore] = None,
+        name: Optional[str] = None,
+    ) -> Optional[dict]:
+        """Render the chart of one file's nodes; returns None if it is empty."""
+        net = self._file_network(nodes, show_external, html=store is None)
+        if net is None:
+            return None
+        return self._save_network(net, name or filename.stem, filename, store)
+
+    def _save_global_chart(
+        self, filename: Path, show_external=True, store: Optional[ChartStore] = None
+    ) -> dict:
+        """Render the chart of the whole graph."""
+        net = self._global_network(show_external, html=store is None)
+        return self._save_network(net, "GLOBAL", filename, store)
+
+    def _save_clustered_chart(
+        self,
+        filename: Path,
+        show_external=True,
+        group_by="package",
+        compression: Optional[str] = None,
+    ) -> dict:
+        """Render the whole graph as clusters that expand on demand."""
+        global_graph = self._global_graph(show_external)
+        ClusterView(
+            global_graph,
+            group_by=group_by,
+            color_of=self.get_node_color,
+        ).save(filename, compression=compression)
+        return {
+            "name": "GLOBAL",
+            "viewer": filename.name,
+            "nodes": global_graph.number_of_nodes(),
+            "edges": global_graph.number_of_edges(),
+        }
+
     # -------------------- MAIN --------------------
     def save_file_charts(
-        self, folder="chains_output", prefix="chart", show_external=True
-    ):
+        self,
+        folder="chains_output",
+        prefix="chart",
+        show_external=True,
+        max_workers: Optional[int] = None,
+        group_by: Optional[str] = None,
+        cluster_above: int = 5000,
+        parallel_above: int = 32,
+        output: str = "html",
+        compression: Optional[str] = None,
+    ) -> Path:
+        """
+        Save one chart per file plus a single global chart.
+        Per-file charts are independent and rendered by a process pool once
+        there are more than parallel_above files; max_workers=1 renders them
+        in this process. The workers share the reachability of the full
+        graph, computed here once.
+
+        The global chart is clustered by group_by ("package", "file" or
+        "class") when given, or by package once the graph has more than
+        cluster_above nodes, since a flat chart of that size hangs browsers.
+
+        output="html" writes one standalone page per chart. output="json"
+        writes compact (optionally gzip) payloads under charts/, a
+        manifest.json and one shared index.html viewer. Returns the folder.
+        """
+        if output not in self.OUTPUTS:
+            raise ValueError(f"output must be one of {self.OUTPUTS}: {output}")
         timestamp_folder = Path(folder) / datetime.now().strftime("%Y%m%d_%H%M%S")
         timestamp_folder.mkdir(parents=True, exist_ok=True)
+        store = ChartStore(timestamp_folder, compression) if output == "json" else None
 
         file_to_nodes = {}
         for node, data in self.graph.nodes(data=True):
@@ -317,41 +526,86 @@ class CallChainVisualizer:
             root_file = label.split("__")[0] if "__" in label else label
             file_to_nodes.setdefault(root_file, set()).add(node)
 
+        # lists keep the node order stable when sent to worker processes
+        jobs = []
         for root_file, nodes in file_to_nodes.items():
-            subgraph = self._build_subgraph(nodes, show_external)
-            if subgraph is None:
-                continue
-            safe_file_root = self.sanitize_filename(root_file)
-            net = self._create_network(hierarchical=True)
-
-            # Add gray tree duplicates
-            self._add_duplicate_tree(net, subgraph, is_gray=True)
-
-            # Add workflow duplicates / edges
-            self._highlight_workflows(net, subgraph, nodes, show_sequence=True)
-
-            filename = timestamp_folder / f"{prefix}_{safe_file_root}.html"
-            self._add_legend(net, filename)
-
-            # -------------------- global chart --------------------
-            global_subgraph = self.graph.copy()
-            if not show_external:
-                global_subgraph = global_subgraph.subgraph(
-                    [
-                        n
-                        for n in global_subgraph.nodes
-                        if not (
-                            self.graph.nodes[n].get("label", n).startswith("_external_")
-                            or self.graph.nodes[n].get("label", n) == "<external>"
-                        )
-                    ]
-                ).copy()
+            file_name = f"{prefix}_{self.sanitize_filename(root_file)}"
+            filename = (
+                store.payload_path(file_name)
+                if store
+                else timestamp_folder / f"{file_name}.html"
+            )
+            jobs.append((list(nodes), filename, root_file))
+
+        if max_workers == 1 or len(jobs) <= parallel_above:
+            charts = [
+                self._save_file_chart(nodes, filename, show_external, store, name)
+                for nodes, filename, name in jobs
+            ]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_chart_worker,
+                initargs=(self.graph, self.reachability),
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _save_file_chart_in_worker,
+                        nodes,
+                        filename,
+                        show_external,
+                        store,
+                        name,
+                    )
+                    for nodes, filename, name in jobs
+                ]
+                charts = [future.result() for future in futures]
+
+        # -------------------- global chart --------------------
+        global_filename = timestamp_folder / f"{prefix}__GLOBAL.html"
+        if group_by is None and self.graph.number_of_nodes() > cluster_above:
+            group_by = "package"
+        if group_by:
+            global_chart = self._save_clustered_chart(
+                global_filename,
+                show_external,
+                group_by,
+                compression=store.compression if store else None,
+            )
+        else:
+            if store:
+                global_filename = store.payload_path(f"{prefix}__GLOBAL")
+            global_chart = self._save_global_chart(
+                global_filename, show_external, store
+            )
 
-            net = self._create_network(hierarchical=True)
-            self._add_duplicate_tree(net, global_subgraph, is_gray=True)
-            self._highlight_workflows(
-                net, global_subgraph, list(global_subgraph.nodes), show_sequence=True
+        if store:
+            store.save_index(
+                [global_chart] + [chart for chart in charts if chart],
+                options=self._network_options(hierarchical=True),
+                legend_html=LEGEND_HTML,
             )
+        return timestamp_folder
+
+
+# -------------------- WORKERS --------------------
+# The graph and its reachability are sent once per worker process instead of
+# once per chart.
+_worker_visualizer: Optional[CallChainVisualizer] = None
+
+
+def _init_chart_worker(graph: nx.DiGraph, reachability: Reachability):
+    global _worker_visualizer
+    _worker_visualizer = CallChainVisualizer(graph, reachability)
+
 
-            global_filename = timestamp_folder / f"{prefix}__GLOBAL.html"
-            self._add_legend(net, global_filename)
+def _save_file_chart_in_worker(
+    nodes,
+    filename: Path,
+    show_external=True,
+    store: Optional[ChartStore] = None,
+    name: Optional[str] = None,
+) -> Optional[dict]:
+    return _worker_visualizer._save_file_chart(
+        nodes, filename, show_external, store, name
+    )
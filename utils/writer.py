@@ -2,9 +2,11 @@ import json
 from dataclasses import is_dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, Iterable, Optional, Union
 
+from models.dependencies import Dependency, DependencyRoadMap
 from models.file import File
+from utils.compression import compressed_name, open_text
 
 
 class Writer:
@@ -20,9 +22,14 @@ class Writer:
 
     @staticmethod
     def save_dependency_roadmap_json(
-        roadmap, file_name: str = "dependency_roadmap.json"
+        roadmap,
+        file_name: str = "dependency_roadmap.json",
+        version_dir: Optional[Path] = None,
     ):
-        version_dir = Writer._get_versioned_dir()
+        # a given version_dir may be a staging directory (SnapshotWriter),
+        # whose path is gone once it is committed, so it is not printed
+        announce = version_dir is None
+        version_dir = version_dir or Writer._get_versioned_dir()
         file_path = version_dir / file_name
 
         data = Writer.dataclass_to_dict(roadmap)
@@ -30,19 +37,57 @@ class Writer:
         with open(file_path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=4)
 
-        print(f"Dependency roadmap saved to {file_path}")
+        if announce:
+            print(f"Dependency roadmap saved to {file_path}")
+
+    @staticmethod
+    def save_dependency_roadmap_ndjson(
+        roadmap: Union[DependencyRoadMap, Iterable[Dependency]],
+        file_name: str = "dependency_roadmap.ndjson",
+        compression: Optional[str] = None,
+        version_dir: Optional[Path] = None,
+        on_record: Optional[Callable[[dict], None]] = None,
+    ) -> Path:
+        """
+        Stream the roadmap to disk as one compact JSON Dependency per line.
+        Accepts a DependencyRoadMap or any iterable of Dependency, so records
+        can be written as they are produced. compression may be "gzip",
+        "bz2" or "lzma". on_record is called with every serialized record.
+        """
+        announce = version_dir is None
+        version_dir = version_dir or Writer._get_versioned_dir()
+        file_path = version_dir / compressed_name(file_name, compression)
+
+        dependencies = (
+            roadmap.map or [] if isinstance(roadmap, DependencyRoadMap) else roadmap
+        )
+        with open_text(file_path, "wt") as f:
+            for dep in dependencies:
+                record = Writer.dataclass_to_dict(dep)
+                if on_record:
+                    on_record(record)
+                f.write(json.dumps(record, separators=(",", ":")))
+                f.write("\n")
+
+        if announce:
+            print(f"Dependency roadmap saved to {file_path}")
+        return file_path
 
     @staticmethod
     def save_file_hashes_json(
-        hashes: Dict[str, dict], file_name: str = "file_hashes.json"
+        hashes: Dict[str, dict],
+        file_name: str = "file_hashes.json",
+        version_dir: Optional[Path] = None,
     ) -> None:
-        version_dir = Writer._get_versioned_dir()
+        announce = version_dir is None
+        version_dir = version_dir or Writer._get_versioned_dir()
         file_path = version_dir / file_name
 
         with open(file_path, "w", encoding="utf-8") as f:
             json.dump(hashes, f, indent=4)
 
-        print(f"File hashes saved to {file_path}")
+        if announce:
+            print(f"File hashes saved to {file_path}")
 
     @staticmethod
     def dataclass_to_dict(obj, seen=None):
@@ -71,7 +116,10 @@ class Writer:
                 if k == "parent_file":
                     result[k] = getattr(getattr(v, "file", None), "file_name", None)
                 elif k == "parent_class":
-                    result[k] = getattr(v, "class_name", None)
+                    # Call.parent_class is already a plain class name
+                    result[k] = (
+                        v if isinstance(v, str) else getattr(v, "class_name", None)
+                    )
                 elif k == "parent_function":
                     result[k] = getattr(v, "function_name", None)
                 elif v is None: